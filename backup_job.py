@@ -0,0 +1,339 @@
+# ============================================================
+# FILE: backup_job.py
+# StockPi — Scheduled backups of every panel database (both apps)
+#
+# Snapshots kitchen_inventory/inventory.db, homepanel/network.db,
+# homepanel/alerts.db, homepanel/devices.json and
+# homepanel/panel_settings.json into backups/ (or STOCKPI_BACKUP_DIR).
+#
+# - SQLite files are copied with the online backup API into a temp file
+#   in the backup dir, so the apps keep writing while it runs and the
+#   copy includes anything still in the WAL. JSON files are read as-is.
+#   Everything is hashed and gzipped in COPY_CHUNK pieces: inventory.db
+#   can hold a multi-million-row barcode_cache, and it never has to fit
+#   in the Pi's memory.
+# - Each snapshot is gzipped and stored once under its content hash
+#   (objects/<name>.<sha12>.gz). A file that hasn't changed since the
+#   last run reuses the existing object, so an idle day adds no objects,
+#   only the small index.json. For SQLite files the hash is over the
+#   rows, not the file bytes: the kitchen app rewrites a few app_meta
+#   bookkeeping keys (VOLATILE_META_KEYS) on every start and maintenance
+#   pass, and an incremental vacuum moves pages without changing data.
+# - index.json lists the runs. Rotation keeps the newest run of each of
+#   the last KEEP_DAILY days, KEEP_WEEKLY weeks and KEEP_MONTHLY months,
+#   then drops the oldest runs until the stored objects fit in
+#   STOCKPI_BACKUP_MAX_MB. Unreferenced objects are deleted.
+#
+# An inventory.db.*.gz object can be uploaded as-is in Kitchen
+# Tools -> Restore.
+#
+# Usage (from the repo root; systemd/stockpi-backup.timer runs it daily):
+#   python3 backup_job.py          # take a snapshot + rotate
+#   python3 backup_job.py --list   # show the runs that are kept
+# ============================================================
+
+# ============================================================
+# SECTION: Imports
+# ============================================================
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime
+
+# ============================================================
+# SECTION: Constants
+# ============================================================
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKUP_DIR = os.environ.get("STOCKPI_BACKUP_DIR") or os.path.join(REPO_DIR, "backups")
+OBJECTS_DIR = os.path.join(BACKUP_DIR, "objects")
+INDEX_PATH = os.path.join(BACKUP_DIR, "index.json")
+
+# name -> (path relative to the repo, kind)
+SOURCES = {
+    "inventory.db": ("kitchen_inventory/inventory.db", "sqlite"),
+    "network.db": ("homepanel/network.db", "sqlite"),
+    "alerts.db": ("homepanel/alerts.db", "sqlite"),
+    "devices.json": ("homepanel/devices.json", "file"),
+    "panel_settings.json": ("homepanel/panel_settings.json", "file"),
+}
+
+KEEP_DAILY = 7
+KEEP_WEEKLY = 4
+KEEP_MONTHLY = 12
+MAX_BYTES = int(os.environ.get("STOCKPI_BACKUP_MAX_MB", "256")) * 1024 * 1024
+
+# Online backup: pages per step, and the pause between steps so the
+# apps' writers get the lock in between
+STEP_PAGES = 256
+STEP_SLEEP = 0.005
+
+# Bytes per read when hashing / compressing a snapshot
+COPY_CHUNK = 1024 * 1024
+
+# Rows per fetch when hashing a SQLite snapshot's contents
+HASH_ROWS = 5000
+
+# app_meta keys that change without the data changing (the ETag
+# generation bumped at every app start, the maintenance claim time);
+# left out of the dedup hash
+VOLATILE_META_KEYS = ("generation", "maintenance_last_run")
+
+HASH_LEN = 12
+TIME_FMT = "%Y-%m-%dT%H:%M:%S"
+
+# ============================================================
+# SECTION: Snapshots
+# ============================================================
+
+def _write(path: str, data: bytes):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _sqlite_copy(path: str, dest: str):
+    """
+    Consistent copy of a live SQLite database into dest, as a single
+    rollback-journal file. Raises ValueError if the copy fails its
+    quick_check.
+    """
+    src = sqlite3.connect(path, timeout=30)
+    try:
+        dst = sqlite3.connect(dest)
+        try:
+            src.backup(dst, pages=STEP_PAGES, sleep=STEP_SLEEP)
+            dst.execute("PRAGMA journal_mode=DELETE")
+            check = dst.execute("PRAGMA quick_check").fetchone()[0]
+        finally:
+            dst.close()
+    finally:
+        src.close()
+
+    if check != "ok":
+        raise ValueError(f"quick_check: {check}")
+
+
+def _chunks(f):
+    return iter(lambda: f.read(COPY_CHUNK), b"")
+
+
+def _file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in _chunks(f):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _sqlite_hash(path: str) -> str:
+    """
+    Hash of a SQLite file's schema and rows, each table in primary-key
+    (else rowid) order, without the app_meta VOLATILE_META_KEYS. Virtual
+    tables are skipped; their shadow tables are ordinary tables and are
+    hashed like the rest.
+    """
+    h = hashlib.sha256()
+    conn = sqlite3.connect(path)
+    try:
+        tables = []
+        for kind, name, sql in conn.execute(
+            "SELECT type, name, sql FROM sqlite_master ORDER BY type, name;"
+        ).fetchall():
+            h.update(repr((kind, name, sql)).encode("utf-8"))
+            if kind == "table" and not name.startswith("sqlite_") \
+                    and not (sql or "").upper().startswith("CREATE VIRTUAL"):
+                tables.append(name)
+
+        for name in tables:
+            quoted = '"' + name.replace('"', '""') + '"'
+            pk = sorted((r[5], r[1]) for r in conn.execute(f"PRAGMA table_info({quoted});") if r[5])
+            order = ", ".join('"' + col.replace('"', '""') + '"' for _n, col in pk) or "rowid"
+            where = ""
+            params = ()
+            if name == "app_meta":
+                where = f" WHERE key NOT IN ({','.join('?' * len(VOLATILE_META_KEYS))})"
+                params = VOLATILE_META_KEYS
+            h.update(repr(("rows", name)).encode("utf-8"))
+            cur = conn.execute(f"SELECT * FROM {quoted}{where} ORDER BY {order};", params)
+            while True:
+                rows = cur.fetchmany(HASH_ROWS)
+                if not rows:
+                    break
+                for row in rows:
+                    h.update(repr(row).encode("utf-8"))
+    finally:
+        conn.close()
+    return h.hexdigest()
+
+
+def _store(name: str, path: str, digest: str = None):
+    """
+    Stores the file at path as objects/<name>.<sha12>.gz unless that
+    object already exists. digest defaults to the hash of the file's
+    bytes. Returns (object name, newly written).
+    """
+    digest = digest or _file_hash(path)
+    obj = f"{name}.{digest[:HASH_LEN]}.gz"
+    obj_path = os.path.join(OBJECTS_DIR, obj)
+    if os.path.exists(obj_path):
+        return obj, False
+
+    tmp = obj_path + ".tmp"
+    with open(path, "rb") as f, open(tmp, "wb") as out:
+        # mtime=0 and no file name keep the object byte-identical for
+        # identical content
+        with gzip.GzipFile(filename="", mode="wb", compresslevel=9, fileobj=out, mtime=0) as gz:
+            for block in _chunks(f):
+                gz.write(block)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp, obj_path)
+    return obj, True
+
+
+def _snapshot(name: str, rel_path: str, kind: str):
+    """
+    Returns the object file name for the current contents of one source,
+    and whether it was newly written. (None, False) if the source doesn't
+    exist yet.
+    """
+    path = os.path.join(REPO_DIR, rel_path)
+    if not os.path.exists(path):
+        return None, False
+    if kind != "sqlite":
+        return _store(name, path)
+
+    fd, tmp = tempfile.mkstemp(dir=BACKUP_DIR, suffix=".tmp")
+    os.close(fd)
+    try:
+        _sqlite_copy(path, tmp)
+        return _store(name, tmp, _sqlite_hash(tmp))
+    finally:
+        os.remove(tmp)
+
+# ============================================================
+# SECTION: Index + Rotation
+# ============================================================
+
+def _load_index() -> list:
+    try:
+        with open(INDEX_PATH, "r", encoding="utf-8") as f:
+            return json.load(f).get("runs", [])
+    except (OSError, ValueError):
+        return []
+
+
+def _save_index(runs: list):
+    _write(INDEX_PATH, json.dumps({"runs": runs}, indent=2).encode("utf-8"))
+
+
+def _object_size(obj: str) -> int:
+    try:
+        return os.path.getsize(os.path.join(OBJECTS_DIR, obj))
+    except OSError:
+        return 0
+
+
+def _rotate(runs: list) -> list:
+    """
+    Runs to keep (oldest first): the newest run in each of the last
+    KEEP_DAILY days / KEEP_WEEKLY ISO weeks / KEEP_MONTHLY months, then
+    the oldest dropped until the referenced objects fit in MAX_BYTES.
+    The newest run is always kept.
+    """
+    buckets = [
+        (KEEP_DAILY, lambda t: t.date()),
+        (KEEP_WEEKLY, lambda t: t.isocalendar()[:2]),
+        (KEEP_MONTHLY, lambda t: (t.year, t.month)),
+    ]
+
+    # runs are appended in order, so position is age (times can repeat)
+    keep = set()
+    for count, bucket in buckets:
+        seen = set()
+        for i in range(len(runs) - 1, -1, -1):
+            key = bucket(datetime.strptime(runs[i]["time"], TIME_FMT))
+            if key in seen:
+                continue
+            seen.add(key)
+            if len(seen) > count:
+                break
+            keep.add(i)
+
+    kept = [r for i, r in enumerate(runs) if i in keep]
+    while len(kept) > 1:
+        objects = {obj for r in kept for obj in r["files"].values()}
+        if sum(_object_size(obj) for obj in objects) <= MAX_BYTES:
+            break
+        kept.pop(0)
+    return kept
+
+
+def _prune_objects(runs: list) -> int:
+    referenced = {obj for r in runs for obj in r["files"].values()}
+    removed = 0
+    for name in os.listdir(OBJECTS_DIR):
+        if name not in referenced:
+            os.remove(os.path.join(OBJECTS_DIR, name))
+            removed += 1
+    return removed
+
+# ============================================================
+# SECTION: Main
+# ============================================================
+
+def run_backup() -> bool:
+    """
+    Takes one snapshot run and rotates. Returns False if any source
+    failed (the others are still saved).
+    """
+    os.makedirs(OBJECTS_DIR, exist_ok=True)
+    # Temp copies left by a run that was killed
+    for name in os.listdir(BACKUP_DIR):
+        if name.endswith(".tmp"):
+            os.remove(os.path.join(BACKUP_DIR, name))
+    ok = True
+    files = {}
+    for name, (rel_path, kind) in SOURCES.items():
+        try:
+            obj, written = _snapshot(name, rel_path, kind)
+        except (OSError, sqlite3.Error, ValueError) as e:
+            print(f"[Backup] {name}: FAILED ({e})")
+            ok = False
+            continue
+        if obj is None:
+            print(f"[Backup] {name}: missing, skipped")
+            continue
+        files[name] = obj
+        print(f"[Backup] {name}: {'saved' if written else 'unchanged'} -> {obj}")
+
+    runs = _load_index()
+    runs.append({"time": datetime.now().strftime(TIME_FMT), "files": files})
+    runs = _rotate(runs)
+    _save_index(runs)
+    removed = _prune_objects(runs)
+
+    total = sum(_object_size(obj) for obj in os.listdir(OBJECTS_DIR))
+    print(f"[Backup] {len(runs)} runs kept, {removed} old objects removed, {total / 1024:.0f} KB stored")
+    return ok
+
+
+def list_runs():
+    for run in _load_index():
+        print(run["time"])
+        for name, obj in sorted(run["files"].items()):
+            print(f"    {name:<20} {obj}")
+
+
+if __name__ == "__main__":
+    if "--list" in sys.argv[1:]:
+        list_runs()
+    else:
+        sys.exit(0 if run_backup() else 1)
@@ -0,0 +1,96 @@
+# ============================================================
+# FILE: build_assets.py
+# StockPi — Static asset build (both apps)
+#
+# For each app, copies static/*.css and static/*.js to
+# static/dist/<name>.<hash>.<ext> (hash = first 10 hex of the
+# content's sha256) plus a precompressed .gz next to it, and writes
+# static/dist/manifest.json mapping "kitchen.css" -> hashed name.
+#
+# The apps read the manifest at startup (asset_url() in templates), so
+# a changed file gets a new URL and nginx can serve dist/ with
+# "immutable" cache headers. Without a build the apps fall back to the
+# unhashed files in static/.
+#
+# Usage (from the repo root; setup.sh runs this):
+#   python3 build_assets.py
+# ============================================================
+
+# ============================================================
+# SECTION: Imports
+# ============================================================
+import gzip
+import hashlib
+import json
+import os
+
+# ============================================================
+# SECTION: Constants
+# ============================================================
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+APPS = ["kitchen_inventory", "homepanel"]
+ASSET_EXTS = (".css", ".js")
+HASH_LEN = 10
+
+# ============================================================
+# SECTION: Build
+# ============================================================
+
+def _write(path: str, data: bytes):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def build_app(app_dir: str) -> dict:
+    """
+    Builds one app's static/dist/. Returns the manifest.
+    Files from earlier builds that are no longer referenced are removed.
+    """
+    static_dir = os.path.join(app_dir, "static")
+    dist_dir = os.path.join(static_dir, "dist")
+    if not os.path.isdir(static_dir):
+        return {}
+    os.makedirs(dist_dir, exist_ok=True)
+
+    manifest = {}
+    for name in sorted(os.listdir(static_dir)):
+        src = os.path.join(static_dir, name)
+        stem, ext = os.path.splitext(name)
+        if ext not in ASSET_EXTS or not os.path.isfile(src):
+            continue
+
+        with open(src, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()[:HASH_LEN]
+        hashed = f"{stem}.{digest}{ext}"
+
+        out = os.path.join(dist_dir, hashed)
+        if not os.path.exists(out):
+            _write(out, data)
+            # mtime=0 keeps the .gz byte-identical across rebuilds
+            _write(out + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+        manifest[name] = hashed
+
+    keep = set(manifest.values()) | {h + ".gz" for h in manifest.values()} | {"manifest.json"}
+    for name in os.listdir(dist_dir):
+        if name not in keep:
+            os.remove(os.path.join(dist_dir, name))
+
+    _write(os.path.join(dist_dir, "manifest.json"), json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+    return manifest
+
+
+def main():
+    for app in APPS:
+        manifest = build_app(os.path.join(REPO_DIR, app))
+        for name, hashed in manifest.items():
+            print(f"[Assets] {app}/static/{name} -> dist/{hashed}")
+
+
+# ============================================================
+# SECTION: Main
+# ============================================================
+if __name__ == "__main__":
+    main()
@@ -71,6 +71,8 @@ import alerts_db
 import network_db
 network_db.init_db()
 alerts_db.init_db()
+import json
+import os
 import threading
 import time
 import subprocess
@@ -163,91 +165,42 @@ def inject_script_root():
     return {"script_root": request.script_root}
 
 
+# --- Static assets (hashed names written by ../build_assets.py) ---
+ASSET_MANIFEST_PATH = os.path.join(os.path.dirname(__file__), "static", "dist", "manifest.json")
+
+def _load_asset_manifest():
+    try:
+        with open(ASSET_MANIFEST_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+_asset_manifest = _load_asset_manifest()
+
+def asset_url(name: str) -> str:
+    # Hashed copy from static/dist/ if the build has run, else static/<name>
+    hashed = _asset_manifest.get(name)
+    if hashed:
+        return f"/static/dist/{hashed}"
+    return f"/static/{name}"
+
+app.jinja_env.globals["asset_url"] = asset_url
+
+@app.after_request
+def _immutable_dist_assets(resp):
+    if request.path.startswith("/static/dist/") and resp.status_code == 200:
+        resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return resp
+# --- end static assets ---
+
 
-BASE_CSS = """
-<style>
-  :root{
-    --bg:#0b0f14;
-    --panel:#111826;
-    --panel2:#0f1622;
-    --text:#e5e7eb;
-    --muted:#9ca3af;
-    --border:#1f2937;
-    --accent:#60a5fa;
-    --good:#34d399;
-    --bad:#f87171;
-    --warn:#fbbf24;
-  }
-  *{box-sizing:border-box}
-  body{ margin:0; background:var(--bg); color:var(--text);
-        font-family: system-ui, -apple-system, Segoe UI, Roboto, Helvetica, Arial, sans-serif; }
-  a{ color:inherit; }
-  .wrap{ padding:16px; max-width:1200px; margin:0 auto; }
-  .card{ background:linear-gradient(180deg, var(--panel), var(--panel2));
-         border:1px solid var(--border); border-radius:16px; padding:16px; }
-  .title{ font-size:18px; font-weight:800; margin:0 0 10px 0; letter-spacing:0.2px; }
-  .sub{ color:var(--muted); font-size:16px; margin-top:10px; }
-  .badge{ display:inline-block; padding:4px 10px; border-radius:999px;
-          font-size:13px; font-weight:800; border:1px solid var(--border); color:var(--muted); }
-  .grid{ display:grid; gap:16px; }
-  .grid2{ grid-template-columns: 2fr 1fr; }
-  .row2{ margin-top:16px; display:grid; gap:16px; grid-template-columns: repeat(3, 1fr); }
-  a.tile{ text-decoration:none; display:block; }
-  a.tile:hover .card{ border-color:#2b364a; }
-  .kv{ display:flex; justify-content:space-between; gap:12px; padding:6px 0; border-top:1px solid rgba(31,41,55,.6); }
-  .kv:first-of-type{ border-top:none; padding-top:0; }
-  .k{ color:var(--muted); }
-  .v{ font-weight:800; }
-  .big{ font-size:56px; font-weight:900; line-height:1; margin:0; }
-  .weatherLine{ display:flex; align-items:baseline; gap:10px; flex-wrap:wrap; }
-  .temp{ font-size:44px; font-weight:900; line-height:1; }
-  .cond{ color:var(--muted); font-size:18px; font-weight:800; }
-
-  .topbar{ display:flex; align-items:center; justify-content:space-between; gap:12px; margin-bottom:12px; }
-  .btn{ display:inline-block; padding:10px 12px; border-radius:12px; border:1px solid var(--border);
-        background:rgba(17,24,38,.35); text-decoration:none; font-weight:800; cursor:pointer; }
-  .btnRow{ display:flex; gap:10px; flex-wrap:wrap; }
-  .btnDanger{ border-color: rgba(248,113,113,.5); }
-  .btnPrimary{ border-color: rgba(96,165,250,.6); }
-
-  table{ width:100%; border-collapse:separate; border-spacing:0; overflow:hidden;
-         border:1px solid var(--border); border-radius:14px; }
-  th, td{ padding:10px 12px; border-bottom:1px solid rgba(31,41,55,.6); font-size:15px; }
-  th{ text-align:left; color:var(--muted); font-weight:900; background:rgba(17,24,38,.35); }
-  tr:last-child td{ border-bottom:none; }
-
-  .cards{ display:grid; grid-template-columns: repeat(3, 1fr); gap:16px; }
-  .statusDot{ width:10px;height:10px;border-radius:999px;display:inline-block;margin-right:8px; }
-  .up{ background: var(--good); }
-  .down{ background: var(--bad); }
-  .unk{ background: var(--warn); }
-  .pill{ display:inline-block; padding:6px 10px; border-radius:999px; border:1px solid var(--border);
-         color:var(--muted); font-weight:800; font-size:13px; }
-  .hrow{ display:flex; align-items:center; justify-content:space-between; gap:12px; }
-  .hname{ font-weight:900; font-size:18px; }
-
-  .svcRow{ margin-top:10px; display:flex; flex-wrap:wrap; gap:8px; }
-  .svcPill{ display:inline-flex; align-items:center; gap:8px; padding:6px 10px; border-radius:999px;
-            border:1px solid var(--border); font-weight:900; font-size:13px; color:var(--text);
-            background:rgba(17,24,38,.35); }
-  .svcDot{ width:8px; height:8px; border-radius:999px; display:inline-block; }
-
-  .formGrid{ display:grid; gap:12px; grid-template-columns: 1fr 1fr; }
-  .field{ display:flex; flex-direction:column; gap:6px; }
-  label{ font-weight:900; color:var(--muted); font-size:13px; }
-  input, textarea{ background: rgba(17,24,38,.35); border:1px solid var(--border);
-                   border-radius:12px; padding:10px 12px; color:var(--text); font-size:15px; outline:none; }
-  textarea{ min-height:120px; resize:vertical; }
-  .full{ grid-column: 1 / -1; }
-  .help{ color:var(--muted); font-size:13px; line-height:1.35; }
-</style>
-"""
 
 HOME_HTML = """
 <!doctype html>
 <html lang="en">
 <head><meta charset="utf-8" /><meta name="viewport" content="width=device-width, initial-scale=1" />
-<title>HomePanel</title>""" + BASE_CSS + """
+<title>HomePanel</title>
+<link rel="stylesheet" href="{{ asset_url('panel.css') }}">
 </head>
 <body>
 <div class="wrap">
@@ -336,7 +289,8 @@ WEATHER_HTML = """
 <!doctype html>
 <html lang="en">
 <head><meta charset="utf-8" /><meta name="viewport" content="width=device-width, initial-scale=1" />
-<title>Weather</title>""" + BASE_CSS + """
+<title>Weather</title>
+<link rel="stylesheet" href="{{ asset_url('panel.css') }}">
 </head>
 <body>
 <div class="wrap">
@@ -461,7 +415,8 @@ NETWORK_HTML = """
 <!doctype html>
 <html lang="en">
 <head><meta charset="utf-8" /><meta name="viewport" content="width=device-width, initial-scale=1" />
-<title>Network</title>""" + BASE_CSS + """
+<title>Network</title>
+<link rel="stylesheet" href="{{ asset_url('panel.css') }}">
 </head>
 <body>
 <div class="wrap">
@@ -527,7 +482,8 @@ EVENTS_HTML = """
 <!doctype html>
 <html lang="en">
 <head><meta charset="utf-8" /><meta name="viewport" content="width=device-width, initial-scale=1" />
-<title>Alerts</title>""" + BASE_CSS + """
+<title>Alerts</title>
+<link rel="stylesheet" href="{{ asset_url('panel.css') }}">
 </head>
 <body>
 <div class="wrap">
@@ -614,7 +570,8 @@ RF_HTML = """
 <!doctype html>
 <html lang="en">
 <head><meta charset="utf-8" /><meta name="viewport" content="width=device-width, initial-scale=1" />
-<title>RF</title>""" + BASE_CSS + """
+<title>RF</title>
+<link rel="stylesheet" href="{{ asset_url('panel.css') }}">
 </head>
 <body>
 <div class="wrap">
@@ -688,7 +645,8 @@ MANAGE_HTML = """
 <!doctype html>
 <html lang="en">
 <head><meta charset="utf-8" /><meta name="viewport" content="width=device-width, initial-scale=1" />
-<title>Manage Devices</title>""" + BASE_CSS + """
+<title>Manage Devices</title>
+<link rel="stylesheet" href="{{ asset_url('panel.css') }}">
 </head>
 <body>
 <div class="wrap">
@@ -734,7 +692,8 @@ DEVICE_FORM_HTML = """
 <!doctype html>
 <html lang="en">
 <head><meta charset="utf-8" /><meta name="viewport" content="width=device-width, initial-scale=1" />
-<title>{{ title }}</title>""" + BASE_CSS + """
+<title>{{ title }}</title>
+<link rel="stylesheet" href="{{ asset_url('panel.css') }}">
 </head>
 <body>
 <div class="wrap">
@@ -909,7 +868,8 @@ DEVICE_FORM_HTML = """
   }
 </script>
 </body></html>
-""" + BASE_CSS + """
+
+<link rel="stylesheet" href="{{ asset_url('panel.css') }}">
 </head>
 <body>
 <div class="wrap">
@@ -963,7 +923,8 @@ DELETE_HTML = """
 <!doctype html>
 <html lang="en">
 <head><meta charset="utf-8" /><meta name="viewport" content="width=device-width, initial-scale=1" />
-<title>Delete Device</title>""" + BASE_CSS + """
+<title>Delete Device</title>
+<link rel="stylesheet" href="{{ asset_url('panel.css') }}">
 </head>
 <body>
 <div class="wrap">
@@ -1264,9 +1225,6 @@ def _safe_alerts(limit: int = 5):
     return items
 
 
-import os
-import json
-
 RF_STATE_PATH = os.path.join(os.path.dirname(__file__), "rf_state.json")
 
 def _rf_load_state() -> None:
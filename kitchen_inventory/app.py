@@ -1,12 +1,20 @@
 # ============================================================
 # SECTION: Imports
 # ============================================================
+import functools
+import gzip
+import hashlib
 import os
-import shutil
 import io
+import json
 import socket
+import tempfile
+import threading
+import time
+import zlib
+from urllib.parse import urlencode
 
-from flask import Flask, request, redirect, send_file, Response, url_for, render_template
+from flask import Flask, request, redirect, Response, url_for, render_template, stream_template, jsonify, make_response, send_file
 
 from werkzeug.middleware.proxy_fix import ProxyFix
 
@@ -31,21 +39,33 @@ except Exception:
 import db as _db
 _db.init_db()
 
+import exports
+import inventory_import
+from page_cache import PageCache
+
 from inventory import (
     # Barcode alias support
-    resolve_barcode,
     add_barcode_alias,
 
     # Inventory / Grocery
     get_item_by_barcode,
     add_item,
-    increment_existing,
-    remove_one,
+    scan_in,
+    scan_out,
+    apply_scans,
+    get_pending_scans,
+    pop_pending_scan,
     delete_item,
     delete_grocery_only,
     move_location,
-    get_inventory,
+    search_inventory,
+    search_items,
+    count_inventory,
+    INVENTORY_SORTS,
     get_grocery_list,
+    db_generation,
+    iter_inventory,
+    iter_grocery_list,
     lookup_name_by_barcode,
 
     # Smart / Debug
@@ -53,13 +73,24 @@ from inventory import (
     get_low_stock,
     get_item_stats,
     get_event_log,
+    backup_database,
+    restore_database,
+    forecast_all,
+    run_maintenance,
+    meta_get,
+    meta_update,
 
     # Locations
     get_locations,
     add_location,
     delete_location,
+
+    # Startup
+    load_item_index,
 )
 
+load_item_index()
+
 # ============================================================
 # SECTION: App Setup
 # ============================================================
@@ -73,77 +104,6 @@ def inject_script_root():
     return {"script_root": request.script_root}
 
 
-# =========================
-# GLOBAL "APPS" BUTTON INJECTION (ALL HTML PAGES)
-# =========================
-from flask import Response
-import re
-
-def _apps_button_html() -> str:
-    return (
-        '<a href="#" id="appsBtn" onclick="window.location=\'/\'; return false;" style="'
-        'position:fixed;top:12px;left:12px;'
-        'padding:10px 14px;'
-        'border-radius:12px;'
-        'background:rgba(0,0,0,.65);'
-        'color:#fff;'
-        'text-decoration:none;'
-        'font-weight:800;'
-        'z-index:2147483647;'
-        'border:1px solid rgba(255,255,255,.25);'
-        '">Apps</a>'
-        '<div style="height:44px"></div>'
-    )
-
-
-@app.after_request
-def _inject_apps_button(resp: Response):
-    try:
-        # Don't touch streamed / passthrough responses
-        if getattr(resp, "direct_passthrough", False):
-            return resp
-
-        ct = (resp.headers.get("Content-Type") or "").lower()
-
-        # Only touch HTML responses
-        if "text/html" not in ct:
-            return resp
-
-        # Don't touch redirects or empty bodies
-        if resp.status_code in (301, 302, 303, 304) or not resp.get_data():
-            return resp
-
-        html = resp.get_data(as_text=True)
-
-        # Avoid double-injecting if already present
-        if 'id="appsBtn"' in html:
-            return resp
-
-        btn = _apps_button_html()
-
-        # Inject right after <body ...> if possible
-        m = re.search(r"<body[^>]*>", html, flags=re.IGNORECASE)
-        if m:
-            insert_at = m.end()
-            html = html[:insert_at] + btn + html[insert_at:]
-        else:
-            # Fallback: just prepend to the document
-            html = btn + html
-
-        resp.set_data(html)
-
-        # Content length may be wrong after modifying the body
-        if "Content-Length" in resp.headers:
-            del resp.headers["Content-Length"]
-
-        return resp
-
-    except Exception:
-        # If anything goes wrong, fail open (serve the page normally)
-        return resp
-
-
-
 # ============================================================
 # SECTION: Constants / Config
 # ============================================================
@@ -159,17 +119,95 @@ APP_PORT = 5000
 SHELVES = [1, 2, 3, 4]
 DEFAULT_SHELF = 1
 
+# ------------------------------------------------------------
+# SUBSECTION: Forecast
+# ------------------------------------------------------------
+FORECAST_WINDOW_DAYS = 28   # usage history the forecast is based on
+FORECAST_SOON_DAYS = 7      # "running out soon" on the grocery list
+
+# ------------------------------------------------------------
+# SUBSECTION: Inventory page
+# ------------------------------------------------------------
+INVENTORY_PAGE_SIZE = 100
+ITEM_SEARCH_LIMIT = 12      # typeahead matches per request (resolve picker)
+
+# ------------------------------------------------------------
+# SUBSECTION: Rendered-page cache
+# ------------------------------------------------------------
+PAGE_CACHE_MAX_ENTRIES = 64
+PAGE_CACHE_MAX_BYTES = 4 * 1024 * 1024
+
+# ------------------------------------------------------------
+# SUBSECTION: QR codes / share links
+# ------------------------------------------------------------
+QR_CACHE_MAX_ENTRIES = 32       # PNGs kept in memory
+QR_DISK_MAX_FILES = 200         # PNGs kept in qr_cache/ (oldest pruned)
+BASE_URL_REFRESH_SECONDS = 300  # re-check the LAN IP this often
+BASE_URL_RETRY_SECONDS = 15     # ...or this often while there is no LAN yet
+
+# ------------------------------------------------------------
+# SUBSECTION: Backup download
+# ------------------------------------------------------------
+BACKUP_STREAM_CHUNK = 64 * 1024
+BACKUP_GZIP_LEVEL = 6
+RESTORE_MAX_BYTES = 512 * 1024 * 1024   # after gunzip
+
+# ------------------------------------------------------------
+# SUBSECTION: CSV import
+# ------------------------------------------------------------
+IMPORT_STALE_SECONDS = 120   # a "running" import with no progress this long is dead
+
 # ------------------------------------------------------------
 # SUBSECTION: Paths
 # ------------------------------------------------------------
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, "inventory.db")
-UPLOAD_TMP = os.path.join(BASE_DIR, "inventory.restore.tmp")
+QR_CACHE_DIR = os.path.join(BASE_DIR, "qr_cache")
+ASSET_MANIFEST = os.path.join(BASE_DIR, "static", "dist", "manifest.json")
+IMPORT_ERRORS_PATH = os.path.join(BASE_DIR, "import_errors.csv")
 
 # ============================================================
 # SECTION: UI Helpers
 # ============================================================
 
+# ------------------------------------------------------------
+# SUBSECTION: Static assets (hashed names from build_assets.py)
+# ------------------------------------------------------------
+def _load_asset_manifest():
+    try:
+        with open(ASSET_MANIFEST, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+_asset_manifest = _load_asset_manifest()
+
+
+def asset_url(name: str) -> str:
+    """
+    URL for static/<name>: the content-hashed copy in static/dist/ when
+    build_assets.py has run (nginx serves those as immutable), else the
+    plain file.
+    """
+    hashed = _asset_manifest.get(name)
+    if hashed:
+        return f"/static/dist/{hashed}"
+    return f"/static/{name}"
+
+
+app.jinja_env.globals["asset_url"] = asset_url
+
+
+@app.after_request
+def _immutable_dist_assets(resp):
+    # Hashed names never change content; cache them for a year when the
+    # app is reached directly (port 5000, QR links) rather than via nginx
+    if request.path.startswith("/static/dist/") and resp.status_code == 200:
+        resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return resp
+
+
 # ------------------------------------------------------------
 # SUBSECTION: Base URL helpers (LAN-safe QR links)
 # ------------------------------------------------------------
@@ -190,84 +228,74 @@ def _get_lan_ip_fallback():
         return "127.0.0.1"
 
 
+_base_url_lock = threading.Lock()
+_base_url = {"url": None, "expires": 0.0}
+
+
 def _get_base_url():
     """
     Returns a base URL suitable for sharing (QR/export links).
     Priority:
       1) STOCKPI_BASE_URL env var
       2) LAN IP + APP_PORT
+    The LAN IP is re-discovered every BASE_URL_REFRESH_SECONDS (a DHCP
+    change shows up within minutes), or every BASE_URL_RETRY_SECONDS
+    while it's still 127.0.0.1 (booted before Wi-Fi came up).
     """
     env_base = (os.environ.get("STOCKPI_BASE_URL") or "").strip()
     if env_base:
         return env_base.rstrip("/")
 
+    now = time.monotonic()
+    with _base_url_lock:
+        if _base_url["url"] and now < _base_url["expires"]:
+            return _base_url["url"]
+
     ip = _get_lan_ip_fallback()
-    return f"http://{ip}:{APP_PORT}"
+    ttl = BASE_URL_RETRY_SECONDS if ip.startswith("127.") else BASE_URL_REFRESH_SECONDS
+    url = f"http://{ip}:{APP_PORT}"
+    with _base_url_lock:
+        _base_url["url"] = url
+        _base_url["expires"] = now + ttl
+    return url
 
 
-# ------------------------------------------------------------
-# SUBSECTION: Styles
-# ------------------------------------------------------------
-def _styles():
-    return """
-    <style>
-      :root{
-        --bg: #0f1115; --panel: #151922; --panel2: #111520;
-        --text: #e7e9ee; --muted: #a8b0c2; --border: #2a3142;
-        --danger: #ff4d4d; --ok: #39d98a; --warn: #f7c948;
-        --btn: #1b2231; --btnHover: #232c3f; --input: #0f1420;
-        --shadow: rgba(0,0,0,0.35);
-      }
-      * { box-sizing: border-box; }
-      body { margin:0; background: radial-gradient(1200px 800px at 20% 0%, #151a25 0%, var(--bg) 45%, #0b0d12 100%); color: var(--text);
-             font-family: system-ui,-apple-system,Segoe UI,Roboto,Arial,sans-serif; }
-      .wrap{ min-height:100vh; display:flex; justify-content:center; padding:18px; }
-      .container{ width:100%; max-width:820px; }
-      header{ display:flex; align-items:baseline; justify-content:space-between; gap:12px; margin-bottom:14px; flex-wrap:wrap; }
-      h1{ font-size:28px; margin:0; }
-      .sub{ color:var(--muted); font-size:14px; }
-      .row{ margin:12px 0; }
-      .card{ background: linear-gradient(180deg,var(--panel) 0%,var(--panel2) 100%);
-             border:1px solid var(--border); border-radius:16px; padding:14px; margin:12px 0; box-shadow:0 10px 30px var(--shadow); }
-      .card h2{ margin:0 0 10px 0; font-size:18px; }
-      .status{ padding:10px 12px; border-radius:12px; border:1px solid var(--border); background:rgba(255,255,255,0.03);
-               margin:10px 0 14px 0; font-weight:800; opacity:1; transition:opacity 220ms ease, transform 220ms ease; }
-      .status.ok{ color:var(--ok); } .status.danger{ color:var(--danger); } .status.warn{ color:var(--warn); }
-      .status.hide{ opacity:0; transform: translateY(-4px); }
-      .chip{ display:inline-block; padding:7px 11px; border:1px solid var(--border); border-radius:999px;
-             background:rgba(255,255,255,0.03); margin-left:8px; font-size:14px; }
-      .muted{ color:var(--muted); font-size:14px; }
-      .btn{ appearance:none; border:1px solid var(--border); background:var(--btn); color:var(--text);
-            padding:12px 14px; border-radius:14px; font-size:16px; cursor:pointer; text-decoration:none;
-            display:inline-flex; align-items:center; justify-content:center; gap:8px;
-            transition:transform .05s ease, background .15s ease, border-color .15s ease; }
-      .btn:hover{ background:var(--btnHover); border-color:#39425a; } .btn:active{ transform: translateY(1px); }
-      .btn-wide{ width:220px; max-width:100%; } .zone-btn{ min-width:150px; }
-      .btn-danger{ border-color: rgba(255,77,77,0.35); background: rgba(255,77,77,0.10); }
-      .btn-danger:hover{ background: rgba(255,77,77,0.16); border-color: rgba(255,77,77,0.55); }
-      .btn-warn{ border-color: rgba(247,201,72,0.35); background: rgba(247,201,72,0.10); }
-      .btn-warn:hover{ background: rgba(247,201,72,0.16); border-color: rgba(247,201,72,0.55); }
-      .fieldRow{ display:flex; gap:10px; flex-wrap:wrap; align-items:center; }
-      input[type=text]{ width:min(440px,100%); font-size:18px; padding:12px; border-radius:14px; border:1px solid var(--border);
-                        background:var(--input); color:var(--text); outline:none; }
-      input[type=text]:focus{ border-color: rgba(90,162,255,0.6); box-shadow:0 0 0 3px rgba(90,162,255,0.18); }
-      input[type=file]{ color: var(--muted); }
-      select, input[type=number]{ font-size:16px; padding:10px 12px; border-radius:12px; border:1px solid var(--border);
-              background:var(--input); color:var(--text); outline:none; }
-      select:focus, input[type=number]:focus{ border-color: rgba(90,162,255,0.6); box-shadow:0 0 0 3px rgba(90,162,255,0.18); }
-      table{ width:100%; border-collapse:collapse; border:1px solid var(--border); background:rgba(255,255,255,0.02);
-             border-radius:14px; overflow:hidden; }
-      th,td{ padding:10px; border-bottom:1px solid var(--border); }
-      th{ text-align:left; color:var(--muted); font-weight:900; background:rgba(255,255,255,0.03); }
-      tr:last-child td{ border-bottom:none; }
-      .qty-zero{ color:var(--danger); font-weight:900; }
-      .qty-low{ color:var(--warn); font-weight:900; }
-      .navRow{ display:flex; gap:10px; flex-wrap:wrap; margin-top:10px; }
-      form.inline{ display:inline; }
-      .mono{ font-family: ui-monospace, SFMono-Regular, Menlo, Monaco, Consolas, "Liberation Mono", monospace; }
-      @media (max-width:520px){ h1{font-size:24px;} .btn-wide{width:100%;} .zone-btn{min-width:46%;} }
-    </style>
+# ============================================================
+# SECTION: Maintenance job (event retention + incremental vacuum)
+# ============================================================
+EVENT_RETENTION_DAYS = int(os.environ.get("STOCKPI_EVENT_RETENTION_DAYS", "180"))
+EVENT_ARCHIVE_ENABLED = os.environ.get("STOCKPI_EVENT_ARCHIVE", "1") == "1"
+MAINTENANCE_INTERVAL_SECONDS = 6 * 60 * 60  # 6 hours
+MAINTENANCE_STARTUP_DELAY_SECONDS = 120     # let the app settle first
+
+
+def _maintenance_once(force=False):
     """
+    One maintenance pass. Unless forced, skipped if any worker ran one
+    within the interval (shared via app_meta).
+    """
+    return run_maintenance(
+        retention_days=EVENT_RETENTION_DAYS,
+        archive=EVENT_ARCHIVE_ENABLED,
+        min_interval_seconds=0 if force else MAINTENANCE_INTERVAL_SECONDS - 60,
+    )
+
+
+def maintenance_loop():
+    time.sleep(MAINTENANCE_STARTUP_DELAY_SECONDS)
+    while True:
+        try:
+            stats = _maintenance_once()
+            if stats:
+                print(f"[Maintenance] OK. Archived {stats['archived']}, pruned {stats['pruned']} events "
+                      f"older than {stats['cutoff']}; {stats['freelist_pages']} free pages left.")
+        except Exception as e:
+            print("[Maintenance] error:", e)
+        time.sleep(MAINTENANCE_INTERVAL_SECONDS)
+
+
+_maintenance_thread = threading.Thread(target=maintenance_loop, daemon=True)
+_maintenance_thread.start()
 
 
 # ============================================================
@@ -279,56 +307,112 @@ BANNER_MS_ERROR = int(os.environ.get("STOCKPI_BANNER_MS_ERROR", "9000"))
 
 
 # ------------------------------------------------------------
-# SUBSECTION: Banner auto-hide
+# SUBSECTION: Template context (banner + timings for base.html)
 # ------------------------------------------------------------
-def _auto_hide_banner_js():
+@app.context_processor
+def inject_status_banner():
+    """
+    status: the top banner from ?msg=&msgtype= (rendered by the
+    status_banner macro), or None. banner_ms / banner_ms_error feed the
+    auto-hide delays in static/kitchen.js.
     """
-    Auto-hides the top status banner after a delay so kiosk users can read it.
-    Uses longer delay for error banners.
-    Controlled by env vars:
-      - STOCKPI_BANNER_MS (default 10000)
-      - STOCKPI_BANNER_MS_ERROR (default 20000)
+    msg = request.args.get("msg", "")
+    msgtype = request.args.get("msgtype", "ok")
+    status = None
+    if msg:
+        cls = "ok" if msgtype == "ok" else ("warn" if msgtype == "warn" else "danger")
+        status = {"msg": msg, "cls": cls}
+    return {"status": status, "banner_ms": BANNER_MS, "banner_ms_error": BANNER_MS_ERROR}
+
+
+def _warm_templates():
     """
-    return f"""
-    <script>
-    (function() {{
-      function hide(el) {{
-        if (!el) return;
-        el.style.opacity = "0";
-        el.style.transform = "translateY(-6px)";
-        setTimeout(function() {{
-          if (el && el.parentNode) el.parentNode.removeChild(el);
-        }}, 350);
-      }}
-
-      window.addEventListener("load", function() {{
-        var el = document.querySelector(".status");
-        if (!el) return;
-
-        var isError = el.classList.contains("danger") || el.classList.contains("error");
-        var delay = isError ? {BANNER_MS_ERROR} : {BANNER_MS};
-
-        el.style.cursor = "pointer";
-        el.title = "Tap to dismiss";
-        el.addEventListener("click", function() {{ hide(el); }});
-
-        setTimeout(function() {{ hide(el); }}, delay);
-      }});
-    }})();
-    </script>
+    Compiles every template at startup so the first request for a page
+    doesn't pay the Jinja parse/compile cost (the kiosk after a reboot).
     """
+    for name in app.jinja_env.list_templates():
+        if name.endswith(".html"):
+            app.jinja_env.get_template(name)
+
+
+_warm_templates()
 
 
 # ------------------------------------------------------------
-# SUBSECTION: Banner HTML (reads msg/msgtype from querystring)
+# SUBSECTION: Conditional GET + page cache (keyed on the DB generation)
 # ------------------------------------------------------------
-def _page_status_html():
-    msg = request.args.get("msg", "")
-    msgtype = request.args.get("msgtype", "ok")
-    if not msg:
-        return ""
-    cls = "ok" if msgtype == "ok" else ("warn" if msgtype == "warn" else "danger")
-    return f"<div id='statusBanner' class='status {cls}'>{msg}</div>"
+page_cache = PageCache(PAGE_CACHE_MAX_ENTRIES, PAGE_CACHE_MAX_BYTES)
+
+
+def _read_token() -> str:
+    """
+    Validity token for read pages: the DB generation (changes on every
+    write) plus the UTC date (forecasts and run-out dates move with the day).
+    """
+    return f"{db_generation()}.{time.strftime('%Y%m%d', time.gmtime())}"
+
+
+def db_etag(view):
+    """
+    Read views: answers If-None-Match with 304 before the view runs, so a
+    phone re-opening an unchanged page costs one app_meta read instead of a
+    render. The browser keys its cache by URL, so query args (search,
+    zone, msg) don't need to be in the tag.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        etag = _read_token()
+        if request.if_none_match.contains_weak(etag):
+            resp = Response(status=304)
+        else:
+            resp = make_response(view(*args, **kwargs))
+            if resp.status_code != 200:
+                return resp
+        resp.set_etag(etag, weak=True)
+        resp.headers["Cache-Control"] = "no-cache"
+        return resp
+    return wrapper
+
+
+def page_cached(view):
+    """
+    Serves the rendered page from page_cache (key = path + query string)
+    while the read token is unchanged. Streamed pages are passed through
+    to the client as usual and stored once the last chunk has gone out.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        token = _read_token()
+        key = request.full_path
+        hit = page_cache.get(token, key)
+        if hit is not None:
+            body, mimetype = hit
+            return Response(body, mimetype=mimetype)
+
+        resp = make_response(view(*args, **kwargs))
+        if resp.status_code != 200:
+            return resp
+        if not resp.is_streamed:
+            page_cache.put(token, key, resp.get_data(), resp.mimetype)
+            return resp
+
+        def tee(chunks, limit=page_cache.max_bytes // 4):
+            parts = []
+            size = 0
+            for chunk in chunks:
+                if parts is not None:
+                    data = chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+                    parts.append(data)
+                    size += len(data)
+                    if size > limit:
+                        parts = None
+                yield chunk
+            if parts is not None:
+                page_cache.put(token, key, b"".join(parts), resp.mimetype)
+
+        resp.response = tee(resp.response)
+        return resp
+    return wrapper
 
 
 # ============================================================
@@ -365,38 +449,6 @@ def _build_location(zone, shelf, loc_map):
     return zone
 
 
-def _zone_buttons(current_zone, current_shelf, loc_map):
-    html = ""
-    for name in sorted(loc_map.keys()):
-        if loc_map.get(name, False):
-            html += f"""<a class="btn zone-btn" href="/?zone={name.replace(' ', '%20')}&shelf={current_shelf}">{name}</a>"""
-        else:
-            html += f"""<a class="btn zone-btn" href="/?zone={name.replace(' ', '%20')}">{name}</a>"""
-    return html
-
-
-def _shelf_selector(current_zone, current_shelf, loc_map):
-    if not loc_map.get(current_zone, False):
-        return "<div class='muted'>Shelf: <span class='chip'>N/A</span></div>"
-
-    options = ""
-    for s in SHELVES:
-        selected = "selected" if s == current_shelf else ""
-        options += f"<option value='{s}' {selected}>{s}</option>"
-
-    return f"""
-      <div class="row">
-        <form method="get" action="/" class="fieldRow">
-          <input type="hidden" name="zone" value="{current_zone}">
-          <b>Shelf #:</b>
-          <select name="shelf" onchange="this.form.submit()">
-            {options}
-          </select>
-          <span class="muted">(this zone uses shelves)</span>
-        </form>
-      </div>
-    """
-
 def _home_url(zone, shelf, focus='scan', msg="", msgtype="ok"):
     url = f"/?zone={zone.replace(' ', '%20')}&shelf={shelf}&focus={focus}&msgtype={msgtype}"
     if msg:
@@ -411,70 +463,16 @@ def _home_url(zone, shelf, focus='scan', msg="", msgtype="ok"):
 @app.route("/")
 def home():
     zone, shelf, loc_map = _selected_zone_shelf()
-    location = _build_location(zone, shelf, loc_map)
-    focus = request.args.get("focus", "scan")
-    status_html = _page_status_html()
-
-    focus_js = f"""
-    <script>
-      window.onload = function() {{
-        var focusTarget = "{focus}";
-        var el = null;
-        if (focusTarget === "remove") el = document.getElementById("remove_barcode");
-        else el = document.getElementById("scan_barcode");
-        if (el) {{ el.focus(); el.select(); }}
-      }};
-    </script>
-    """
-
-    return f"""
-    {_styles()}{_auto_hide_banner_js()}{focus_js}
-    <div class="wrap"><div class="container">
-      <header>
-        <div><h1>StockPi</h1><div class="sub">Fast scan, local-first, touchscreen-friendly</div></div>
-        <div class="muted">Location <span class="chip">{location}</span></div>
-      </header>
-
-      {status_html}
-
-      <div class="card">
-        <h2>Location</h2>
-        <div class="muted">Pick a zone. Some zones have shelves.</div>
-        <div class="row">{_zone_buttons(zone, shelf, loc_map)}</div>
-        {_shelf_selector(zone, shelf, loc_map)}
-      </div>
-
-      <div class="card">
-        <h2>Scan (+1)</h2>
-        <form method="post" action="/scan?zone={zone.replace(' ', '%20')}&shelf={shelf}">
-          <div class="fieldRow">
-            <input id="scan_barcode" type="text" name="barcode" placeholder="Scan barcode">
-            <button class="btn btn-wide" type="submit">Scan</button>
-          </div>
-        </form>
-        <div class="muted row">If item exists: auto +1. If new: link to existing OR enter name once.</div>
-      </div>
-
-      <div class="card">
-        <h2>Remove (-1)</h2>
-        <form method="post" action="/remove-one?zone={zone.replace(' ', '%20')}&shelf={shelf}">
-          <div class="fieldRow">
-            <input id="remove_barcode" type="text" name="barcode" placeholder="Scan to remove">
-            <button class="btn btn-wide btn-danger" type="submit">Remove</button>
-          </div>
-        </form>
-      </div>
-
-      <div class="navRow">
-        <a class="btn btn-wide" href="/move?zone={zone.replace(' ', '%20')}&shelf={shelf}">Move Location</a>
-        <a class="btn btn-wide" href="/inventory">Inventory</a>
-        <a class="btn btn-wide" href="/grocery-list">Grocery List</a>
-        <a class="btn btn-wide" href="/low-stock?zone={zone.replace(' ', '%20')}&shelf={shelf}">Low Stock</a>
-        <a class="btn btn-wide" href="/tools">Tools</a>
-      </div>
-
-    </div></div>
-    """
+    return render_template(
+        "home.html",
+        location=_build_location(zone, shelf, loc_map),
+        loc_map=loc_map,
+        zone=zone,
+        shelf=shelf,
+        shelves=SHELVES,
+        zone_q=urlencode({"zone": zone, "shelf": shelf}),
+        focus=request.args.get("focus", "scan"),
+    )
 
 
 @app.route("/scan", methods=["POST"])
@@ -486,15 +484,86 @@ def scan():
     if not barcode:
         return redirect(_home_url(zone, shelf, focus='scan', msg="Barcode required", msgtype="danger"))
 
-    item = get_item_by_barcode(barcode)
+    item = scan_in(barcode)
     if item:
-        increment_existing(barcode)
         return redirect(_home_url(zone, shelf, focus='scan', msg=f"Added {item[1]} (+1)", msgtype="ok"))
 
-    # Unknown barcode → go to resolver UI (alias or new item)
+    # Unknown barcode → queue it (the resolve flow counts it from there)
+    # and go to resolver UI (alias or new item)
+    apply_scans([(barcode, 1)])
     return redirect(url_for("resolve_barcode_page", barcode=barcode, zone=zone, shelf=shelf))
 
 
+# ============================================================
+# SECTION: Routes — JSON Scan API (used by the home page)
+# ============================================================
+
+def _api_barcode():
+    payload = request.get_json(silent=True) or {}
+    return (payload.get("barcode") or request.form.get("barcode", "") or "").strip()
+
+
+def _item_json(item):
+    barcode, name, location, qty, low = item
+    return {
+        "barcode": barcode,
+        "name": name,
+        "location": location,
+        "quantity": int(qty),
+        "low_threshold": int(low) if low else 0,
+    }
+
+
+@app.route("/api/scan", methods=["POST"])
+def api_scan():
+    """
+    +1 scan. Unknown barcodes return a resolve_url (relative to the app root)
+    for the alias/new-item flow.
+    """
+    zone, shelf, _loc_map = _selected_zone_shelf()
+    barcode = _api_barcode()
+    if not barcode:
+        return jsonify({"status": "invalid", "msg": "Barcode required", "msgtype": "danger"}), 400
+
+    item = scan_in(barcode)
+    if not item:
+        # Queued like a batch scan, so repeats sent to /scan-batch while
+        # the resolver opens add up with this one in pending_scans
+        apply_scans([(barcode, 1)])
+        resolve_url = "/resolve_barcode?" + urlencode({"barcode": barcode, "zone": zone, "shelf": shelf})
+        return jsonify({"status": "unknown", "barcode": barcode, "resolve_url": resolve_url})
+
+    return jsonify({"status": "ok", "item": _item_json(item), "msg": f"Added {item[1]} (+1)", "msgtype": "ok"})
+
+
+@app.route("/api/remove", methods=["POST"])
+def api_remove():
+    barcode = _api_barcode()
+    if not barcode:
+        return jsonify({"status": "invalid", "msg": "Barcode required", "msgtype": "danger"}), 400
+
+    item = scan_out(barcode)
+    if not item:
+        return jsonify({"status": "unknown", "barcode": barcode, "msg": "Item not found", "msgtype": "danger"})
+
+    return jsonify({"status": "ok", "item": _item_json(item), "msg": f"Removed {item[1]} (-1)", "msgtype": "danger"})
+
+
+@app.route("/api/items/search")
+def api_items_search():
+    """
+    Typeahead: ranked item matches for ?q= (name words, location, barcode
+    or alias prefix). ?limit= defaults to ITEM_SEARCH_LIMIT.
+    """
+    q = (request.args.get("q") or "").strip()
+    limit = request.args.get("limit", ITEM_SEARCH_LIMIT)
+    items = [
+        {"barcode": barcode, "name": name, "location": location, "quantity": int(qty)}
+        for barcode, name, location, qty in search_items(q, limit=limit)
+    ]
+    return jsonify({"q": q, "items": items})
+
+
 @app.route("/new-item", methods=["POST"])
 def new_item():
     zone, shelf, _loc_map = _selected_zone_shelf()
@@ -506,6 +575,70 @@ def new_item():
     return redirect(_home_url(zone, shelf, focus='scan', msg=f"Saved {name} (+1)", msgtype="ok"))
 
 
+# ============================================================
+# SECTION: Routes — Batch Scan (unloading a grocery haul)
+# ============================================================
+
+@app.route("/scan-batch", methods=["GET", "POST"])
+def scan_batch():
+    """
+    Scan a whole haul without a page load per item.
+    Form: scanner types one barcode per line into a textarea, one submit.
+    JSON: {"scans": [{"barcode": "...", "delta": 1}, ...]} -> per-barcode results.
+    Unknown barcodes are queued and resolved afterwards from this page.
+    """
+    zone, shelf, _loc_map = _selected_zone_shelf()
+
+    if request.method == "POST" and request.is_json:
+        payload = request.get_json(silent=True) or {}
+        scans = [
+            ((s or {}).get("barcode", ""), (s or {}).get("delta", 1))
+            for s in (payload.get("scans") or [])
+            if isinstance(s, dict)
+        ]
+        results = apply_scans(scans)
+        return jsonify({"results": [{"barcode": b, "status": st} for b, st in results]})
+
+    summary = None
+
+    if request.method == "POST":
+        mode = (request.form.get("mode", "add") or "add").strip()
+        delta = -1 if mode == "remove" else 1
+        lines = (request.form.get("barcodes", "") or "").splitlines()
+        results = apply_scans([(line, delta) for line in lines if line.strip()])
+
+        counts = {"ok": 0, "floored": 0, "unknown": 0, "invalid": 0}
+        for _barcode, st in results:
+            counts[st] = counts.get(st, 0) + 1
+        summary = {
+            "cls": "ok" if not (counts["unknown"] or counts["floored"]) else "warn",
+            "applied": counts["ok"] + counts["floored"],
+            "total": len(results),
+            "unknown": counts["unknown"],
+            "floored": counts["floored"],
+        }
+
+    return render_template(
+        "scan_batch.html",
+        back_url=_home_url(zone, shelf, focus='scan'),
+        zone_q=urlencode({"zone": zone, "shelf": shelf}),
+        summary=summary,
+        pending=get_pending_scans(),
+    )
+
+
+def _drain_pending(barcode):
+    """
+    Clears a just-resolved barcode from the batch-scan queue and applies
+    any queued scans beyond the +1 the resolve flow already counted.
+    Every way into the resolver queues its scan first (/scan, /api/scan,
+    /scan-batch), so that +1 is always one of the queued scans.
+    """
+    extra = pop_pending_scan(barcode) - 1
+    if extra > 0:
+        apply_scans([(barcode, extra)])
+
+
 # ============================================================
 # SECTION: Routes — Resolve Barcode (Alias vs New Item)
 # ============================================================
@@ -520,12 +653,10 @@ def resolve_barcode_page():
         return redirect(_home_url(zone, shelf, focus='scan'))
 
     # If it already resolves, treat it as known and just add +1
-    canonical = resolve_barcode(barcode)
-    if canonical:
-        increment_existing(canonical)
-        item = get_item_by_barcode(canonical)
-        name = item[1] if item else canonical
-        return redirect(_home_url(zone, shelf, focus='scan', msg=f"Added {name} (+1)", msgtype="ok"))
+    item = scan_in(barcode)
+    if item:
+        _drain_pending(barcode)
+        return redirect(_home_url(zone, shelf, focus='scan', msg=f"Added {item[1]} (+1)", msgtype="ok"))
 
     error = None
 
@@ -540,8 +671,8 @@ def resolve_barcode_page():
                 try:
                     add_barcode_alias(barcode, canonical_barcode)
                     # After linking, add +1 to the canonical item immediately
-                    increment_existing(canonical_barcode)
-                    item = get_item_by_barcode(canonical_barcode)
+                    item = scan_in(canonical_barcode)
+                    _drain_pending(barcode)
                     name = item[1] if item else canonical_barcode
                     return redirect(_home_url(zone, shelf, focus='scan', msg=f"Linked + Added {name} (+1)", msgtype="ok"))
                 except Exception as e:
@@ -558,15 +689,26 @@ def resolve_barcode_page():
             else:
                 try:
                     add_item(barcode, name, new_location)
+                    _drain_pending(barcode)
                     return redirect(_home_url(zone, shelf, focus='scan', msg=f"Saved {name} (+1)", msgtype="ok"))
                 except Exception as e:
                     error = str(e)
 
-    items = get_inventory()
+    # Only matches for a submitted search (no-JS fallback); the typeahead
+    # fetches from /api/items/search instead of shipping the catalog
+    q = (request.args.get("q") or "").strip()
+    items = search_items(q, limit=ITEM_SEARCH_LIMIT) if q else []
+
+    # Pre-fill "Create as new item" from the offline product names
+    suggested_name = lookup_name_by_barcode(barcode)
     return render_template(
         "resolve_barcode.html",
         barcode=barcode,
+        name=(request.form.get("name") or suggested_name or "").strip(),
+        suggested=bool(suggested_name),
         items=items,
+        q=q,
+        limit=ITEM_SEARCH_LIMIT,
         error=error,
         zone=zone,
         shelf=shelf,
@@ -592,44 +734,26 @@ def remove_one_route():
     if not barcode:
         return redirect(_home_url(zone, shelf, focus="remove", msg="Barcode required", msgtype="danger"))
 
-    item = get_item_by_barcode(barcode)
+    item = scan_out(barcode)
     if not item:
         return redirect(_home_url(zone, shelf, focus="remove", msg="Item not found", msgtype="danger"))
 
-    remove_one(barcode)
     return redirect(_home_url(zone, shelf, focus="remove", msg=f"Removed {item[1]} (-1)", msgtype="danger"))
 
 
 @app.route("/move")
 def move_page():
     zone, shelf, loc_map = _selected_zone_shelf()
-    location = _build_location(zone, shelf, loc_map)
-    status_html = _page_status_html()
-
-    return f"""
-    {_styles()}{_auto_hide_banner_js()}
-    <div class="wrap"><div class="container">
-      <div class="card">
-        <h2>Move Location</h2>
-        {status_html}
-        <div class="muted">Pick the new location, then scan the item you want to move.</div>
-        <div class="row"><b>New target:</b> <span class="chip">{location}</span></div>
-        <div class="row">{_zone_buttons(zone, shelf, loc_map)}</div>
-        {_shelf_selector(zone, shelf, loc_map)}
-
-        <form method="post" action="/move-scan?zone={zone.replace(' ', '%20')}&shelf={shelf}">
-          <div class="fieldRow">
-            <input type="text" name="barcode" placeholder="Scan item to move" autofocus>
-            <button class="btn btn-wide" type="submit">Scan</button>
-          </div>
-        </form>
-
-        <div class="row">
-          <a class="btn" href="{_home_url(zone, shelf, focus='scan')}">Back</a>
-        </div>
-      </div>
-    </div></div>
-    """
+    return render_template(
+        "move.html",
+        location=_build_location(zone, shelf, loc_map),
+        loc_map=loc_map,
+        zone=zone,
+        shelf=shelf,
+        shelves=SHELVES,
+        zone_q=urlencode({"zone": zone, "shelf": shelf}),
+        back_url=_home_url(zone, shelf, focus='scan'),
+    )
 
 
 @app.route("/move-scan", methods=["POST"])
@@ -645,29 +769,14 @@ def move_scan():
     if not item:
         return redirect(request.script_root + f"/move?zone={zone.replace(' ', '%20')}&shelf={shelf}&msgtype=danger&msg=Item%20not%20found")
 
-    current_location = item[2]
-    name = item[1]
-
-    return f"""
-    {_styles()}{_auto_hide_banner_js()}
-    <div class="wrap"><div class="container">
-      <div class="card">
-        <h2>Confirm Move</h2>
-        <div class="row"><b>{name}</b></div>
-        <div class="row muted">From: <span class="chip">{current_location}</span></div>
-        <div class="row muted">To: <span class="chip">{new_location}</span></div>
-
-        <form method="post" action="/move-save?zone={zone.replace(' ', '%20')}&shelf={shelf}">
-          <input type="hidden" name="barcode" value="{barcode}">
-          <input type="hidden" name="new_location" value="{new_location}">
-          <div class="fieldRow">
-            <button class="btn btn-wide" type="submit">Move</button>
-            <a class="btn" href="/move?zone={zone.replace(' ', '%20')}&shelf={shelf}">Cancel</a>
-          </div>
-        </form>
-      </div>
-    </div></div>
-    """
+    return render_template(
+        "move_confirm.html",
+        name=item[1],
+        current_location=item[2],
+        new_location=new_location,
+        barcode=barcode,
+        zone_q=urlencode({"zone": zone, "shelf": shelf}),
+    )
 
 
 @app.route("/move-save", methods=["POST"])
@@ -687,119 +796,53 @@ def move_save():
 # ============================================================
 
 @app.route("/inventory")
+@db_etag
+@page_cached
 def inventory_page():
-    status_html = _page_status_html()
     loc_map = _locations_map()
 
-    q = (request.args.get("q", "") or "").strip().lower()
+    q = (request.args.get("q", "") or "").strip()
     zone_filter = (request.args.get("zone", "All") or "All").strip()
+    sort = (request.args.get("sort", "name") or "name").strip()
+    if sort not in INVENTORY_SORTS:
+        sort = "name"
+
+    # Keyset cursor: (sort value, id) of the last row on the previous page
+    after = None
+    after_id = request.args.get("after_id", "")
+    if after_id.isdigit():
+        after_v = request.args.get("after", "")
+        if sort == "qty":
+            try:
+                after_v = int(after_v)
+            except Exception:
+                after_v = 0
+        after = (after_v, int(after_id))
+
+    zone_sql = "" if zone_filter == "All" else zone_filter
+    page, next_cursor = search_inventory(q, zone_sql, sort=sort, after=after, limit=INVENTORY_PAGE_SIZE)
+    matching, total = count_inventory(q, zone_sql)
+
+    filter_args = {"q": q, "zone": zone_filter, "sort": sort}
+    first_url = "/inventory?" + urlencode(filter_args) if after is not None else None
+    next_url = None
+    if next_cursor is not None:
+        next_url = "/inventory?" + urlencode(dict(filter_args, after=next_cursor[0], after_id=next_cursor[1]))
 
-    items = get_inventory()
-
-    def matches(row):
-        barcode, name, location, qty, low = row
-        if q and (q not in name.lower()) and (q not in barcode.lower()):
-            return False
-        if zone_filter != "All":
-            if not str(location).startswith(zone_filter):
-                return False
-        return True
-
-    filtered = [r for r in items if matches(r)]
-
-    zone_options = "<option value='All'>All</option>"
-    for z in sorted(loc_map.keys()):
-        sel = "selected" if z == zone_filter else ""
-        zone_options += f"<option value='{z}' {sel}>{z}</option>"
-
-    rows = ""
-    for barcode, name, location, qty, low in filtered:
-        qty = int(qty)
-        low = int(low) if low is not None else 0
-
-        if qty == 0:
-            qty_cell = f"<span class='qty-zero'>{qty}</span>"
-        elif low > 0 and qty <= low:
-            qty_cell = f"<span class='qty-low'>{qty}</span>"
-        else:
-            qty_cell = str(qty)
-
-        low_cell = str(low) if low else "-"
-
-        rows += f"""
-        <tr>
-          <td>{name}</td>
-          <td>{location}</td>
-          <td>{qty_cell}</td>
-          <td>{low_cell}</td>
-          <td>
-            <form class="inline" method="post" action="/inventory-remove">
-              <input type="hidden" name="barcode" value="{barcode}">
-              <button class="btn btn-danger">-1</button>
-            </form>
-
-            <form class="inline" method="get" action="/stats">
-              <input type="hidden" name="barcode" value="{barcode}">
-              <button class="btn btn-warn">Stats</button>
-            </form>
-
-            <form class="inline" method="post" action="/threshold-set">
-              <input type="hidden" name="barcode" value="{barcode}">
-              <input class="mono" style="width:86px;" type="number" min="0" name="threshold" value="{low}" title="Low threshold">
-              <button class="btn">Set</button>
-            </form>
-
-            <form class="inline" method="post" action="/inventory-delete">
-              <input type="hidden" name="barcode" value="{barcode}">
-              <button class="btn btn-danger">Delete</button>
-            </form>
-          </td>
-        </tr>
-        """
-
-    export_txt = "/export/inventory.txt"
-    print_view = "/print/inventory"
-
-    return f"""
-    {_styles()}{_auto_hide_banner_js()}
-    <div class="wrap"><div class="container">
-      <header>
-        <div><h1>Inventory</h1><div class="sub">Search + filter by zone • Yellow = low stock • Red = out</div></div>
-        <a class="btn" href="/">Home</a>
-      </header>
-
-      {status_html}
-
-      <div class="card">
-        <div class="fieldRow">
-          <a class="btn btn-wide" href="/low-stock">View Low Stock</a>
-          <a class="btn btn-wide" href="{export_txt}">Export as Text</a>
-          <a class="btn btn-wide" href="{print_view}">Print / Save as PDF</a>
-        </div>
-      </div>
-
-      <div class="card">
-        <h2>Search</h2>
-        <form method="get" action="/inventory">
-          <div class="fieldRow">
-            <input type="text" name="q" placeholder="Search by name or barcode" value="{request.args.get('q','')}">
-            <select name="zone">{zone_options}</select>
-            <button class="btn btn-wide" type="submit">Apply</button>
-            <a class="btn" href="/inventory">Clear</a>
-          </div>
-        </form>
-        <div class="muted row">Showing {len(filtered)} of {len(items)} items</div>
-      </div>
-
-      <div class="card">
-        <table>
-          <tr><th>Item</th><th>Location</th><th>Qty</th><th>Low</th><th>Actions</th></tr>
-          {rows if rows else "<tr><td colspan='5' class='muted'>No results.</td></tr>"}
-        </table>
-      </div>
-
-    </div></div>
-    """
+    return render_template(
+        "inventory.html",
+        q=q,
+        loc_map=loc_map,
+        zone_filter=zone_filter,
+        sort_labels={"name": "Sort: Name", "qty": "Sort: Qty", "location": "Sort: Location"},
+        sort=sort,
+        matching=matching,
+        total=total,
+        page=page,
+        first_url=first_url,
+        next_url=next_url,
+        page_size=INVENTORY_PAGE_SIZE,
+    )
 
 
 @app.route("/threshold-set", methods=["POST"])
@@ -828,11 +871,10 @@ def inventory_remove():
     if not barcode:
         return redirect(request.script_root + "/inventory?msgtype=danger&msg=Barcode%20required")
 
-    item = get_item_by_barcode(barcode)
+    item = scan_out(barcode)
     if not item:
         return redirect(request.script_root + "/inventory?msgtype=danger&msg=Item%20not%20found")
 
-    remove_one(barcode)
     return redirect(request.script_root + f"/inventory?msgtype=danger&msg=Removed%20{item[1].replace(' ', '%20')}%20(-1)")
 
 
@@ -855,43 +897,15 @@ def inventory_delete():
 # ============================================================
 
 @app.route("/low-stock")
+@db_etag
+@page_cached
 def low_stock_page():
     zone, shelf, _loc_map = _selected_zone_shelf()
-    status_html = _page_status_html()
-    rows = ""
-    items = get_low_stock()
-
-    for barcode, name, location, qty, low in items:
-        rows += f"""
-        <tr>
-          <td>{name}</td>
-          <td>{location}</td>
-          <td><span class="qty-low">{int(qty)}</span></td>
-          <td>{int(low)}</td>
-          <td>
-            <a class="btn btn-warn" href="/stats?barcode={barcode}">Stats</a>
-          </td>
-        </tr>
-        """
-
-    return f"""
-    {_styles()}{_auto_hide_banner_js()}
-    <div class="wrap"><div class="container">
-      <header>
-        <div><h1>Low Stock</h1><div class="sub">Items where 0 &lt; qty ≤ low threshold</div></div>
-        <a class="btn" href="{_home_url(zone, shelf, focus='scan')}">Back</a>
-      </header>
-
-      {status_html}
-
-      <div class="card">
-        <table>
-          <tr><th>Item</th><th>Location</th><th>Qty</th><th>Low</th><th></th></tr>
-          {rows if rows else "<tr><td colspan='5' class='muted'>Nothing is currently low.</td></tr>"}
-        </table>
-      </div>
-    </div></div>
-    """
+    return render_template(
+        "low_stock.html",
+        back_url=_home_url(zone, shelf, focus='scan'),
+        items=get_low_stock(),
+    )
 
 
 @app.route("/stats")
@@ -904,47 +918,26 @@ def stats_page():
     if not stats.get("found"):
         return redirect(request.script_root + "/inventory?msgtype=danger&msg=Item%20not%20found")
 
-    name = stats["name"]
-    location = stats["location"]
-    qty = stats["quantity"]
-    low = stats["low_threshold"]
-    adds_28 = stats["adds_28"]
-    rem_28 = stats["removes_28"]
-    per_week = stats["per_week"]
-    days_left = stats["est_days_left"]
-
-    days_left_text = f"{days_left} days" if days_left is not None else "Not enough data yet"
-
-    return f"""
-    {_styles()}
-    <div class="wrap"><div class="container">
-      <header>
-        <div><h1>Stats</h1><div class="sub">Last 28 days (simple local math)</div></div>
-        <div class="fieldRow">
-          <a class="btn" href="/inventory">Back</a>
-          <a class="btn" href="/">Home</a>
-        </div>
-      </header>
-
-      <div class="card">
-        <h2>{name}</h2>
-        <div class="muted">Barcode: <span class="chip mono">{barcode}</span></div>
-        <div class="row">
-          <div class="muted">Location <span class="chip">{location}</span></div>
-          <div class="muted">Qty <span class="chip">{qty}</span></div>
-          <div class="muted">Low threshold <span class="chip">{low if low else 0}</span></div>
-        </div>
-      </div>
-
-      <div class="card">
-        <h2>Consumption (last 28 days)</h2>
-        <div class="row muted">Adds: <span class="chip">{adds_28}</span> Removes: <span class="chip">{rem_28}</span></div>
-        <div class="row muted">Estimated removes per week: <span class="chip">{per_week}</span></div>
-        <div class="row muted">Estimated days left (based on removes/day): <span class="chip">{days_left_text}</span></div>
-        <div class="muted">Tip: This becomes more accurate after you’ve used it for a few weeks.</div>
-      </div>
-    </div></div>
-    """
+    return render_template("stats.html", stats=stats, barcode=barcode)
+
+
+@app.route("/forecast")
+@db_etag
+def forecast_page():
+    days_raw = (request.args.get("days", "28") or "28").strip()
+    try:
+        days = int(days_raw)
+    except Exception:
+        days = 28
+    days = min(max(days, 7), 365)
+
+    return render_template(
+        "forecast.html",
+        day_options=(7, 14, 28, 56, 90),
+        days=days,
+        forecast=forecast_all(days),
+        soon_days=FORECAST_SOON_DAYS,
+    )
 
 
 # ============================================================
@@ -952,56 +945,19 @@ def stats_page():
 # ============================================================
 
 @app.route("/grocery-list")
+@db_etag
+@page_cached
 def grocery_list_page():
-    status_html = _page_status_html()
-    items = get_grocery_list()
-
-    export_txt = "/export/grocery.txt"
-    print_view = "/print/grocery"
-    share_view = "/share/grocery"
-
-    lis = ""
-    for row in items:
-        barcode = row[0]
-        name = row[1]
-        lis += f"""
-        <li style="margin: 10px 0; display:flex; align-items:center; gap:10px; flex-wrap:wrap;">
-          <span>{name}</span>
-          <form class="inline" method="post" action="/grocery-remove">
-            <input type="hidden" name="barcode" value="{barcode}">
-            <button class="btn btn-danger">Remove</button>
-          </form>
-        </li>
-        """
-
-    return f"""
-    {_styles()}{_auto_hide_banner_js()}
-    <div class="wrap"><div class="container">
-      <header>
-        <div><h1>Grocery List</h1><div class="sub">Items that hit 0 quantity</div></div>
-        <a class="btn" href="/">Home</a>
-      </header>
-
-      {status_html}
-
-      <div class="card">
-        <div class="fieldRow">
-          <a class="btn btn-wide" href="{share_view}">Send to Phone (QR)</a>
-          <a class="btn btn-wide" href="{export_txt}">Export as Text</a>
-          <a class="btn btn-wide" href="{print_view}">Print / Save as PDF</a>
-        </div>
-        <div class="muted row">Tip: On your phone, “Print / Save as PDF” creates an offline shopping list.</div>
-      </div>
-
-      <div class="card">
-        <h2>List</h2>
-        <ul style="padding-left: 18px; margin: 0;">
-          {lis if lis else "<li class='muted'>Nothing on the grocery list right now.</li>"}
-        </ul>
-      </div>
-
-    </div></div>
-    """
+    soon = [
+        f for f in forecast_all(FORECAST_WINDOW_DAYS)
+        if f["days_left"] is not None and f["quantity"] > 0 and f["days_left"] <= FORECAST_SOON_DAYS
+    ]
+    return render_template(
+        "grocery_list.html",
+        items=get_grocery_list(),
+        soon=soon,
+        soon_days=FORECAST_SOON_DAYS,
+    )
 
 
 @app.route("/grocery-remove", methods=["POST"])
@@ -1026,89 +982,15 @@ def grocery_remove():
 
 @app.route("/tools")
 def tools_page():
-    status_html = _page_status_html()
-    locs = get_locations()
-
-    rows = ""
-    for l in locs:
-        name = l["name"]
-        has_shelves = "Yes" if bool(l["has_shelves"]) else "No"
-        rows += f"""
-        <tr>
-          <td>{name}</td>
-          <td>{has_shelves}</td>
-          <td>
-            <form class="inline" method="post" action="/locations-delete">
-              <input type="hidden" name="name" value="{name}">
-              <button class="btn btn-danger">Delete</button>
-            </form>
-          </td>
-        </tr>
-        """
-
-    return f"""
-    {_styles()}{_auto_hide_banner_js()}
-    <div class="wrap"><div class="container">
-      <header>
-        <div><h1>Tools</h1><div class="sub">Backup / Restore / Locations / Debug</div></div>
-        <a class="btn" href="/">Home</a>
-      </header>
-
-      {status_html}
-
-      <div class="card">
-        <h2>Backup</h2>
-        <div class="muted">Downloads your current inventory database.</div>
-        <div class="row"><a class="btn btn-wide" href="/backup">Download Backup</a></div>
-      </div>
-
-      <div class="card">
-        <h2>Restore</h2>
-        <div class="muted">Upload an inventory.db backup file. After restore, restart the app/service.</div>
-        <form method="post" action="/restore" enctype="multipart/form-data">
-          <div class="fieldRow">
-            <input type="file" name="dbfile" accept=".db">
-            <button class="btn btn-wide btn-danger" type="submit">Restore</button>
-          </div>
-        </form>
-      </div>
-
-      <div class="card">
-        <h2>Locations</h2>
-        <div class="muted">Add zones here so you never edit code to add a new pantry/cabinet/etc.</div>
-
-        <form method="post" action="/locations-add">
-          <div class="fieldRow">
-            <input type="text" name="name" placeholder="New location name (ex: Snack Cabinet)" required>
-            <select name="has_shelves">
-              <option value="1">Has shelves (shows Shelf 1-4)</option>
-              <option value="0">No shelves</option>
-            </select>
-            <button class="btn btn-wide" type="submit">Add</button>
-          </div>
-        </form>
-
-        <div class="row"></div>
-
-        <table>
-          <tr><th>Name</th><th>Has shelves?</th><th>Action</th></tr>
-          {rows if rows else "<tr><td colspan='3' class='muted'>No locations found.</td></tr>"}
-        </table>
-
-        <div class="muted row">Deleting a location here does NOT delete existing items; it only removes the button/filter option.</div>
-      </div>
-
-      <div class="card">
-        <h2>Debug</h2>
-        <div class="muted">View recent scan events (adds/removes/moves) for troubleshooting.</div>
-        <div class="fieldRow">
-          <a class="btn btn-wide" href="/debug/events">View Event Log</a>
-          <a class="btn btn-wide" href="/export/events.txt">Export Events</a>
-        </div>
-      </div>
-
-    </div></div>
-    """
+    return render_template(
+        "tools.html",
+        locations=get_locations(),
+        retention_days=EVENT_RETENTION_DAYS,
+        archive_enabled=EVENT_ARCHIVE_ENABLED,
+        interval_hours=MAINTENANCE_INTERVAL_SECONDS // 3600,
+        cache=page_cache.stats(),
+        import_job=_import_status(),
+    )
 
 
 @app.route("/locations-add", methods=["POST"])
@@ -1128,35 +1010,219 @@ def locations_delete():
     return redirect(request.script_root + f"/tools?msgtype=danger&msg=Deleted%20location%20{name.replace(' ', '%20')}")
 
 
+@app.route("/api/page-cache")
+def api_page_cache():
+    return jsonify(page_cache.stats())
+
+
+@app.route("/maintenance/run", methods=["POST"])
+def maintenance_run():
+    stats = _maintenance_once(force=True)
+    if stats is None:
+        return redirect(
+            request.script_root
+            + "/tools?msgtype=warn&msg=Maintenance%20already%20ran%20or%20was%20skipped"
+        )
+    return redirect(
+        request.script_root
+        + f"/tools?msgtype=ok&msg=Maintenance%20done%20-%20pruned%20{stats['pruned']}%20old%20events"
+    )
+
+
 @app.route("/backup")
 def backup_db():
+    """
+    Consistent snapshot (sqlite backup API, see backup_database) streamed
+    out gzip-compressed. The SHA-256 of the uncompressed .db is in the
+    X-Backup-SHA256 header and, shortened, in the filename:
+      gunzip inventory-<time>-<sha12>.db.gz && sha256sum inventory-*.db
+    """
     if not os.path.exists(DB_PATH):
         return redirect(request.script_root + "/tools?msgtype=danger&msg=Database%20not%20found")
-    return send_file(DB_PATH, as_attachment=True, download_name="inventory.db")
+
+    fd, tmp_path = tempfile.mkstemp(prefix="inventory.backup.", suffix=".tmp", dir=BASE_DIR)
+    os.close(fd)
+    try:
+        info = backup_database(tmp_path)
+    except Exception as e:
+        print("[Backup] failed:", e)
+        os.remove(tmp_path)
+        return redirect(request.script_root + "/tools?msgtype=danger&msg=Backup%20failed")
+    if info["integrity"] != "ok":
+        os.remove(tmp_path)
+        return redirect(request.script_root + "/tools?msgtype=danger&msg=Backup%20failed%20integrity%20check")
+
+    def generate():
+        gz = zlib.compressobj(BACKUP_GZIP_LEVEL, zlib.DEFLATED, 31)  # 31 = gzip container
+        with open(tmp_path, "rb") as f:
+            for block in iter(lambda: f.read(BACKUP_STREAM_CHUNK), b""):
+                data = gz.compress(block)
+                if data:
+                    yield data
+        yield gz.flush()
+
+    filename = f"inventory-{time.strftime('%Y%m%d-%H%M%S')}-{info['sha256'][:12]}.db.gz"
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "Cache-Control": "no-store",
+        "X-Backup-SHA256": info["sha256"],
+        "X-Backup-Integrity": info["integrity"],
+        "X-Backup-Bytes": str(info["bytes"]),
+    }
+    resp = Response(generate(), mimetype="application/gzip", headers=headers)
+    # Not in generate()'s finally: a body that is never iterated (HEAD, or
+    # the client gone before the first chunk) would leave the snapshot behind
+    resp.call_on_close(lambda: os.remove(tmp_path))
+    return resp
+
+
+def _stage_upload(f) -> str:
+    """
+    Saves an uploaded .db or .db.gz to a temp file next to the DB
+    (gunzipped, capped at RESTORE_MAX_BYTES) and returns its path.
+    """
+    fd, path = tempfile.mkstemp(prefix="inventory.restore.", suffix=".tmp", dir=BASE_DIR)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            head = f.stream.read(2)
+            src = f.stream
+            if head == b"\x1f\x8b":
+                f.stream.seek(0)
+                src = gzip.GzipFile(fileobj=f.stream, mode="rb")
+            else:
+                out.write(head)
+            written = len(head) if src is f.stream else 0
+            for block in iter(lambda: src.read(BACKUP_STREAM_CHUNK), b""):
+                written += len(block)
+                if written > RESTORE_MAX_BYTES:
+                    raise ValueError("file is too large")
+                out.write(block)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
 
 
 @app.route("/restore", methods=["POST"])
 def restore_db():
+    """
+    Live restore, no restart: stage the upload, validate and migrate the
+    staged copy (db.prepare_restore), then swap it in atomically
+    (restore_database) and drop every cached page.
+    """
     f = request.files.get("dbfile")
     if not f:
         return redirect(request.script_root + "/tools?msgtype=danger&msg=No%20file%20selected")
 
-    f.save(UPLOAD_TMP)
+    try:
+        staged = _stage_upload(f)
+    except Exception as e:
+        return redirect(request.script_root + "/tools?" + urlencode({"msgtype": "danger", "msg": f"Restore rejected: {e}"}))
 
     try:
-        if os.path.getsize(UPLOAD_TMP) < 1000:
-            os.remove(UPLOAD_TMP)
-            return redirect(request.script_root + "/tools?msgtype=danger&msg=Uploaded%20file%20looks%20invalid")
-    except Exception:
-        pass
+        info = _db.prepare_restore(staged)
+        restore_database(staged)
+    except ValueError as e:
+        return redirect(request.script_root + "/tools?" + urlencode({"msgtype": "danger", "msg": f"Restore rejected: {e}"}))
+    except Exception as e:
+        print("[Restore] failed:", e)
+        return redirect(request.script_root + "/tools?msgtype=danger&msg=Restore%20failed")
+    finally:
+        os.remove(staged)
+
+    page_cache.clear()
+    msg = f"Restore complete - {info['items']} items"
+    return redirect(request.script_root + "/tools?" + urlencode({"msgtype": "ok", "msg": msg}))
+
+
+# ------------------------------------------------------------
+# CSV import (inventory_import.py). Runs in a background thread so the
+# worker keeps answering scans; the Tools page polls /api/import for
+# progress. The job record lives in app_meta, so whichever worker gets
+# the poll (or a second upload) sees the same job.
+# ------------------------------------------------------------
+IMPORT_JOB_KEY = "import_job"
+
+
+def _import_status() -> dict:
+    try:
+        return json.loads(meta_get(IMPORT_JOB_KEY) or '{"state": "idle"}')
+    except ValueError:
+        return {"state": "idle"}
+
+
+def _import_update(**fields):
+    def merge(old):
+        job = json.loads(old) if old else {}
+        job.update(fields, heartbeat=time.time())
+        return json.dumps(job)
+    meta_update(IMPORT_JOB_KEY, merge)
+
+
+def _import_claim(filename: str) -> bool:
+    """
+    Starts a job record unless another worker's import is still running
+    (a "running" job with no progress for IMPORT_STALE_SECONDS died with
+    its worker and doesn't count).
+    """
+    def claim(old):
+        job = json.loads(old) if old else {}
+        if job.get("state") == "running" and time.time() - job.get("heartbeat", 0) < IMPORT_STALE_SECONDS:
+            return None
+        return json.dumps({"state": "running", "file": filename, "rows": 0, "added": 0, "updated": 0,
+                           "errors": 0, "heartbeat": time.time()})
+    return meta_update(IMPORT_JOB_KEY, claim) is not None
+
+
+def _import_worker(path: str):
+    try:
+        with open(path, "r", encoding="utf-8-sig", errors="replace", newline="") as f:
+            totals = inventory_import.run_import(f, IMPORT_ERRORS_PATH, progress=lambda t: _import_update(**t))
+        _import_update(**totals, state="done", finished=time.time())
+    except ValueError as e:
+        _import_update(state="failed", message=str(e))
+    except Exception as e:
+        print("[Import] failed:", e)
+        _import_update(state="failed", message="see the kitchen service log")
+    finally:
+        os.remove(path)
+
+
+@app.route("/import", methods=["POST"])
+def import_csv():
+    f = request.files.get("csvfile")
+    if not f or not f.filename:
+        return redirect(request.script_root + "/tools?msgtype=danger&msg=No%20file%20selected")
+
+    if not _import_claim(f.filename):
+        return redirect(request.script_root + "/tools?msgtype=danger&msg=An%20import%20is%20already%20running")
 
+    fd, path = tempfile.mkstemp(prefix="inventory.import.", suffix=".tmp", dir=BASE_DIR)
     try:
-        shutil.copy2(UPLOAD_TMP, DB_PATH)
-        os.remove(UPLOAD_TMP)
+        with os.fdopen(fd, "wb") as out:
+            f.save(out)
+        if os.path.exists(IMPORT_ERRORS_PATH):
+            os.remove(IMPORT_ERRORS_PATH)
     except Exception:
-        return redirect(request.script_root + "/tools?msgtype=danger&msg=Restore%20failed")
+        os.remove(path)
+        _import_update(state="failed", message="upload failed")
+        raise
+
+    threading.Thread(target=_import_worker, args=(path,), daemon=True).start()
+    return redirect(request.script_root + "/tools?" + urlencode({"msgtype": "ok", "msg": f"Importing {f.filename}..."}))
+
 
-    return redirect(request.script_root + "/tools?msgtype=ok&msg=Restore%20complete%20-%20restart%20the%20app")
+@app.route("/api/import")
+def api_import():
+    return jsonify(_import_status())
+
+
+@app.route("/import/errors.csv")
+def import_errors():
+    if not os.path.exists(IMPORT_ERRORS_PATH):
+        return redirect(request.script_root + "/tools?msgtype=danger&msg=No%20rejected%20rows")
+    return send_file(IMPORT_ERRORS_PATH, mimetype="text/csv", as_attachment=True,
+                     download_name="import_errors.csv", max_age=0)
 
 
 # ============================================================
@@ -1165,7 +1231,6 @@ def restore_db():
 
 @app.route("/debug/events")
 def debug_events():
-    status_html = _page_status_html()
     limit = (request.args.get("limit", "200") or "200").strip()
     try:
         limit_i = int(limit)
@@ -1176,57 +1241,7 @@ def debug_events():
     if limit_i > 2000:
         limit_i = 2000
 
-    rows = ""
-    events = get_event_log(limit_i)
-    for e in events:
-        created_at = e["created_at"]
-        barcode = e["barcode"]
-        etype = e["event_type"]
-        delta = e["delta"]
-        source = e["source"]
-        dclass = "qty-low" if int(delta) > 0 else ("qty-zero" if int(delta) < 0 else "muted")
-        rows += f"""
-        <tr>
-          <td class="mono">{created_at}</td>
-          <td class="mono">{barcode}</td>
-          <td>{etype}</td>
-          <td><span class="{dclass}">{delta}</span></td>
-          <td class="muted">{source}</td>
-        </tr>
-        """
-
-    return f"""
-    {_styles()}{_auto_hide_banner_js()}
-    <div class="wrap"><div class="container">
-      <header>
-        <div><h1>Event Log</h1><div class="sub">Most recent events (debug)</div></div>
-        <div class="fieldRow">
-          <a class="btn" href="/tools">Back</a>
-          <a class="btn" href="/export/events.txt">Export</a>
-        </div>
-      </header>
-
-      {status_html}
-
-      <div class="card">
-        <form method="get" action="/debug/events">
-          <div class="fieldRow">
-            <span class="muted">Show last</span>
-            <input class="mono" style="width:120px;" type="number" name="limit" min="20" max="2000" value="{limit_i}">
-            <span class="muted">events</span>
-            <button class="btn" type="submit">Apply</button>
-          </div>
-        </form>
-      </div>
-
-      <div class="card">
-        <table>
-          <tr><th>Time</th><th>Barcode</th><th>Type</th><th>Δ</th><th>Source</th></tr>
-          {rows if rows else "<tr><td colspan='5' class='muted'>No events yet.</td></tr>"}
-        </table>
-      </div>
-    </div></div>
-    """
+    return render_template("debug_events.html", limit=limit_i, events=get_event_log(limit_i))
 
 
 # ============================================================
@@ -1236,182 +1251,87 @@ def debug_events():
 @app.route("/share/grocery")
 def share_grocery():
     if qrcode is None:
-        return f"""
-        {_styles()}
-        <div class="wrap"><div class="container">
-          <header>
-            <div><h1>Send Grocery List to Phone</h1><div class="sub">QR code</div></div>
-            <a class="btn" href="/grocery-list">Back</a>
-          </header>
-
-          <div class="card">
-            <div class="muted">QR feature is not installed.</div>
-            <div class="muted">Fix:</div>
-            <pre style="white-space:pre-wrap;">cd ~/kitchen_inventory
-source venv/bin/activate
-pip install qrcode[pil]</pre>
-          </div>
-        </div></div>
-        """
-
-    base_url = _get_base_url()
-    share_url = base_url + "/grocery-list"
-
-    return f"""
-    {_styles()}
-    <div class="wrap"><div class="container">
-      <header>
-        <div><h1>Send Grocery List to Phone</h1><div class="sub">Scan this with your phone camera</div></div>
-        <a class="btn" href="/grocery-list">Back</a>
-      </header>
-
-      <div class="card" style="text-align:center;">
-        <div style="display:inline-block; background:#fff; padding:10px; border-radius:14px;">
-          <img alt="QR" src="/qr?path=/grocery-list" style="width:180px; height:180px;">
-        </div>
-
-        <div class="row"></div>
-
-        <div class="muted">If QR doesn’t work, open this link on your phone:</div>
-        <div class="chip" style="user-select:all; display:inline-block; margin-top:10px;">{share_url}</div>
-      </div>
-    </div></div>
+        return render_template("share_grocery.html", share_url=None)
+    share_url = _get_base_url() + "/grocery-list"
+    return render_template("share_grocery.html", share_url=share_url, qr_tag=_qr_tag(share_url))
+
+
+# ------------------------------------------------------------
+# Export helpers (formatting lives in exports.py)
+# ------------------------------------------------------------
+def _stream_page(template: str, **context):
+    """
+    Streams a template as it renders (rows come from generators), joined
+    into chunks so a long page isn't one socket write per Jinja fragment.
     """
+    return Response(exports.chunked(stream_template(template, **context)), mimetype="text/html")
 
 
-@app.route("/export/grocery.txt")
-def export_grocery_txt():
-    items = get_grocery_list()
-    lines = ["StockPi Grocery List", "==================", ""]
-    if not items:
-        lines.append("(Empty)")
-    else:
-        for row in items:
-            lines.append(f"- {row[1]}")
-    content = "\n".join(lines) + "\n"
-
-    return f"""
-    {_styles()}
-    <div class="wrap"><div class="container">
-      <header>
-        <div><h1>Export: Grocery List</h1><div class="sub">Plain text view</div></div>
-        <div class="fieldRow">
-          <a class="btn" href="/">Home</a>
-          <a class="btn" href="/grocery-list">Back</a>
-          <a class="btn" href="/export/grocery.raw">Download .txt</a>
-        </div>
-      </header>
-
-      <div class="card">
-        <pre style="white-space:pre-wrap;">{content}</pre>
-      </div>
-    </div></div>
+def _export_view(kind: str, title: str, sub: str, links, pre_style: str, mono=False, **opts):
+    """
+    HTML preview of a txt export: the streamed text inside a <pre>.
+    links: (label, href) pairs for the header buttons.
     """
+    return _stream_page(
+        "export_view.html",
+        title=title,
+        sub=sub,
+        links=links,
+        mono=mono,
+        pre_style=pre_style,
+        chunks=exports.stream(kind, "txt", **opts),
+    )
 
 
-@app.route("/export/grocery.raw")
-def export_grocery_raw():
-    items = get_grocery_list()
-    lines = ["StockPi Grocery List", "==================", ""]
-    if not items:
-        lines.append("(Empty)")
-    else:
-        for row in items:
-            lines.append(f"- {row[1]}")
-    content = "\n".join(lines) + "\n"
-    return Response(content, mimetype="text/plain")
+def _event_export_limit(default=500):
+    """
+    ?limit= for event downloads: a row count, or "all" / 0 for the whole log.
+    """
+    raw = (request.args.get("limit", str(default)) or str(default)).strip().lower()
+    if raw in ("all", "0"):
+        return None
+    try:
+        return max(1, int(raw))
+    except Exception:
+        return default
+
+
+@app.route("/export/grocery.txt")
+@db_etag
+def export_grocery_txt():
+    links = [
+        ("Home", "/"),
+        ("Back", "/grocery-list"),
+        ("Download .txt", "/export/grocery.raw"),
+        ("CSV", "/export/grocery.csv"),
+    ]
+    return _export_view("grocery", "Export: Grocery List", "Plain text view", links, "white-space:pre-wrap;")
 
 
 # ------------------------------------------------------------
 # Inventory export (readable columns)
 # ------------------------------------------------------------
 @app.route("/export/inventory.txt")
+@db_etag
 def export_inventory_txt():
-    items = get_inventory()
-
-    def cap(s, n):
-        s = (s or "").strip()
-        return s if len(s) <= n else (s[: n - 1] + "…")
-
-    NAME_W = 30
-    LOC_W = 22
-    QTY_W = 3
-
-    lines = []
-    lines.append("StockPi Inventory (Readable Export)")
-    lines.append("=================================")
-    lines.append("")
-    header = f"{'ITEM':<{NAME_W}}  {'LOCATION':<{LOC_W}}  {'QTY':>{QTY_W}}  {'LOW':>3}  BARCODE"
-    lines.append(header)
-    lines.append("-" * len(header))
-
-    if not items:
-        lines.append("(Empty)")
-    else:
-        for barcode, name, location, qty, low in items:
-            low_i = int(low) if low else 0
-            lines.append(
-                f"{cap(name, NAME_W):<{NAME_W}}  {cap(location, LOC_W):<{LOC_W}}  {int(qty):>{QTY_W}}  {low_i:>3}  {barcode}"
-            )
-
-    content = "\n".join(lines) + "\n"
-
-    return f"""
-    {_styles()}
-    <div class="wrap"><div class="container">
-      <header>
-        <div><h1>Export: Inventory</h1><div class="sub">Readable table</div></div>
-        <div class="fieldRow">
-          <a class="btn" href="/">Home</a>
-          <a class="btn" href="/inventory">Back</a>
-          <a class="btn" href="/export/inventory.raw">Download .txt</a>
-        </div>
-      </header>
-
-      <div class="card">
-        <pre class="mono" style="white-space:pre; overflow-x:auto;">{content}</pre>
-      </div>
-    </div></div>
-    """
-
-
-@app.route("/export/inventory.raw")
-def export_inventory_raw():
-    items = get_inventory()
-
-    def cap(s, n):
-        s = (s or "").strip()
-        return s if len(s) <= n else (s[: n - 1] + "…")
-
-    NAME_W = 30
-    LOC_W = 22
-    QTY_W = 3
-
-    lines = []
-    lines.append("StockPi Inventory (Readable Export)")
-    lines.append("=================================")
-    lines.append("")
-    header = f"{'ITEM':<{NAME_W}}  {'LOCATION':<{LOC_W}}  {'QTY':>{QTY_W}}  {'LOW':>3}  BARCODE"
-    lines.append(header)
-    lines.append("-" * len(header))
-
-    if not items:
-        lines.append("(Empty)")
-    else:
-        for barcode, name, location, qty, low in items:
-            low_i = int(low) if low else 0
-            lines.append(
-                f"{cap(name, NAME_W):<{NAME_W}}  {cap(location, LOC_W):<{LOC_W}}  {int(qty):>{QTY_W}}  {low_i:>3}  {barcode}"
-            )
-
-    content = "\n".join(lines) + "\n"
-    return Response(content, mimetype="text/plain")
+    links = [
+        ("Home", "/"),
+        ("Back", "/inventory"),
+        ("Download .txt", "/export/inventory.raw"),
+        ("CSV", "/export/inventory.csv"),
+        ("JSONL", "/export/inventory.jsonl"),
+    ]
+    return _export_view(
+        "inventory", "Export: Inventory", "Readable table", links,
+        "white-space:pre; overflow-x:auto;", mono=True,
+    )
 
 
 # ------------------------------------------------------------
 # Export events (debug)
 # ------------------------------------------------------------
 @app.route("/export/events.txt")
+@db_etag
 def export_events_txt():
     limit = (request.args.get("limit", "500") or "500").strip()
     try:
@@ -1423,142 +1343,112 @@ def export_events_txt():
     if limit_i > 5000:
         limit_i = 5000
 
-    events = get_event_log(limit_i)
-
-    lines = []
-    lines.append("StockPi Event Log (Debug Export)")
-    lines.append("================================")
-    lines.append("")
-    lines.append("time | barcode | type | delta | source")
-    lines.append("--------------------------------------")
-
-    for e in events:
-        lines.append(f"{e['created_at']} | {e['barcode']} | {e['event_type']} | {e['delta']} | {e['source']}")
-
-    content = "\n".join(lines) + "\n"
-
-    return f"""
-    {_styles()}
-    <div class="wrap"><div class="container">
-      <header>
-        <div><h1>Export: Events</h1><div class="sub">Debug log (most recent first)</div></div>
-        <div class="fieldRow">
-          <a class="btn" href="/tools">Back</a>
-          <a class="btn" href="/export/events.raw?limit={limit_i}">Download .txt</a>
-        </div>
-      </header>
-
-      <div class="card">
-        <pre style="white-space:pre-wrap;" class="mono">{content}</pre>
-      </div>
-    </div></div>
-    """
-
-
-@app.route("/export/events.raw")
-def export_events_raw():
-    limit = (request.args.get("limit", "500") or "500").strip()
-    try:
-        limit_i = int(limit)
-    except Exception:
-        limit_i = 500
-    if limit_i < 50:
-        limit_i = 50
-    if limit_i > 5000:
-        limit_i = 5000
-
-    events = get_event_log(limit_i)
+    links = [
+        ("Back", "/tools"),
+        ("Download .txt", f"/export/events.raw?limit={limit_i}"),
+        ("All (CSV)", "/export/events.csv?limit=all"),
+        ("All (JSONL)", "/export/events.jsonl?limit=all"),
+    ]
+    return _export_view(
+        "events", "Export: Events", "Debug log (most recent first)", links,
+        "white-space:pre-wrap;", mono=True, limit=limit_i,
+    )
 
-    lines = []
-    lines.append("StockPi Event Log (Debug Export)")
-    lines.append("================================")
-    lines.append("")
-    lines.append("time | barcode | type | delta | source")
-    lines.append("--------------------------------------")
 
-    for e in events:
-        lines.append(f"{e['created_at']} | {e['barcode']} | {e['event_type']} | {e['delta']} | {e['source']}")
+# ------------------------------------------------------------
+# Downloads: /export/<kind>.raw (plain text), .csv, .jsonl
+# ------------------------------------------------------------
+@app.route("/export/<kind>.<fmt>")
+@db_etag
+def export_download(kind, fmt):
+    fmt = "txt" if fmt == "raw" else fmt
+    if kind not in exports.EXPORTS or fmt not in exports.FORMATS:
+        return Response("Unknown export", mimetype="text/plain", status=404)
 
-    content = "\n".join(lines) + "\n"
-    return Response(content, mimetype="text/plain")
+    opts = {"limit": _event_export_limit()} if kind == "events" else {}
+    headers = {}
+    if fmt != "txt":
+        headers["Content-Disposition"] = f'attachment; filename="stockpi-{kind}.{fmt}"'
+    return Response(exports.stream(kind, fmt, **opts), mimetype=exports.FORMATS[fmt], headers=headers)
 
 
 @app.route("/print/grocery")
+@db_etag
+@page_cached
 def print_grocery():
-    items = get_grocery_list()
-    rows = ""
-    for row in items:
-        rows += f"<li style='margin:10px 0;font-size:20px;'>{row[1]}</li>"
-    if not rows:
-        rows = "<li style='margin:10px 0;font-size:20px;'>(Empty)</li>"
-
-
-    return f"""<!doctype html>
-<html><head>
-  <meta charset="utf-8">
-  <meta name="viewport" content="width=device-width, initial-scale=1">
-  <title>StockPi Grocery List</title>
-  <style>
-    :root{{--bg:#0f1115;--text:#e7e9ee;--muted:#a8b0c2;--border:#2a3142;}}
-    *{{box-sizing:border-box;margin:0;padding:0}}
-    body{{background:var(--bg);color:var(--text);font-family:system-ui,sans-serif;padding:24px;}}
-    h1{{font-size:24px;margin-bottom:8px;}}
-    .sub{{color:var(--muted);font-size:14px;margin-bottom:20px;}}
-    ul{{padding-left:22px;}} li{{margin:10px 0;font-size:20px;}}
-    @media print{{body{{background:#fff;color:#000;}}}}
-  </style>
-</head><body>
-  <h1>StockPi Grocery List</h1>
-  <div class="sub">Print this page or save as PDF.</div>
-  <ul>{rows}</ul>
-</body></html>"""
-
+    return _stream_page("print_grocery.html", items=iter_grocery_list())
 
 
 @app.route("/print/inventory")
+@db_etag
+@page_cached
 def print_inventory():
-    items = get_inventory()
-    rows = ""
-    for barcode, name, location, qty, low in items:
-        rows += f"""
-          <tr>
-            <td style="padding:10px;border-bottom:1px solid #ddd;">{name}</td>
-            <td style="padding:10px;border-bottom:1px solid #ddd;">{location}</td>
-            <td style="padding:10px;border-bottom:1px solid #ddd; font-weight:700;">{qty}</td>
-            <td style="padding:10px;border-bottom:1px solid #ddd; color:#777;">{low if low else 0}</td>
-            <td style="padding:10px;border-bottom:1px solid #ddd; color:#777;">{barcode}</td>
-          </tr>
-        """
-    if not rows:
-        rows = "<tr><td colspan='5' style='padding:10px;'>(Empty)</td></tr>"
-
-    return f"""
-    <html>
-    <head>
-      <meta charset="utf-8">
-      <meta name="viewport" content="width=device-width, initial-scale=1">
-      <title>StockPi Inventory</title>
-    </head>
-    <body style="font-family:system-ui,Segoe UI,Roboto,Arial; padding:18px;">
-      <h1 style="margin:0 0 12px 0;">StockPi Inventory</h1>
-      <div style="color:#555; margin-bottom:14px;">Print this page or “Save as PDF” on your phone.</div>
-      <table style="width:100%; border-collapse:collapse;">
-        <tr>
-          <th style="text-align:left;padding:10px;border-bottom:2px solid #333;">Item</th>
-          <th style="text-align:left;padding:10px;border-bottom:2px solid #333;">Location</th>
-          <th style="text-align:left;padding:10px;border-bottom:2px solid #333;">Qty</th>
-          <th style="text-align:left;padding:10px;border-bottom:2px solid #333;">Low</th>
-          <th style="text-align:left;padding:10px;border-bottom:2px solid #333;">Barcode</th>
-        </tr>
-        {rows}
-      </table>
-    </body>
-    </html>
+    return _stream_page("print_inventory.html", items=iter_inventory())
+
+
+# ------------------------------------------------------------
+# QR cache: memory LRU in front of qr_cache/ on disk, keyed by a hash
+# of the full URL the code points at
+# ------------------------------------------------------------
+qr_cache = PageCache(QR_CACHE_MAX_ENTRIES, QR_CACHE_MAX_ENTRIES * 64 * 1024)
+
+
+def _qr_tag(full_url: str) -> str:
+    return hashlib.sha256(full_url.encode("utf-8")).hexdigest()[:16]
+
+
+def _prune_qr_dir():
+    try:
+        names = [os.path.join(QR_CACHE_DIR, n) for n in os.listdir(QR_CACHE_DIR) if n.endswith(".png")]
+        if len(names) <= QR_DISK_MAX_FILES:
+            return
+        names.sort(key=os.path.getmtime)
+        for path in names[: len(names) - QR_DISK_MAX_FILES]:
+            os.remove(path)
+    except OSError:
+        pass
+
+
+def _qr_png(full_url: str) -> bytes:
+    """
+    PNG bytes for a QR code of full_url. qrcode + PIL takes tens of ms
+    on a Pi, so each URL is drawn once and then served from memory, or
+    from disk after a restart.
     """
+    tag = _qr_tag(full_url)
+    hit = qr_cache.get("qr", tag)
+    if hit is not None:
+        return hit[0]
+
+    path = os.path.join(QR_CACHE_DIR, tag + ".png")
+    try:
+        with open(path, "rb") as f:
+            png = f.read()
+    except OSError:
+        buf = io.BytesIO()
+        qrcode.make(full_url).save(buf, format="PNG")
+        png = buf.getvalue()
+        try:
+            os.makedirs(QR_CACHE_DIR, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(png)
+            os.replace(tmp, path)
+            _prune_qr_dir()
+        except OSError:
+            pass
+
+    qr_cache.put("qr", tag, png, "image/png")
+    return png
 
 
 @app.route("/qr")
 def qr_png():
+    """
+    QR PNG for base URL + ?path=. The ETag is the hash of the encoded URL.
+    Pages link it with &v=<that hash>, so a matching ?v= response can be
+    cached as immutable (a new LAN IP means a new link).
+    """
     if qrcode is None:
         return Response("QR feature requires: pip install qrcode[pil]", mimetype="text/plain", status=500)
 
@@ -1568,12 +1458,18 @@ def qr_png():
 
     base = _get_base_url()
     full_url = base + path
+    tag = _qr_tag(full_url)
 
-    img = qrcode.make(full_url)
-    buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    buf.seek(0)
-    return Response(buf.getvalue(), mimetype="image/png")
+    if request.if_none_match.contains(tag):
+        resp = Response(status=304)
+    else:
+        resp = Response(_qr_png(full_url), mimetype="image/png")
+    resp.set_etag(tag)
+    if request.args.get("v") == tag:
+        resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    else:
+        resp.headers["Cache-Control"] = "no-cache"
+    return resp
 
 
 # ============================================================
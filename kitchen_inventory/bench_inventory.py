@@ -0,0 +1,350 @@
+# ============================================================
+# FILE: bench_inventory.py
+# StockPi — Micro-benchmark for inventory.py hot paths
+#
+# Runs against a throwaway database in a temp dir (never touches
+# inventory.db). Reports operations/sec for the scan hot paths in
+# two modes:
+#   - per-op : old behaviour (fresh connection + PRAGMAs + schema
+#              check on every call)
+#   - pooled : per-thread persistent connection
+#
+# Before timing, asserts (EXPLAIN QUERY PLAN) that the hot read
+# queries use their indexes, so a schema change that silently drops
+# one fails loudly here, and runs a few behaviour checks on edge cases
+# that once went wrong.
+#
+# Then simulates several scanning stations hitting the DB at once,
+# as threads (gunicorn gthread) and as processes (several workers),
+# optionally with a backup + full export running alongside. Each station
+# mixes single scans, apply_scans() bursts and barcode lookups (the last
+# two go through the in-memory item index). Reports throughput, per-op
+# latency and full index rebuilds, and checks no scan was lost (the
+# stations' +1/-1 scans must net out to the starting total). Threads in
+# one process must not rebuild the index at all.
+#
+# Usage:
+#   python bench_inventory.py            # default 2000 ops per case
+#   python bench_inventory.py -n 5000
+#   python bench_inventory.py --stations 1,4,8 --station-ops 800
+# ============================================================
+
+# ============================================================
+# SECTION: Imports
+# ============================================================
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+import db as _db
+import inventory
+
+# ============================================================
+# SECTION: Setup
+# ============================================================
+
+def _setup(tmpdir: str, n_items: int = 200):
+    """
+    Points db.py + inventory.py at a temp database and seeds it.
+    """
+    path = os.path.join(tmpdir, "bench.db")
+    _db.DB_NAME = path
+    inventory.DB_PATH = path
+    inventory.close_connections()
+
+    _db.init_db()
+    for i in range(n_items):
+        inventory.add_item(f"BENCH{i:06d}", f"Bench Item {i}", "Pantry Shelf 1")
+    return [f"BENCH{i:06d}" for i in range(n_items)]
+
+
+# ============================================================
+# SECTION: Query Plan Checks
+# ============================================================
+
+# (label, sql, params, index that must appear in the plan)
+PLAN_CHECKS = [
+    ("item stats", inventory.STATS_USAGE_SQL, (1, "2000-01-01"), "PRIMARY KEY"),
+    ("item search", inventory.ITEM_SEARCH_SQL, {"fts": '"bench"*', "limit": 20}, "VIRTUAL TABLE INDEX"),
+    ("inventory page", inventory.INVENTORY_PAGE_SQL, {"after_v": "m", "after_id": 0, "limit": 101}, "idx_items_name_nocase"),
+    ("low stock", inventory.LOW_STOCK_SQL, (), "idx_items_low_stock"),
+]
+
+
+def _check_plans():
+    conn = inventory._connect()
+    try:
+        for label, sql, params, index in PLAN_CHECKS:
+            plan = " | ".join(r["detail"] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+            assert index in plan, f"{label}: expected {index}, got plan: {plan}"
+            print(f"plan ok   {label:<20} {plan}")
+    finally:
+        inventory._release(conn)
+    print()
+
+
+# ============================================================
+# SECTION: Behaviour Checks
+# ============================================================
+
+def _usage(barcode: str):
+    conn = inventory._connect()
+    try:
+        row = conn.execute(
+            """
+            SELECT COALESCE(SUM(u.adds), 0), COALESCE(SUM(u.removes), 0)
+            FROM daily_item_usage u JOIN items i ON i.id = u.item_id
+            WHERE i.barcode = ?;
+            """,
+            (barcode,),
+        ).fetchone()
+        events = conn.execute("SELECT COUNT(*) FROM event_log WHERE barcode = ?;", (barcode,)).fetchone()[0]
+        return row[0], row[1], events
+    finally:
+        inventory._release(conn)
+
+
+def _check_floored_batch():
+    # A batch remove past 0 counts what was there, not what was asked for
+    inventory.add_item("CHECK-FLOOR", "Check Item", "Pantry")
+    inventory.apply_scans([("CHECK-FLOOR", 2)])
+    adds, _removes, events = _usage("CHECK-FLOOR")
+
+    result = inventory.apply_scans([("CHECK-FLOOR", -5), ("CHECK-FLOOR", -1)])
+    assert result == [("CHECK-FLOOR", "floored"), ("CHECK-FLOOR", "floored")], result
+    assert inventory.get_item_by_barcode("CHECK-FLOOR")[3] == 0
+    usage = _usage("CHECK-FLOOR")
+    assert usage == (adds, 3, events + 1), f"floored batch: (adds, removes, events) = {usage}"
+    inventory.delete_item("CHECK-FLOOR")
+    print("check ok  floored batch scans log the applied change")
+
+
+def _check_floored_scan():
+    # scan_out at 0 still answers with the item but logs no usage
+    inventory.add_item("CHECK-FLOOR", "Check Item", "Pantry")
+    adds, _removes, events = _usage("CHECK-FLOOR")
+
+    for _ in range(4):
+        item = inventory.scan_out("CHECK-FLOOR")
+        assert item is not None and item[3] == 0, item
+    usage = _usage("CHECK-FLOOR")
+    assert usage == (adds, 1, events + 1), f"floored scan_out: (adds, removes, events) = {usage}"
+    inventory.delete_item("CHECK-FLOOR")
+    print("check ok  scan_out at 0 logs no remove")
+
+
+def _check_barcode_variants():
+    # UPC-A and its EAN-13 form both cached: each finds its own name
+    inventory.import_product_names(
+        [("123456789012", "Exact UPC"), ("0123456789012", "Padded EAN")], source="check"
+    )
+    assert inventory.lookup_name_by_barcode("123456789012") == "Exact UPC"
+    assert inventory.lookup_name_by_barcode("0123456789012") == "Padded EAN"
+    inventory.import_product_names([("0999999999999", "Only EAN")], source="check")
+    assert inventory.lookup_name_by_barcode("999999999999") == "Only EAN"
+    print("check ok  barcode_cache prefers the exact barcode over its variant")
+
+
+def _check_behaviour():
+    _check_floored_batch()
+    _check_floored_scan()
+    _check_barcode_variants()
+    print()
+
+
+# ============================================================
+# SECTION: Runner
+# ============================================================
+
+def _run(fn, barcodes, n: int, per_op: bool) -> float:
+    """
+    Calls fn(barcode) n times and returns ops/sec.
+    per_op=True drops the pooled connection and schema flag after each
+    call, which reproduces the old connect-per-operation cost.
+    """
+    inventory.close_connections()
+    start = time.perf_counter()
+    for i in range(n):
+        fn(barcodes[i % len(barcodes)])
+        if per_op:
+            inventory.close_connections()
+    elapsed = time.perf_counter() - start
+    return n / elapsed if elapsed > 0 else float("inf")
+
+
+# ============================================================
+# SECTION: Concurrency (parallel scanning stations)
+# ============================================================
+
+def _station(barcodes, n: int, seed: int, start, out):
+    """
+    One scanning station: n operations on random items, cycling through
+    scan in, scan out, a +1/-1 apply_scans() burst and a barcode lookup
+    (every four ops net out to 0). Appends (latencies, errors) to out.
+    """
+    rnd = random.Random(seed)
+    latencies = []
+    errors = 0
+    start.wait()
+    for i in range(n):
+        barcode = rnd.choice(barcodes)
+        t0 = time.perf_counter()
+        try:
+            if i % 4 == 0:
+                inventory.scan_in(barcode)
+            elif i % 4 == 1:
+                inventory.scan_out(barcode)
+            elif i % 4 == 2:
+                inventory.apply_scans([(barcode, 1), (rnd.choice(barcodes), -1)])
+            else:
+                inventory.get_item_by_barcode(barcode)
+        except sqlite3.Error:
+            errors += 1
+        latencies.append(time.perf_counter() - t0)
+    out.append((latencies, errors))
+
+
+def _station_process(db_path, barcodes, n, seed, start, queue):
+    # Fresh interpreter (spawn): point it at the bench DB, like a worker
+    inventory.DB_PATH = db_path
+    out = []
+    _station(barcodes, n, seed, start, out)
+    queue.put(out[0] + (inventory._index_rebuilds,))
+
+
+def _background_load(stop, tmpdir: str):
+    """
+    What used to block every scanner: backups and full exports, back to back.
+    """
+    dest = os.path.join(tmpdir, "bench-backup.db")
+    while not stop.is_set():
+        inventory.backup_database(dest)
+        os.remove(dest)
+        for _row in inventory.iter_event_log(None):
+            pass
+
+
+def _total_quantity() -> int:
+    conn = inventory._connect()
+    try:
+        return conn.execute("SELECT SUM(quantity) FROM items;").fetchone()[0]
+    finally:
+        inventory._release(conn)
+
+
+def _run_stations(barcodes, stations: int, n: int, mode: str, tmpdir: str, load=False):
+    """
+    Returns (ops/sec, p50 ms, p95 ms, errors, lost scans, index rebuilds).
+    mode: "threads" or "procs".
+    """
+    before = _total_quantity()
+    # Catch up with earlier runs' writes (other processes) before counting
+    inventory.resolve_barcode(barcodes[0])
+    rebuilds_before = inventory._index_rebuilds
+    stop = threading.Event()
+    loader = None
+    if load:
+        loader = threading.Thread(target=_background_load, args=(stop, tmpdir), daemon=True)
+        loader.start()
+
+    results = []
+    if mode == "threads":
+        start = threading.Barrier(stations + 1)
+        workers = [threading.Thread(target=_station, args=(barcodes, n, i, start, results)) for i in range(stations)]
+    else:
+        ctx = multiprocessing.get_context("spawn")
+        start = ctx.Barrier(stations + 1)
+        queue = ctx.Queue()
+        workers = [ctx.Process(target=_station_process, args=(inventory.DB_PATH, barcodes, n, i, start, queue))
+                   for i in range(stations)]
+    for w in workers:
+        w.start()
+    start.wait()
+    t0 = time.perf_counter()
+    rebuilds = 0
+    if mode == "procs":
+        results = [queue.get() for _ in workers]
+        # each child builds its index once at its first lookup
+        rebuilds = sum(r[2] - 1 for r in results)
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - t0
+
+    stop.set()
+    if loader:
+        loader.join()
+
+    latencies = sorted(x for r in results for x in r[0])
+    errors = sum(r[1] for r in results)
+    lost = abs(_total_quantity() - before)
+    rebuilds += inventory._index_rebuilds - rebuilds_before
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000
+    return len(latencies) / elapsed, p50, p95, errors, lost, rebuilds
+
+
+def _bench_stations(barcodes, counts, n: int, tmpdir: str):
+    # Plenty of stock, so no -1 is floored and the totals must match
+    conn = inventory._connect()
+    try:
+        inventory._begin_write(conn)
+        conn.execute("UPDATE items SET quantity = 100000;")
+        conn.commit()
+    finally:
+        inventory._release(conn)
+
+    print()
+    print(f"{'stations':<26} {'ops/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7} {'lost':>5} {'rebuilds':>9}")
+    print("-" * 78)
+    cases = [(f"{k} x thread", k, "threads", False) for k in counts]
+    cases += [(f"{k} x process", k, "procs", False) for k in counts if k > 1]
+    cases += [(f"{max(counts)} x thread + backup/export", max(counts), "threads", True)]
+    for label, k, mode, load in cases:
+        rate, p50, p95, errors, lost, rebuilds = _run_stations(barcodes, k, n, mode, tmpdir, load)
+        print(f"{label:<26} {rate:>9.0f} {p50:>8.2f} {p95:>8.2f} {errors:>7} {lost:>5} {rebuilds:>9}")
+        assert errors == 0 and lost == 0, f"{label}: {errors} failed / {lost} lost scans"
+        # Commits from this process's own threads arrive by write-through
+        assert mode == "procs" or rebuilds == 0, f"{label}: {rebuilds} full index rebuilds"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="StockPi inventory micro-benchmark")
+    parser.add_argument("-n", type=int, default=2000, help="operations per case")
+    parser.add_argument("--stations", default="1,2,4,8", help="station counts to simulate (comma separated)")
+    parser.add_argument("--station-ops", type=int, default=400, help="operations per station (multiple of 4)")
+    args = parser.parse_args()
+
+    cases = [
+        ("increment_existing", inventory.increment_existing),
+        ("get_item_by_barcode", inventory.get_item_by_barcode),
+        ("search_items", lambda barcode: inventory.search_items("bench item " + barcode[-2:])),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        barcodes = _setup(tmpdir)
+        _check_plans()
+        _check_behaviour()
+
+        print(f"{'operation':<22} {'per-op ops/s':>14} {'pooled ops/s':>14} {'speedup':>9}")
+        print("-" * 62)
+        for label, fn in cases:
+            before = _run(fn, barcodes, args.n, per_op=True)
+            after = _run(fn, barcodes, args.n, per_op=False)
+            print(f"{label:<22} {before:>14.0f} {after:>14.0f} {after / before:>8.1f}x")
+
+        counts = [int(c) for c in args.stations.split(",") if c.strip()]
+        _bench_stations(barcodes, counts, args.station_ops - args.station_ops % 4, tmpdir)
+
+        inventory.close_connections()
+
+
+# ============================================================
+# SECTION: Main
+# ============================================================
+if __name__ == "__main__":
+    main()
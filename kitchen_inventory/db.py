@@ -6,12 +6,43 @@
 # ============================================================
 # SECTION: Imports
 # ============================================================
+import fcntl
+import os
 import sqlite3
 
 # ============================================================
 # SECTION: Constants
 # ============================================================
-DB_NAME = "inventory.db"
+# Same file inventory.py uses, regardless of the working directory
+DB_NAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), "inventory.db")
+
+# Bump when a migration is added below. Stored in app_meta, so a restore
+# can refuse a file from a newer StockPi (files without it count as 0)
+SCHEMA_VERSION = 3
+
+# Columns a file must have to be accepted as a StockPi restore
+REQUIRED_ITEM_COLUMNS = ("id", "barcode", "name", "location", "quantity")
+
+# Low stock, exactly as written in the partial index and the view (SQLite
+# only uses a partial index when the query repeats its WHERE terms)
+LOW_STOCK_PREDICATE = "low_threshold > 0 AND quantity > 0 AND quantity <= low_threshold"
+
+# Shared DB generation (ETags, page cache): a counter every write
+# transaction bumps (inventory._begin_write) and a random epoch that a
+# restored file replaces. In app_meta, so every worker sees the same one.
+GENERATION_KEY = "generation"
+GENERATION_EPOCH_KEY = "generation_epoch"
+
+# Rows per commit for resumable backfills (keeps each write small on the SD card)
+BACKFILL_CHUNK = 5000
+
+BARCODE_CACHE_DDL = """
+    CREATE TABLE IF NOT EXISTS barcode_cache (
+        barcode TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        source TEXT NOT NULL DEFAULT 'unknown'
+    ) WITHOUT ROWID;
+"""
 
 DEFAULT_LOCATIONS = [
     ("Pantry", 1),
@@ -28,8 +59,8 @@ DEFAULT_LOCATIONS = [
 # ------------------------------------------------------------
 # SUBSECTION: connect
 # ------------------------------------------------------------
-def _connect():
-    conn = sqlite3.connect(DB_NAME)
+def _connect(path=None):
+    conn = sqlite3.connect(path or DB_NAME)
     conn.execute("PRAGMA foreign_keys = ON;")
     return conn
 
@@ -107,27 +138,72 @@ def _create_tables(conn):
         );
     """)
 
-    # Barcode cache (offline naming help)
+    # Barcode cache (offline naming help) — filled from a product dump by
+    # product_names.py; can hold millions of rows, so no rowid and no
+    # per-row timestamp: the barcode key *is* the table's b-tree
+    cur.execute(BARCODE_CACHE_DDL)
+
+    # Event log (consumption tracking / debugging) — written by inventory.py
     cur.execute("""
-        CREATE TABLE IF NOT EXISTS barcode_cache (
-            barcode TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            source TEXT DEFAULT 'unknown',
-            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        CREATE TABLE IF NOT EXISTS event_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TEXT NOT NULL,
+            barcode TEXT,
+            event_type TEXT NOT NULL,            -- add/remove/add_new/move/delete_item/set_low_threshold/...
+            delta INTEGER NOT NULL DEFAULT 0,    -- +1 add, -1 remove, 0 misc
+            source TEXT NOT NULL DEFAULT 'ui'
         );
     """)
 
-    # Event log (consumption tracking / debugging)
+    # Per-item per-day consumption rollup — maintained by inventory._log_event
     cur.execute("""
-        CREATE TABLE IF NOT EXISTS events (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            item_id INTEGER,
+        CREATE TABLE IF NOT EXISTS daily_item_usage (
+            item_id INTEGER NOT NULL,
+            day TEXT NOT NULL,                   -- YYYY-MM-DD (UTC, same clock as event_log)
+            adds INTEGER NOT NULL DEFAULT 0,     -- units added that day
+            removes INTEGER NOT NULL DEFAULT 0,  -- units removed that day
+            PRIMARY KEY (item_id, day)
+        ) WITHOUT ROWID;
+    """)
+
+    # Per-barcode monthly summary of events pruned from event_log (retention)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS monthly_item_usage (
             barcode TEXT NOT NULL,
-            delta INTEGER NOT NULL,              -- +1 add, -1 remove, 0 misc
-            event_type TEXT NOT NULL,            -- add/remove/create/move/delete/threshold/grocery_remove
-            source TEXT DEFAULT 'ui',
+            month TEXT NOT NULL,                 -- YYYY-MM (UTC)
+            adds INTEGER NOT NULL DEFAULT 0,
+            removes INTEGER NOT NULL DEFAULT 0,
+            events INTEGER NOT NULL DEFAULT 0,   -- all event rows folded, incl. moves/threshold changes
+            PRIMARY KEY (barcode, month)
+        ) WITHOUT ROWID;
+    """)
+
+    # Barcode aliases (also created by inventory._ensure_schema); needed
+    # here so the search-index triggers below can reference it
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS barcode_aliases (
+            barcode TEXT PRIMARY KEY,
+            item_id INTEGER NOT NULL,
             created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (item_id) REFERENCES items(id)
+            FOREIGN KEY(item_id) REFERENCES items(id) ON DELETE CASCADE
+        );
+    """)
+
+    # Full-text item search: one row per item (rowid = items.id) with its
+    # name, location and every barcode (primary + aliases), space-separated
+    cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+            name, location, barcodes,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        );
+    """)
+
+    # Small key/value store for migration progress
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS app_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
         );
     """)
 
@@ -138,10 +214,133 @@ def _create_tables(conn):
 # ------------------------------------------------------------
 def _create_indexes(conn):
     cur = conn.cursor()
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_items_name ON items(name);")
+    # Every name-ordered list uses ORDER BY name COLLATE NOCASE, which a plain
+    # name index can't serve; replaces the old idx_items_name.
+    cur.execute("DROP INDEX IF EXISTS idx_items_name;")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_items_name_nocase ON items(name COLLATE NOCASE);")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_items_location ON items(location);")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_events_barcode_time ON events(barcode, created_at);")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_events_time ON events(created_at);")
+    # Per-item stats read daily_item_usage now, and nothing else looks
+    # event_log up by barcode; dropped so scans don't maintain it.
+    cur.execute("DROP INDEX IF EXISTS idx_event_log_barcode_time;")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_event_log_time ON event_log(created_at);")
+    # Partial indexes: only the few items that match are in them, so the
+    # low-stock page and the grocery repair don't scan the whole table.
+    # Low stock is name-ordered like every other list. (Files older than
+    # low_threshold get the column here; _migrate would be too late.)
+    _ensure_column(conn, "items", "low_threshold", "low_threshold INTEGER NOT NULL DEFAULT 0")
+    cur.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_items_low_stock
+        ON items(name COLLATE NOCASE) WHERE {LOW_STOCK_PREDICATE};
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_items_out_of_stock ON items(id) WHERE quantity <= 0;")
+    conn.commit()
+
+# ------------------------------------------------------------
+# SUBSECTION: create_views
+# ------------------------------------------------------------
+def _create_views(conn):
+    """
+    low_stock_items: items at or below their threshold but not out.
+    Reads through idx_items_low_stock (the WHERE matches it exactly).
+    """
+    cur = conn.cursor()
+    cur.execute(f"""
+        CREATE VIEW IF NOT EXISTS low_stock_items AS
+        SELECT id, barcode, name, location, quantity, low_threshold
+        FROM items
+        WHERE {LOW_STOCK_PREDICATE};
+    """)
+    conn.commit()
+
+# ------------------------------------------------------------
+# SUBSECTION: create_search_triggers
+# ------------------------------------------------------------
+def _fts_refresh_sql(item_id_expr: str) -> str:
+    """
+    Statements that rebuild the items_fts row for one item. A no-op
+    insert if the item no longer exists.
+    """
+    return f"""
+        DELETE FROM items_fts WHERE rowid = {item_id_expr};
+        INSERT INTO items_fts (rowid, name, location, barcodes)
+        SELECT i.id, i.name, i.location,
+               i.barcode || COALESCE(' ' || (SELECT group_concat(a.barcode, ' ')
+                                             FROM barcode_aliases a
+                                             WHERE a.item_id = i.id), '')
+        FROM items i
+        WHERE i.id = {item_id_expr};
+    """
+
+
+def _create_search_triggers(conn):
+    """
+    Keeps items_fts in sync with items + barcode_aliases on every write,
+    whichever code path makes it.
+    """
+    cur = conn.cursor()
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS items_fts_ai AFTER INSERT ON items BEGIN
+            {_fts_refresh_sql("NEW.id")}
+        END;
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS items_fts_au AFTER UPDATE OF barcode, name, location ON items BEGIN
+            {_fts_refresh_sql("NEW.id")}
+        END;
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS items_fts_ad AFTER DELETE ON items BEGIN
+            DELETE FROM items_fts WHERE rowid = OLD.id;
+        END;
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS aliases_fts_ai AFTER INSERT ON barcode_aliases BEGIN
+            {_fts_refresh_sql("NEW.item_id")}
+        END;
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS aliases_fts_au AFTER UPDATE ON barcode_aliases BEGIN
+            {_fts_refresh_sql("OLD.item_id")}
+            {_fts_refresh_sql("NEW.item_id")}
+        END;
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS aliases_fts_ad AFTER DELETE ON barcode_aliases BEGIN
+            {_fts_refresh_sql("OLD.item_id")}
+        END;
+    """)
+    conn.commit()
+
+# ------------------------------------------------------------
+# SUBSECTION: create_grocery_triggers
+# ------------------------------------------------------------
+def _create_grocery_triggers(conn):
+    """
+    Keeps grocery_list in step with items.quantity, on state transitions
+    only: an item goes on the list when it hits 0 and comes off when it
+    goes back above 0. Any other quantity change (most scans) costs no
+    grocery_list write, and an item removed from the list by hand stays
+    off until it is restocked and runs out again.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS items_grocery_ai AFTER INSERT ON items
+        WHEN NEW.quantity <= 0 BEGIN
+            INSERT OR IGNORE INTO grocery_list (item_id, added_date) VALUES (NEW.id, CURRENT_TIMESTAMP);
+        END;
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS items_grocery_out AFTER UPDATE OF quantity ON items
+        WHEN OLD.quantity > 0 AND NEW.quantity <= 0 BEGIN
+            INSERT OR IGNORE INTO grocery_list (item_id, added_date) VALUES (NEW.id, CURRENT_TIMESTAMP);
+        END;
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS items_grocery_in AFTER UPDATE OF quantity ON items
+        WHEN OLD.quantity <= 0 AND NEW.quantity > 0 BEGIN
+            DELETE FROM grocery_list WHERE item_id = NEW.id;
+        END;
+    """)
     conn.commit()
 
 # ------------------------------------------------------------
@@ -156,29 +355,195 @@ def _seed_default_locations(conn):
         )
     conn.commit()
 
+# ------------------------------------------------------------
+# SUBSECTION: meta get/set
+# ------------------------------------------------------------
+def _meta_get(conn, key: str, default=None):
+    row = conn.execute("SELECT value FROM app_meta WHERE key = ?;", (key,)).fetchone()
+    return row[0] if row else default
+
+
+def _meta_set(conn, key: str, value) -> None:
+    conn.execute(
+        "INSERT INTO app_meta (key, value) VALUES (?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value;",
+        (key, str(value)),
+    )
+
+# ------------------------------------------------------------
+# SUBSECTION: bump_generation
+# ------------------------------------------------------------
+def _bump_generation(conn, new_epoch=False):
+    """
+    Creates the shared generation if missing and bumps it. Runs at every
+    startup: the new code may render the same data differently, so tags
+    handed out before must not match. new_epoch=True (a restored file)
+    also replaces the epoch, so its counter can't collide with old tags.
+    """
+    epoch = os.urandom(4).hex()
+    conn.execute("INSERT OR IGNORE INTO app_meta (key, value) VALUES (?, ?);", (GENERATION_EPOCH_KEY, epoch))
+    conn.execute("INSERT OR IGNORE INTO app_meta (key, value) VALUES (?, '0');", (GENERATION_KEY,))
+    conn.execute("UPDATE app_meta SET value = value + 1 WHERE key = ?;", (GENERATION_KEY,))
+    if new_epoch:
+        _meta_set(conn, GENERATION_EPOCH_KEY, epoch)
+    conn.commit()
+
 # ============================================================
 # SECTION: Upgrades / Migrations (existing installs)
 # ============================================================
 
 # ------------------------------------------------------------
-# SUBSECTION: ensure_events_table
+# SUBSECTION: merge_legacy_events
 # ------------------------------------------------------------
-def _ensure_events_table(conn):
+def _merge_legacy_events(conn):
+    """
+    Older installs have two event tables: 'events' (created here, never
+    written) and 'event_log' (what inventory.py actually uses). Copies any
+    rows from 'events' into 'event_log' and drops 'events', in one
+    transaction, so it only ever runs once.
+    """
     if not _table_exists(conn, "events"):
-        cur = conn.cursor()
+        return
+
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO event_log (created_at, barcode, event_type, delta, source)
+        SELECT COALESCE(created_at, CURRENT_TIMESTAMP), barcode, event_type,
+               COALESCE(delta, 0), COALESCE(source, 'ui')
+        FROM events
+        ORDER BY id;
+    """)
+    cur.execute("DROP TABLE events;")
+    conn.commit()
+
+# ------------------------------------------------------------
+# SUBSECTION: backfill_daily_usage
+# ------------------------------------------------------------
+def _backfill_daily_usage(conn):
+    """
+    Builds daily_item_usage from the existing event_log, BACKFILL_CHUNK
+    events per commit. Resumable: progress is stored in app_meta, so an
+    interrupted run (power cut, restart) picks up where it stopped.
+
+    Only events up to the event_log high-water mark taken on the first run
+    are folded in; anything newer was already counted live by _log_event.
+    """
+    if _meta_get(conn, "daily_usage_backfill") == "done":
+        return
+
+    cur = conn.cursor()
+    target = _meta_get(conn, "daily_usage_backfill_target")
+    if target is None:
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM event_log;")
+        target = cur.fetchone()[0]
+        _meta_set(conn, "daily_usage_backfill_target", target)
+        conn.commit()
+    target = int(target)
+    last_id = int(_meta_get(conn, "daily_usage_backfill_last_id", 0))
+
+    while last_id < target:
+        upper = min(last_id + BACKFILL_CHUNK, target)
         cur.execute("""
-            CREATE TABLE IF NOT EXISTS events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                item_id INTEGER,
-                barcode TEXT NOT NULL,
-                delta INTEGER NOT NULL,
-                event_type TEXT NOT NULL,
-                source TEXT DEFAULT 'ui',
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (item_id) REFERENCES items(id)
-            );
-        """)
+            INSERT INTO daily_item_usage (item_id, day, adds, removes)
+            SELECT i.id, substr(e.created_at, 1, 10),
+                   SUM(CASE WHEN e.delta > 0 THEN e.delta ELSE 0 END),
+                   SUM(CASE WHEN e.delta < 0 THEN -e.delta ELSE 0 END)
+            FROM event_log e
+            JOIN items i ON i.barcode = e.barcode
+            WHERE e.id > ? AND e.id <= ? AND e.delta != 0
+            GROUP BY i.id, substr(e.created_at, 1, 10)
+            ON CONFLICT(item_id, day) DO UPDATE SET
+              adds = adds + excluded.adds,
+              removes = removes + excluded.removes;
+        """, (last_id, upper))
+        _meta_set(conn, "daily_usage_backfill_last_id", upper)
         conn.commit()
+        last_id = upper
+
+    _meta_set(conn, "daily_usage_backfill", "done")
+    conn.commit()
+
+# ------------------------------------------------------------
+# SUBSECTION: build_items_fts
+# ------------------------------------------------------------
+def _build_items_fts(conn):
+    """
+    Fills items_fts from existing items/aliases once; the triggers keep
+    it current from then on. One transaction, so a crash just reruns it.
+    """
+    if _meta_get(conn, "items_fts") == "built":
+        return
+
+    cur = conn.cursor()
+    cur.execute("DELETE FROM items_fts;")
+    cur.execute("""
+        INSERT INTO items_fts (rowid, name, location, barcodes)
+        SELECT i.id, i.name, i.location,
+               i.barcode || COALESCE(' ' || (SELECT group_concat(a.barcode, ' ')
+                                             FROM barcode_aliases a
+                                             WHERE a.item_id = i.id), '')
+        FROM items i;
+    """)
+    _meta_set(conn, "items_fts", "built")
+    conn.commit()
+
+# ------------------------------------------------------------
+# SUBSECTION: compact_barcode_cache
+# ------------------------------------------------------------
+def _compact_barcode_cache(conn):
+    """
+    v1 created barcode_cache as a rowid table with an updated_at column
+    (the barcode then lives in the table and again in its PK index).
+    Rebuilds it WITHOUT ROWID, keeping any rows. One transaction.
+    """
+    row = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type='table' AND name='barcode_cache';"
+    ).fetchone()
+    if row is None or "WITHOUT ROWID" in row[0].upper():
+        return
+
+    cur = conn.cursor()
+    cur.execute("ALTER TABLE barcode_cache RENAME TO barcode_cache_v1;")
+    cur.execute(BARCODE_CACHE_DDL)
+    cur.execute("""
+        INSERT OR REPLACE INTO barcode_cache (barcode, name, source)
+        SELECT barcode, name, COALESCE(source, 'unknown') FROM barcode_cache_v1;
+    """)
+    cur.execute("DROP TABLE barcode_cache_v1;")
+    conn.commit()
+
+# ------------------------------------------------------------
+# SUBSECTION: repair_grocery_list
+# ------------------------------------------------------------
+def _repair_grocery_list(conn):
+    """
+    The grocery triggers only react to transitions, so the list must start
+    out consistent: drops entries for items that are in stock (or gone).
+    Out-of-stock items missing from the list were removed by hand; they
+    stay off. Cheap: walks the grocery list and idx_items_out_of_stock.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        DELETE FROM grocery_list
+        WHERE item_id NOT IN (SELECT id FROM items WHERE quantity <= 0);
+    """)
+    conn.commit()
+
+# ------------------------------------------------------------
+# SUBSECTION: ensure_incremental_vacuum
+# ------------------------------------------------------------
+def _ensure_incremental_vacuum(conn):
+    """
+    Switches the file to auto_vacuum=INCREMENTAL so retention can hand
+    pages back with PRAGMA incremental_vacuum instead of a blocking full
+    VACUUM. Existing files need one VACUUM for the mode to take effect;
+    that happens once, here, at startup. New files pay nothing.
+    """
+    mode = conn.execute("PRAGMA auto_vacuum;").fetchone()[0]
+    if mode == 2:
+        return
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+    conn.execute("VACUUM;")
 
 # ------------------------------------------------------------
 # SUBSECTION: migrate
@@ -187,8 +552,23 @@ def _migrate(conn):
     # Ensure new column exists
     _ensure_column(conn, "items", "low_threshold", "low_threshold INTEGER NOT NULL DEFAULT 0")
 
-    # Ensure events table exists
-    _ensure_events_table(conn)
+    # One event table: fold legacy 'events' into 'event_log'
+    _merge_legacy_events(conn)
+
+    # Daily consumption rollup from existing history
+    _backfill_daily_usage(conn)
+
+    # Search index for items created before items_fts existed
+    _build_items_fts(conn)
+
+    # v2: barcode_cache WITHOUT ROWID (offline product names)
+    _compact_barcode_cache(conn)
+
+    # v3: grocery_list is kept by triggers from here on
+    _repair_grocery_list(conn)
+
+    _meta_set(conn, "schema_version", SCHEMA_VERSION)
+    conn.commit()
 
 # ============================================================
 # SECTION: Public Entry
@@ -197,16 +577,84 @@ def _migrate(conn):
 # ------------------------------------------------------------
 # SUBSECTION: init_db
 # ------------------------------------------------------------
-def init_db():
-    conn = _connect()
+def init_db(path=None):
+    """
+    Creates/upgrades the schema of the live DB, or of `path` (a staged
+    restore file).
+
+    Every gunicorn worker runs this at import, at the same time. An
+    exclusive lock on inventory.db.lock makes them take turns (staged
+    files too, it costs nothing), so the migrations (ALTER TABLE, the
+    one-time VACUUM, backfills) run once and the later workers find
+    nothing left to do.
+    """
+    with open(DB_NAME + ".lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        conn = _connect(path)
+        try:
+            _ensure_incremental_vacuum(conn)
+            _create_tables(conn)
+            _create_indexes(conn)
+            _create_views(conn)
+            _create_search_triggers(conn)
+            _create_grocery_triggers(conn)
+            _seed_default_locations(conn)
+            _migrate(conn)
+            _bump_generation(conn)
+            print("Database initialized / upgraded successfully.")
+        finally:
+            conn.close()
+
+# ------------------------------------------------------------
+# SUBSECTION: prepare_restore
+# ------------------------------------------------------------
+def prepare_restore(path: str) -> dict:
+    """
+    Validates a staged restore file and upgrades it in place, before it
+    goes anywhere near the live DB:
+      - PRAGMA integrity_check must say "ok"
+      - it must have an items table with REQUIRED_ITEM_COLUMNS
+      - its schema_version must not be newer than SCHEMA_VERSION
+    Then it is switched to a rollback journal (a raw copy of a WAL-mode
+    inventory.db still says WAL), migrated with init_db(path) and given a
+    fresh generation epoch.
+    Raises ValueError with a short, user-facing reason.
+    Returns dict: {"items", "from_version"}
+    """
+    conn = _connect(path)
+    try:
+        try:
+            result = "; ".join(r[0] for r in conn.execute("PRAGMA integrity_check;"))
+        except sqlite3.DatabaseError:
+            raise ValueError("not a SQLite database")
+        if result != "ok":
+            raise ValueError(f"integrity check failed ({result[:120]})")
+
+        if not _table_exists(conn, "items"):
+            raise ValueError("no items table - not a StockPi backup")
+        missing = [c for c in REQUIRED_ITEM_COLUMNS if not _column_exists(conn, "items", c)]
+        if missing:
+            raise ValueError("items table is missing " + ", ".join(missing))
+
+        from_version = 0
+        if _table_exists(conn, "app_meta"):
+            from_version = int(_meta_get(conn, "schema_version", 0) or 0)
+        if from_version > SCHEMA_VERSION:
+            raise ValueError(f"backup is from a newer StockPi (schema {from_version} > {SCHEMA_VERSION})")
+
+        conn.execute("PRAGMA journal_mode=DELETE;")
+    finally:
+        conn.close()
+
+    init_db(path)
+
+    conn = _connect(path)
     try:
-        _create_tables(conn)
-        _create_indexes(conn)
-        _seed_default_locations(conn)
-        _migrate(conn)
-        print("Database initialized / upgraded successfully.")
+        _bump_generation(conn, new_epoch=True)
+        items = conn.execute("SELECT COUNT(*) FROM items;").fetchone()[0]
     finally:
         conn.close()
+    return {"items": items, "from_version": from_version}
 
 # ============================================================
 # SECTION: Main
@@ -0,0 +1,171 @@
+# ============================================================
+# FILE: exports.py
+# StockPi — Export engine (txt / CSV / JSONL), streamed
+#
+# Every export is a spec: a row source (generator from inventory.py
+# that reads through a server-side cursor) plus the column names and the
+# readable-text layout. stream() turns a spec into text chunks for a
+# Flask generator Response, so memory stays flat and downloads start
+# right away however big the inventory or event log is.
+# ============================================================
+
+# ============================================================
+# SECTION: Imports
+# ============================================================
+import csv
+import io
+import json
+
+import inventory
+
+# ============================================================
+# SECTION: Constants
+# ============================================================
+FORMATS = {
+    "txt": "text/plain",
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+}
+
+# Rows per yielded chunk (one small write per chunk instead of per row)
+CHUNK_ROWS = 200
+
+# ============================================================
+# SECTION: Readable Text Layouts
+# ============================================================
+
+def _cap(s, n):
+    s = (s or "").strip()
+    return s if len(s) <= n else (s[: n - 1] + "…")
+
+
+NAME_W = 30
+LOC_W = 22
+QTY_W = 3
+INVENTORY_TXT_HEADER = f"{'ITEM':<{NAME_W}}  {'LOCATION':<{LOC_W}}  {'QTY':>{QTY_W}}  {'LOW':>3}  BARCODE"
+
+
+def _inventory_txt(row):
+    barcode, name, location, qty, low = row
+    low_i = int(low) if low else 0
+    return f"{_cap(name, NAME_W):<{NAME_W}}  {_cap(location, LOC_W):<{LOC_W}}  {int(qty):>{QTY_W}}  {low_i:>3}  {barcode}"
+
+
+def _grocery_txt(row):
+    return f"- {row[1]}"
+
+
+def _events_txt(row):
+    return " | ".join(str(v) for v in row)
+
+# ============================================================
+# SECTION: Export Specs
+# ============================================================
+
+# kind -> spec
+#   rows      : callable(**opts) -> iterator of tuples (in `fields` order)
+#   fields    : CSV header / JSONL keys
+#   title     : first line of the txt export, underlined with `rule`
+#   txt_head  : column header lines under the title (txt only)
+#   txt_row   : tuple -> one txt line
+#   txt_empty : line written when there are no rows (txt only), or None
+EXPORTS = {
+    "inventory": {
+        "rows": lambda **opts: inventory.iter_inventory(),
+        "fields": ["barcode", "name", "location", "quantity", "low_threshold"],
+        "title": "StockPi Inventory (Readable Export)",
+        "rule": "=" * 33,
+        "txt_head": [INVENTORY_TXT_HEADER, "-" * len(INVENTORY_TXT_HEADER)],
+        "txt_row": _inventory_txt,
+        "txt_empty": "(Empty)",
+    },
+    "grocery": {
+        "rows": lambda **opts: inventory.iter_grocery_list(),
+        "fields": ["barcode", "name"],
+        "title": "StockPi Grocery List",
+        "rule": "=" * 18,
+        "txt_head": [],
+        "txt_row": _grocery_txt,
+        "txt_empty": "(Empty)",
+    },
+    "events": {
+        "rows": lambda limit=None, **opts: inventory.iter_event_log(limit),
+        "fields": ["created_at", "barcode", "event_type", "delta", "source"],
+        "title": "StockPi Event Log (Debug Export)",
+        "rule": "=" * 32,
+        "txt_head": ["time | barcode | type | delta | source", "-" * 38],
+        "txt_row": _events_txt,
+        "txt_empty": None,
+    },
+}
+
+# ============================================================
+# SECTION: Engine
+# ============================================================
+
+def chunked(lines, n=CHUNK_ROWS):
+    """
+    Joins an iterator of strings into chunks of n, for generator responses.
+    """
+    buf = []
+    for line in lines:
+        buf.append(line)
+        if len(buf) >= n:
+            yield "".join(buf)
+            buf = []
+    if buf:
+        yield "".join(buf)
+
+
+def _txt_lines(spec, rows):
+    yield spec["title"] + "\n"
+    yield spec["rule"] + "\n"
+    yield "\n"
+    for line in spec["txt_head"]:
+        yield line + "\n"
+
+    empty = True
+    for row in rows:
+        empty = False
+        yield spec["txt_row"](row) + "\n"
+    if empty and spec["txt_empty"]:
+        yield spec["txt_empty"] + "\n"
+
+
+def _csv_chunks(spec, rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(spec["fields"])
+    n = 0
+    for row in rows:
+        writer.writerow(row)
+        n += 1
+        if n % CHUNK_ROWS == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate(0)
+    yield buf.getvalue()
+
+
+def _jsonl_lines(spec, rows):
+    fields = spec["fields"]
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), ensure_ascii=False) + "\n"
+
+
+def stream(kind: str, fmt: str, **opts):
+    """
+    Text chunks of export `kind` in `fmt` ("txt", "csv" or "jsonl").
+    opts go to the row source (events: limit=None for everything).
+    Raises KeyError for an unknown kind/format.
+    """
+    spec = EXPORTS[kind]
+    if fmt not in FORMATS:
+        raise KeyError(fmt)
+
+    rows = spec["rows"](**opts)
+    if fmt == "csv":
+        return _csv_chunks(spec, rows)
+    if fmt == "jsonl":
+        return chunked(_jsonl_lines(spec, rows))
+    return chunked(_txt_lines(spec, rows))
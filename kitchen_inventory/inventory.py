@@ -8,8 +8,16 @@
 # ============================================================
 # SECTION: Imports
 # ============================================================
+import atexit
+import gzip
+import hashlib
+import json
 import os
+import re
 import sqlite3
+import threading
+import time
+import weakref
 from datetime import datetime, timedelta
 
 # ============================================================
@@ -17,6 +25,27 @@ from datetime import datetime, timedelta
 # ============================================================
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, "inventory.db")
+EVENT_ARCHIVE_DIRNAME = "event_archive"   # next to DB_PATH
+
+# Online backup: pages copied per step (1 MB at the default 4 KB page
+# size), and the pause between steps that lets scans commit
+BACKUP_STEP_PAGES = 256
+BACKUP_STEP_SLEEP = 0.005
+
+# Write transactions (BEGIN IMMEDIATE): attempts when the write lock is
+# still taken after busy_timeout, and the first backoff (doubles each time)
+WRITE_RETRIES = 5
+WRITE_RETRY_SLEEP = 0.05
+
+# Product-name import: rows per transaction, and rows between progress
+# reports
+PRODUCT_BATCH_ROWS = 2000
+PRODUCT_PROGRESS_ROWS = 50000
+
+# Inventory CSV import: rows per transaction, and the largest quantity /
+# threshold accepted (well inside SQLite's 64-bit integers)
+IMPORT_BATCH_ROWS = 5000
+IMPORT_MAX_INT = 1_000_000
 
 # ============================================================
 # SECTION: Schema Ensure (prevents missing-table crashes)
@@ -61,6 +90,18 @@ def _ensure_schema(conn: sqlite3.Connection):
         """
     )
 
+    # unknown barcodes from batch scans, waiting for the resolve flow
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS pending_scans (
+            barcode TEXT PRIMARY KEY,
+            scans INTEGER NOT NULL DEFAULT 0,
+            first_seen TEXT NOT NULL,
+            last_seen TEXT NOT NULL
+        );
+        """
+    )
+
     conn.commit()
 
 
@@ -68,13 +109,26 @@ def _ensure_schema(conn: sqlite3.Connection):
 # SECTION: DB Helpers
 # ============================================================
 
-def _connect():
+# One connection per worker thread, reused across calls.
+# Opening a connection + PRAGMAs + schema check on every scan was
+# the main per-request cost on the Pi.
+_local = threading.local()
+_conns_lock = threading.Lock()
+# Weak, so a thread's connection goes away with the thread (_ThreadConn)
+_open_conns = weakref.WeakSet()
+_pool_gen = 0
+_schema_checked = False
+
+
+def _open_connection():
     """
-    One connection per operation.
+    Opens a new configured connection.
     timeout helps if the Pi is briefly busy.
     row_factory gives dict-like rows.
+    check_same_thread is off only so close_connections() can close
+    other threads' connections at shutdown; each thread still uses its own.
     """
-    conn = sqlite3.connect(DB_PATH, timeout=10)
+    conn = sqlite3.connect(DB_PATH, timeout=10, check_same_thread=False)
     conn.row_factory = sqlite3.Row
 
     # Safer concurrency settings for SQLite on Pi
@@ -83,21 +137,352 @@ def _connect():
     cur.execute("PRAGMA synchronous=NORMAL;")
     cur.execute("PRAGMA busy_timeout=8000;")  # ms
     conn.commit()
+    return conn
+
 
-    # Ensure tables exist so routes don't crash
+def _close_quietly(conn):
     try:
-        _ensure_schema(conn)
+        conn.close()
     except Exception:
-        # If items table doesn't exist yet (fresh DB), don't crash app here
         pass
 
+
+class _ThreadConn:
+    """
+    Holds one thread's pooled connection in _local. When the thread exits
+    its locals are dropped and the connection is closed here, so
+    thread-per-request servers and one-off worker threads don't leak one
+    connection each.
+    """
+
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __del__(self):
+        _close_quietly(self.conn)
+
+
+def _connect():
+    """
+    Returns this thread's connection, opening it on first use.
+    The schema check runs once per process, not once per call.
+    Callers must hand the connection back with _release(), never close().
+    """
+    global _schema_checked
+
+    held = getattr(_local, "conn", None)
+    if held is None or getattr(_local, "gen", None) != _pool_gen:
+        if held is not None:
+            # Retired by retire_connections(); this thread is done with it
+            with _conns_lock:
+                _open_conns.discard(held)
+            _local.conn = None
+            _close_quietly(held.conn)
+        held = _ThreadConn(_open_connection())
+        with _conns_lock:
+            _open_conns.add(held)
+            _local.conn = held
+            _local.gen = _pool_gen
+    conn = held.conn
+
+    if not _schema_checked:
+        # Ensure tables exist so routes don't crash
+        try:
+            _ensure_schema(conn)
+        except Exception:
+            # If items table doesn't exist yet (fresh DB), don't crash app here
+            pass
+        _schema_checked = True
+
     return conn
 
 
+def _release(conn):
+    """
+    Ends a unit of work on the thread's connection.
+    Anything not committed is rolled back, which matches the old
+    close-per-operation behaviour when a function raised mid-write.
+    If the item index was already updated for the rolled-back write, it
+    is rebuilt on the next lookup; if not, it just gives back the
+    generation counter the write had claimed (_index_claim).
+    """
+    claimed = getattr(_local, "index_claimed", None)
+    if conn.in_transaction:
+        if getattr(_local, "index_dirty", False):
+            _index_invalidate()
+        elif claimed is not None:
+            _index_unclaim(claimed)
+        # only now: until the rollback, the write lock (and the counter) is ours
+        conn.rollback()
+    _local.index_dirty = False
+    _local.index_claimed = None
+
+
+def _begin_write(conn):
+    """
+    Starts the unit of work as a write transaction: BEGIN IMMEDIATE takes
+    SQLite's write lock up front, so a read-then-write function (check a
+    row, then update it) can't be overtaken by another thread or worker
+    between its read and its write, and can't fail half-way with a lock
+    upgrade error. Waiting for the lock is busy_timeout's job; if it is
+    still held after that (a long restore or import batch), retries
+    WRITE_RETRIES times with backoff before giving up.
+    Once this returns, the statements that follow can't hit SQLITE_BUSY.
+    Also bumps the shared DB generation, which commits with the work (or
+    rolls back with it), and tells the item index (_index_claim).
+    """
+    delay = WRITE_RETRY_SLEEP
+    for attempt in range(WRITE_RETRIES):
+        try:
+            conn.execute("BEGIN IMMEDIATE;")
+            break
+        except sqlite3.OperationalError as e:
+            msg = str(e).lower()
+            if ("locked" not in msg and "busy" not in msg) or attempt == WRITE_RETRIES - 1:
+                raise
+            time.sleep(delay)
+            delay *= 2
+    row = conn.execute(_BUMP_GENERATION_SQL).fetchone()
+    if row is not None:
+        _local.index_claimed = int(row[0])
+        _index_claim(_local.index_claimed)
+
+
+def close_connections():
+    """
+    Closes every pooled connection (all threads). Called at shutdown.
+    Threads that call _connect() afterwards get a fresh connection.
+    """
+    global _pool_gen, _schema_checked
+
+    with _conns_lock:
+        held = list(_open_conns)
+        _open_conns.clear()
+        _pool_gen += 1
+    for h in held:
+        _close_quietly(h.conn)
+    _schema_checked = False
+
+
+atexit.register(close_connections)
+
+
+def retire_connections():
+    """
+    Makes every thread open a fresh connection at its next _connect().
+    Unlike close_connections(), nothing in use is closed under a running
+    request; each thread swaps its own connection between units of work.
+    Also re-runs the schema check.
+    """
+    global _pool_gen, _schema_checked
+
+    with _conns_lock:
+        _pool_gen += 1
+    _schema_checked = False
+
+
+# ============================================================
+# SECTION: DB Generation (HTTP validators)
+# ============================================================
+
+# "<epoch>.<counter>" from app_meta (db.GENERATION_KEY / GENERATION_EPOCH_KEY),
+# so every worker hands out the same token for the same DB state:
+#   - every write transaction bumps the counter (_begin_write)
+#   - init_db bumps it at startup (new code may render pages differently)
+#   - a restored file brings a fresh random epoch (db.prepare_restore)
+_BUMP_GENERATION_SQL = "UPDATE app_meta SET value = value + 1 WHERE key = 'generation' RETURNING value;"
+_GENERATION_SQL = "SELECT key, value FROM app_meta WHERE key IN ('generation', 'generation_epoch');"
+
+
+def _read_generation(conn):
+    """
+    (epoch, counter) as committed, as this connection sees it.
+    """
+    meta = {r["key"]: r["value"] for r in conn.execute(_GENERATION_SQL)}
+    return meta.get("generation_epoch", ""), int(meta.get("generation") or 0)
+
+
+def db_generation() -> str:
+    """
+    Opaque token for ETags/caches; equal tokens mean no write in between.
+    """
+    conn = _connect()
+    try:
+        epoch, counter = _read_generation(conn)
+    finally:
+        _release(conn)
+    return f"{epoch}.{counter}"
+
+
 def _now_utc_iso():
     return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
 
 
+# ============================================================
+# SECTION: Item Index (in-memory barcode/alias lookup)
+# ============================================================
+
+# A household catalog fits easily in RAM, so barcode lookups are served
+# from a process-local index instead of SQLite:
+#   _index_items   : canonical barcode -> (id, barcode, name, location, quantity, low_threshold)
+#   _index_aliases : alias barcode     -> canonical barcode
+# Write functions in this module update it write-through while they still
+# hold the write lock (just before commit), so updates land in commit
+# order even with many threads.
+#
+# _index_gen is the DB generation (epoch, counter) the index reflects.
+# Every write transaction bumps the counter under the write lock, so
+# counters are handed out in commit order across processes. When a write
+# in this process takes the counter right after _index_gen, its changes
+# arrive by write-through and _index_gen moves up to it (_index_claim).
+# So every counter up to _index_gen is in the index, and commits from
+# other threads here cost nothing. Anything else (another worker's
+# writes, a restore, a rolled-back write-through) leaves the committed
+# counter past _index_gen and the next lookup rebuilds.
+_index_lock = threading.Lock()
+_index_items = {}
+_index_aliases = {}
+_index_gen = None     # None: rebuild on the next lookup
+_index_rebuilds = 0   # full rebuilds so far (bench_inventory.py reads it)
+
+
+def _index_rebuild(conn):
+    global _index_items, _index_aliases, _index_gen, _index_rebuilds
+
+    # One read transaction, so items, aliases and the generation come
+    # from the same snapshot
+    own_txn = not conn.in_transaction
+    if own_txn:
+        conn.execute("BEGIN;")
+    cur = conn.cursor()
+    cur.execute("SELECT id, barcode, name, location, quantity, low_threshold FROM items;")
+    items = {r["barcode"]: tuple(r) for r in cur.fetchall()}
+
+    aliases = {}
+    try:
+        cur.execute(
+            """
+            SELECT a.barcode AS alias, i.barcode AS barcode
+            FROM barcode_aliases a
+            JOIN items i ON i.id = a.item_id;
+            """
+        )
+        aliases = {r["alias"]: r["barcode"] for r in cur.fetchall()}
+    except sqlite3.OperationalError:
+        pass
+    gen = _read_generation(conn)
+    if own_txn:
+        conn.commit()
+
+    with _index_lock:
+        _index_items = items
+        _index_aliases = aliases
+        # A write that commits after the snapshot moves the counter past
+        # gen, so it is picked up by the next check either way
+        _index_gen = gen
+        _index_rebuilds += 1
+
+
+def _index_check():
+    """
+    Rebuilds the index if it was never loaded or doesn't reflect the
+    committed DB generation (see _index_gen).
+    """
+    conn = _connect()
+    try:
+        epoch, counter = _read_generation(conn)
+        current = _index_gen
+        # Below current: a claimed write of ours is still committing
+        if current is None or current[0] != epoch or counter > current[1]:
+            _index_rebuild(conn)
+    finally:
+        _release(conn)
+
+
+def _index_claim(counter: int):
+    """
+    Called by _begin_write with the counter its write just took, while
+    holding the write lock. If the index was current, it stays current
+    through this write (its changes come by write-through).
+    """
+    global _index_gen
+    with _index_lock:
+        if _index_gen is not None and _index_gen[1] == counter - 1:
+            _index_gen = (_index_gen[0], counter)
+
+
+def _index_unclaim(counter: int):
+    """
+    A claimed write is being rolled back before any write-through: the
+    counter goes back, and so does the index.
+    """
+    global _index_gen
+    with _index_lock:
+        if _index_gen is not None and _index_gen[1] == counter:
+            _index_gen = (_index_gen[0], counter - 1)
+
+
+def _index_put(row):
+    """
+    Write-through for one item row (id, barcode, name, location, quantity, low_threshold).
+    """
+    with _index_lock:
+        _index_items[row[1]] = tuple(row)
+    _local.index_dirty = True
+
+
+def _index_put_aliases(aliases):
+    """
+    Write-through for alias barcode -> canonical barcode mappings.
+    """
+    with _index_lock:
+        _index_aliases.update(aliases)
+    _local.index_dirty = True
+
+
+def _index_drop(barcode):
+    """
+    Write-through for a deleted item: removes it and every alias pointing at it.
+    """
+    with _index_lock:
+        _index_items.pop(barcode, None)
+        for alias in [a for a, c in _index_aliases.items() if c == barcode]:
+            del _index_aliases[alias]
+    _local.index_dirty = True
+
+
+def _index_invalidate():
+    """
+    Forces a full rebuild on the next lookup (bulk writes, restore).
+    """
+    global _index_gen
+    _index_gen = None
+
+
+def load_item_index():
+    """
+    Loads the item/alias index. Called once at app startup so the first
+    scan doesn't pay for the build.
+    """
+    _index_invalidate()
+    _index_check()
+
+
+def _index_lookup(barcode: str):
+    """
+    Returns the index entry for a barcode or alias, or None.
+    """
+    _index_check()
+    entry = _index_items.get(barcode)
+    if entry is None:
+        canonical = _index_aliases.get(barcode)
+        if canonical is not None:
+            entry = _index_items.get(canonical)
+    return entry
+
+
 # ============================================================
 # SECTION: Barcode Alias Resolution
 # ============================================================
@@ -109,39 +494,14 @@ def resolve_barcode(barcode: str):
       1) items.barcode == barcode
       2) barcode_aliases.barcode == barcode -> mapped item -> canonical barcode
 
-    Returns None if not found.
+    Returns None if not found. Served from the in-memory item index.
     """
     barcode = (barcode or "").strip()
     if not barcode:
         return None
 
-    conn = _connect()
-    try:
-        cur = conn.cursor()
-
-        # Direct hit
-        cur.execute("SELECT barcode FROM items WHERE barcode = ?;", (barcode,))
-        row = cur.fetchone()
-        if row:
-            return row["barcode"]
-
-        # Alias hit
-        cur.execute(
-            """
-            SELECT i.barcode AS barcode
-            FROM barcode_aliases a
-            JOIN items i ON i.id = a.item_id
-            WHERE a.barcode = ?;
-            """,
-            (barcode,),
-        )
-        row = cur.fetchone()
-        if row:
-            return row["barcode"]
-
-        return None
-    finally:
-        conn.close()
+    entry = _index_lookup(barcode)
+    return entry[1] if entry else None
 
 
 def add_barcode_alias(alias_barcode: str, canonical_barcode: str):
@@ -157,6 +517,7 @@ def add_barcode_alias(alias_barcode: str, canonical_barcode: str):
 
     conn = _connect()
     try:
+        _begin_write(conn)
         cur = conn.cursor()
 
         # canonical must exist in items
@@ -170,17 +531,21 @@ def add_barcode_alias(alias_barcode: str, canonical_barcode: str):
         if cur.fetchone():
             raise ValueError("Alias barcode already exists as a primary item barcode")
 
+        # Upsert (not OR REPLACE) so re-pointing an alias fires the UPDATE
+        # trigger and items_fts drops it from the old item too
         cur.execute(
             """
-            INSERT OR REPLACE INTO barcode_aliases (barcode, item_id)
-            VALUES (?, ?);
+            INSERT INTO barcode_aliases (barcode, item_id)
+            VALUES (?, ?)
+            ON CONFLICT(barcode) DO UPDATE SET item_id = excluded.item_id;
             """,
             (alias_barcode, item["id"]),
         )
+        _index_put_aliases({alias_barcode: canonical_barcode})
         conn.commit()
         return True
     finally:
-        conn.close()
+        _release(conn)
 
 
 def get_aliases_for_barcode(canonical_barcode: str):
@@ -211,47 +576,68 @@ def get_aliases_for_barcode(canonical_barcode: str):
         rows = cur.fetchall()
         return [r["barcode"] for r in rows]
     finally:
-        conn.close()
+        _release(conn)
 
 
 # ============================================================
 # SECTION: Internal Helpers
 # ============================================================
 
+# Folds one event into the per-item daily rollup (same transaction as the event).
+# Keyed by items.id; events for a barcode with no item row are skipped.
+_DAILY_USAGE_UPSERT_SQL = """
+    INSERT INTO daily_item_usage (item_id, day, adds, removes)
+    SELECT id, ?, ?, ? FROM items WHERE barcode = ?
+    ON CONFLICT(item_id, day) DO UPDATE SET
+      adds = adds + excluded.adds,
+      removes = removes + excluded.removes;
+"""
+
+
+def _usage_params(created_at, barcode, delta):
+    delta = int(delta)
+    return (created_at[:10], max(delta, 0), max(-delta, 0), barcode)
+
+
 def _log_event(cur, barcode, event_type, delta=0, source="ui"):
     """
-    Writes to event_log table. If table doesn't exist for some reason,
-    silently skip (keeps app alive).
+    Writes to event_log table and keeps daily_item_usage in step.
+    If a table doesn't exist for some reason, silently skip (keeps app alive).
     """
+    created_at = _now_utc_iso()
     try:
         cur.execute(
             """
             INSERT INTO event_log (created_at, barcode, event_type, delta, source)
             VALUES (?, ?, ?, ?, ?);
             """,
-            (_now_utc_iso(), barcode, event_type, int(delta), source),
+            (created_at, barcode, event_type, int(delta), source),
         )
+        if int(delta):
+            cur.execute(_DAILY_USAGE_UPSERT_SQL, _usage_params(created_at, barcode, delta))
     except Exception:
         pass
 
 
-def _sync_grocery(cur, item_id, qty):
+def _log_events(cur, rows):
     """
-    Keeps grocery_list in sync:
-      - if qty <= 0 => ensure item is in grocery_list
-      - if qty > 0  => remove from grocery_list
-    IMPORTANT: uses SAME cursor/transaction as caller to avoid DB locks.
+    Bulk version of _log_event.
+    rows: (created_at, barcode, event_type, delta, source) tuples.
     """
-    if qty <= 0:
-        cur.execute(
+    try:
+        cur.executemany(
             """
-            INSERT OR IGNORE INTO grocery_list (item_id, added_date)
-            VALUES (?, CURRENT_TIMESTAMP);
+            INSERT INTO event_log (created_at, barcode, event_type, delta, source)
+            VALUES (?, ?, ?, ?, ?);
             """,
-            (item_id,),
+            rows,
         )
-    else:
-        cur.execute("DELETE FROM grocery_list WHERE item_id = ?;", (item_id,))
+        cur.executemany(
+            _DAILY_USAGE_UPSERT_SQL,
+            [_usage_params(r[0], r[1], r[3]) for r in rows if int(r[3])],
+        )
+    except Exception:
+        pass
 
 
 # ============================================================
@@ -264,33 +650,14 @@ def get_item_by_barcode(barcode: str):
       (barcode, name, location, quantity, low_threshold)
     or None
 
-    Supports alias barcodes.
+    Supports alias barcodes. Served from the in-memory item index.
     """
     barcode = (barcode or "").strip()
     if not barcode:
         return None
 
-    canonical = resolve_barcode(barcode)
-    if canonical:
-        barcode = canonical
-
-    conn = _connect()
-    try:
-        cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT barcode, name, location, quantity, low_threshold
-            FROM items
-            WHERE barcode = ?;
-            """,
-            (barcode,),
-        )
-        row = cur.fetchone()
-        if not row:
-            return None
-        return (row["barcode"], row["name"], row["location"], row["quantity"], row["low_threshold"])
-    finally:
-        conn.close()
+    entry = _index_lookup(barcode)
+    return entry[1:] if entry else None
 
 
 def get_inventory():
@@ -311,7 +678,158 @@ def get_inventory():
         rows = cur.fetchall()
         return [(r["barcode"], r["name"], r["location"], r["quantity"], r["low_threshold"]) for r in rows]
     finally:
-        conn.close()
+        _release(conn)
+
+
+# /inventory sort options -> SQL sort expression (ties broken by id).
+# "name" is served by idx_items_name_nocase.
+INVENTORY_SORTS = {
+    "name": "name COLLATE NOCASE",
+    "qty": "quantity",
+    "location": "location COLLATE NOCASE",
+}
+
+
+def _fts_query(q: str) -> str:
+    """
+    User text -> FTS5 MATCH expression: every word must match, each as a
+    prefix ("chick noo" finds "Chicken Noodle Soup"). Words are quoted,
+    so FTS5 operators/punctuation typed by the user are just text.
+    Returns "" when there is nothing searchable.
+    """
+    words = re.findall(r"\w+", (q or "").lower())
+    return " ".join(f'"{w}"*' for w in words)
+
+
+def _inventory_where(q: str, zone: str):
+    """
+    WHERE fragments + params shared by search_inventory/count_inventory.
+      q    : words matched (by prefix) against name, location and all barcodes
+             via items_fts
+      zone : location prefix ("Pantry" matches "Pantry Shelf 2"); "" = all
+    """
+    clauses = []
+    params = {}
+    fts = _fts_query(q)
+    zone = (zone or "").strip()
+    if fts:
+        clauses.append("id IN (SELECT rowid FROM items_fts WHERE items_fts MATCH :fts)")
+        params["fts"] = fts
+    if zone:
+        clauses.append("substr(location, 1, :zone_len) = :zone")
+        params["zone"] = zone
+        params["zone_len"] = len(zone)
+    return clauses, params
+
+
+def _inventory_page_sql(sort_expr: str, clauses) -> str:
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+    return f"""
+        SELECT id, barcode, name, location, quantity, low_threshold, {sort_expr} AS sort_v
+        FROM items
+        {where}
+        ORDER BY {sort_expr}, id
+        LIMIT :limit;
+        """
+
+
+def _keyset_clause(sort_expr: str) -> str:
+    # Range seek on the sort index, then skip ties already shown
+    return f"{sort_expr} >= :after_v AND ({sort_expr} > :after_v OR id > :after_id)"
+
+
+# Default /inventory next-page query; bench_inventory.py checks its plan
+INVENTORY_PAGE_SQL = _inventory_page_sql(INVENTORY_SORTS["name"], [_keyset_clause(INVENTORY_SORTS["name"])])
+
+
+def search_inventory(q="", zone="", sort="name", after=None, limit=100):
+    """
+    One page of inventory, filtered/sorted/paginated in SQL.
+    after: keyset cursor (sort_value, id) from the previous page, or None.
+
+    Returns (rows, next_cursor):
+      rows        : list of (barcode, name, location, quantity, low_threshold)
+      next_cursor : (sort_value, id) for the next page, or None on the last page
+    """
+    sort_expr = INVENTORY_SORTS.get(sort, INVENTORY_SORTS["name"])
+    try:
+        limit = max(1, min(int(limit), 500))
+    except Exception:
+        limit = 100
+
+    clauses, params = _inventory_where(q, zone)
+    if after is not None:
+        clauses.append(_keyset_clause(sort_expr))
+        params["after_v"], params["after_id"] = after
+    params["limit"] = limit + 1
+
+    conn = _connect()
+    try:
+        cur = conn.cursor()
+        cur.execute(_inventory_page_sql(sort_expr, clauses), params)
+        rows = cur.fetchall()
+    finally:
+        _release(conn)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = (rows[-1]["sort_v"], rows[-1]["id"])
+    return [(r["barcode"], r["name"], r["location"], r["quantity"], r["low_threshold"]) for r in rows], next_cursor
+
+
+def count_inventory(q="", zone=""):
+    """
+    Returns (matching, total) item counts for the same filters as search_inventory.
+    """
+    clauses, params = _inventory_where(q, zone)
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+    conn = _connect()
+    try:
+        cur = conn.cursor()
+        cur.execute(f"SELECT COUNT(*) FROM items {where};", params)
+        matching = cur.fetchone()[0]
+        cur.execute("SELECT COUNT(*) FROM items;")
+        total = cur.fetchone()[0]
+        return matching, total
+    finally:
+        _release(conn)
+
+
+# Ranked item search (resolve picker / search API). bm25 column weights:
+# name counts most, then barcodes, then location.
+ITEM_SEARCH_SQL = """
+    SELECT i.barcode, i.name, i.location, i.quantity
+    FROM items_fts f
+    JOIN items i ON i.id = f.rowid
+    WHERE items_fts MATCH :fts
+    ORDER BY bm25(items_fts, 10.0, 1.0, 5.0), i.name COLLATE NOCASE
+    LIMIT :limit;
+"""
+
+
+def search_items(q: str, limit=20):
+    """
+    Best matches first for free-text q (name words, location, or any
+    barcode/alias prefix).
+    Returns list of tuples:
+      (barcode, name, location, quantity)
+    """
+    fts = _fts_query(q)
+    if not fts:
+        return []
+    try:
+        limit = max(1, min(int(limit), 100))
+    except Exception:
+        limit = 20
+
+    conn = _connect()
+    try:
+        cur = conn.cursor()
+        cur.execute(ITEM_SEARCH_SQL, {"fts": fts, "limit": limit})
+        return [(r["barcode"], r["name"], r["location"], r["quantity"]) for r in cur.fetchall()]
+    finally:
+        _release(conn)
 
 
 def get_grocery_list():
@@ -333,7 +851,7 @@ def get_grocery_list():
         rows = cur.fetchall()
         return [(r["barcode"], r["name"]) for r in rows]
     finally:
-        conn.close()
+        _release(conn)
 
 
 # ============================================================
@@ -358,101 +876,233 @@ def add_item(barcode: str, name: str, location: str):
 
     conn = _connect()
     try:
+        _begin_write(conn)
         cur = conn.cursor()
 
-        # Insert new item with qty=1
+        # Insert new item with qty=1 (RETURNING gives the row for the index)
         cur.execute(
             """
             INSERT INTO items (barcode, name, location, quantity)
-            VALUES (?, ?, ?, 1);
+            VALUES (?, ?, ?, 1)
+            RETURNING id, barcode, name, location, quantity, low_threshold;
             """,
             (barcode, name, location),
         )
-
-        # Fetch id for grocery sync/logging
-        cur.execute("SELECT id, quantity FROM items WHERE barcode = ?;", (barcode,))
         row = cur.fetchone()
-        if row:
-            _sync_grocery(cur, row["id"], row["quantity"])
         _log_event(cur, barcode, "add_new", delta=1, source="ui")
 
+        _index_put(row)
         conn.commit()
     finally:
-        conn.close()
+        _release(conn)
 
 
-def increment_existing(barcode: str):
+# Resolves a scanned barcode (direct or alias) to an item id inside the
+# same statement, so a scan needs no separate resolve_barcode() round trip.
+_ITEM_ID_FOR_BARCODE_SQL = """
+    SELECT id FROM items WHERE barcode = :barcode
+    UNION ALL
+    SELECT item_id FROM barcode_aliases WHERE barcode = :barcode
+    LIMIT 1
+"""
+
+
+def _apply_scan(barcode: str, delta: int, event_type: str):
     """
-    +1 quantity. Supports alias barcodes.
+    Applies a +1/-1 scan in ONE transaction:
+      alias resolve + UPDATE ... RETURNING + event log.
+    grocery_list follows via the db.py triggers (only when it hits/leaves 0).
+    Quantity floors at 0: a remove at 0 changes nothing and logs nothing
+    (like apply_scans), so it doesn't count as usage in the rollups.
+
+    Returns:
+      (barcode, name, location, quantity, low_threshold) for the canonical item
+    or None if the barcode is unknown.
     """
     barcode = (barcode or "").strip()
     if not barcode:
         raise ValueError("Barcode required")
 
-    canonical = resolve_barcode(barcode)
-    if canonical:
-        barcode = canonical
-
     conn = _connect()
     try:
+        _begin_write(conn)
         cur = conn.cursor()
         cur.execute(
-            """
+            f"""
             UPDATE items
-            SET quantity = quantity + 1
-            WHERE barcode = ?;
+            SET quantity = MAX(quantity + :delta, 0)
+            WHERE id = ({_ITEM_ID_FOR_BARCODE_SQL})
+              AND MAX(quantity + :delta, 0) != quantity
+            RETURNING id, barcode, name, location, quantity, low_threshold;
             """,
-            (barcode,),
+            {"barcode": barcode, "delta": int(delta)},
         )
-
-        cur.execute("SELECT id, quantity FROM items WHERE barcode = ?;", (barcode,))
         row = cur.fetchone()
         if not row:
-            raise ValueError("Item not found")
+            # Unknown, or a remove already floored at 0 (nothing to log)
+            cur.execute(
+                f"""
+                SELECT id, barcode, name, location, quantity, low_threshold
+                FROM items WHERE id = ({_ITEM_ID_FOR_BARCODE_SQL});
+                """,
+                {"barcode": barcode},
+            )
+            row = cur.fetchone()
+            if not row:
+                return None
+            return (row["barcode"], row["name"], row["location"], row["quantity"], row["low_threshold"])
 
-        _sync_grocery(cur, row["id"], row["quantity"])
-        _log_event(cur, barcode, "add", delta=1, source="ui")
+        # delta is +1/-1 and the row changed, so it was applied in full
+        _log_event(cur, row["barcode"], event_type, delta=delta, source="ui")
 
+        _index_put(row)
         conn.commit()
+        return (row["barcode"], row["name"], row["location"], row["quantity"], row["low_threshold"])
     finally:
-        conn.close()
+        _release(conn)
 
 
-def remove_one(barcode: str):
+def scan_in(barcode: str):
     """
-    -1 quantity, floor at 0. Supports alias barcodes.
+    +1 quantity in a single transaction. Supports alias barcodes.
+    Returns the updated item tuple, or None if the barcode is unknown.
     """
-    barcode = (barcode or "").strip()
-    if not barcode:
-        raise ValueError("Barcode required")
+    return _apply_scan(barcode, 1, "add")
 
-    canonical = resolve_barcode(barcode)
-    if canonical:
-        barcode = canonical
 
-    conn = _connect()
-    try:
-        cur = conn.cursor()
-        cur.execute(
-            """
-            UPDATE items
-            SET quantity = CASE WHEN quantity > 0 THEN quantity - 1 ELSE 0 END
-            WHERE barcode = ?;
-            """,
-            (barcode,),
+def scan_out(barcode: str):
+    """
+    -1 quantity (floor at 0) in a single transaction. Supports alias barcodes.
+    Returns the updated item tuple, or None if the barcode is unknown.
+    """
+    return _apply_scan(barcode, -1, "remove")
+
+
+def increment_existing(barcode: str):
+    """
+    +1 quantity. Supports alias barcodes.
+    """
+    if scan_in(barcode) is None:
+        raise ValueError("Item not found")
+
+
+def remove_one(barcode: str):
+    """
+    -1 quantity, floor at 0. Supports alias barcodes.
+    """
+    if scan_out(barcode) is None:
+        raise ValueError("Item not found")
+
+
+def apply_scans(scans):
+    """
+    Applies a burst of scans (e.g. unloading groceries) in ONE transaction.
+    scans: iterable of (barcode, delta) pairs, applied in order.
+
+    Returns a list of (barcode, status) in input order. status is:
+      "ok"      - applied
+      "floored" - a remove would go below 0 and was clamped
+      "unknown" - not an item or alias; positive scans are queued in
+                  pending_scans so they can be resolved afterwards
+      "invalid" - blank barcode or non-integer / zero delta
+    """
+    results = []
+    known = []  # (result index, index entry, delta)
+    unknown = {}  # barcode -> positive scan count
+
+    for barcode, delta in scans:
+        barcode = (barcode or "").strip()
+        try:
+            delta = int(delta)
+        except Exception:
+            delta = 0
+        if not barcode or delta == 0:
+            results.append((barcode, "invalid"))
+            continue
+
+        entry = _index_lookup(barcode)
+        if entry is None:
+            results.append((barcode, "unknown"))
+            if delta > 0:
+                unknown[barcode] = unknown.get(barcode, 0) + delta
+            continue
+
+        results.append((barcode, "ok"))
+        known.append((len(results) - 1, entry, delta))
+
+    if not known and not unknown:
+        return results
+
+    now = _now_utc_iso()
+    conn = _connect()
+    try:
+        _begin_write(conn)
+        cur = conn.cursor()
+
+        # Current quantities, so per-scan floor results can be reported
+        item_ids = sorted({entry[0] for _i, entry, _d in known})
+        qty = {}
+        if item_ids:
+            marks = ",".join("?" * len(item_ids))
+            cur.execute(f"SELECT id, quantity FROM items WHERE id IN ({marks});", item_ids)
+            qty = {r["id"]: r["quantity"] for r in cur.fetchall()}
+
+        updates = []
+        events = []
+        for i, entry, delta in known:
+            item_id = entry[0]
+            if item_id not in qty:
+                # deleted since the index was read
+                results[i] = (results[i][0], "unknown")
+                continue
+            new_qty = qty[item_id] + delta
+            if new_qty < 0:
+                new_qty = 0
+                results[i] = (results[i][0], "floored")
+            # Log what was applied, not what was asked for: removing 5 of
+            # 3 is 3 used (the usage rollups and forecasts sum these)
+            applied = new_qty - qty[item_id]
+            qty[item_id] = new_qty
+            if applied == 0:
+                continue
+            updates.append((applied, item_id))
+            events.append((now, entry[1], "add" if applied > 0 else "remove", applied, "batch"))
+
+        cur.executemany(
+            "UPDATE items SET quantity = MAX(quantity + ?, 0) WHERE id = ?;",
+            updates,
         )
+        _log_events(cur, events)
 
-        cur.execute("SELECT id, quantity FROM items WHERE barcode = ?;", (barcode,))
-        row = cur.fetchone()
-        if not row:
-            raise ValueError("Item not found")
+        if unknown:
+            cur.executemany(
+                """
+                INSERT INTO pending_scans (barcode, scans, first_seen, last_seen)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(barcode) DO UPDATE SET
+                  scans = scans + excluded.scans,
+                  last_seen = excluded.last_seen;
+                """,
+                [(b, n, now, now) for b, n in unknown.items()],
+            )
 
-        _sync_grocery(cur, row["id"], row["quantity"])
-        _log_event(cur, barcode, "remove", delta=-1, source="ui")
+        rows = []
+        if item_ids:
+            cur.execute(
+                f"""
+                SELECT id, barcode, name, location, quantity, low_threshold
+                FROM items WHERE id IN ({marks});
+                """,
+                item_ids,
+            )
+            rows = cur.fetchall()
 
+        for row in rows:
+            _index_put(row)
         conn.commit()
+        return results
     finally:
-        conn.close()
+        _release(conn)
 
 
 def delete_item(barcode: str):
@@ -470,6 +1120,7 @@ def delete_item(barcode: str):
 
     conn = _connect()
     try:
+        _begin_write(conn)
         cur = conn.cursor()
         cur.execute("SELECT id FROM items WHERE barcode = ?;", (barcode,))
         row = cur.fetchone()
@@ -491,9 +1142,10 @@ def delete_item(barcode: str):
         cur.execute("DELETE FROM items WHERE id = ?;", (item_id,))
         _log_event(cur, barcode, "delete_item", delta=0, source="ui")
 
+        _index_drop(barcode)
         conn.commit()
     finally:
-        conn.close()
+        _release(conn)
 
 
 def delete_grocery_only(barcode: str):
@@ -511,6 +1163,7 @@ def delete_grocery_only(barcode: str):
 
     conn = _connect()
     try:
+        _begin_write(conn)
         cur = conn.cursor()
         cur.execute("SELECT id FROM items WHERE barcode = ?;", (barcode,))
         row = cur.fetchone()
@@ -522,7 +1175,7 @@ def delete_grocery_only(barcode: str):
 
         conn.commit()
     finally:
-        conn.close()
+        _release(conn)
 
 
 def move_location(barcode: str, new_location: str):
@@ -543,30 +1196,423 @@ def move_location(barcode: str, new_location: str):
 
     conn = _connect()
     try:
+        _begin_write(conn)
         cur = conn.cursor()
         cur.execute(
             """
             UPDATE items
             SET location = ?
-            WHERE barcode = ?;
+            WHERE barcode = ?
+            RETURNING id, barcode, name, location, quantity, low_threshold;
             """,
             (new_location, barcode),
         )
-        if cur.rowcount == 0:
+        row = cur.fetchone()
+        if not row:
             raise ValueError("Item not found")
 
         _log_event(cur, barcode, "move", delta=0, source="ui")
+        _index_put(row)
         conn.commit()
     finally:
-        conn.close()
+        _release(conn)
 
 
 # ============================================================
-# SECTION: Name Lookup (placeholder)
+# SECTION: Pending Scans (unknown barcodes from batch scans)
 # ============================================================
 
+def get_pending_scans():
+    """
+    Returns list of tuples:
+      (barcode, scans, first_seen)
+    oldest first.
+    """
+    conn = _connect()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT barcode, scans, first_seen
+            FROM pending_scans
+            ORDER BY first_seen, barcode;
+            """
+        )
+        return [(r["barcode"], r["scans"], r["first_seen"]) for r in cur.fetchall()]
+    finally:
+        _release(conn)
+
+
+def pop_pending_scan(barcode: str):
+    """
+    Removes a barcode from the pending queue.
+    Returns how many times it was scanned while unknown (0 if not queued).
+    """
+    barcode = (barcode or "").strip()
+    if not barcode:
+        return 0
+
+    conn = _connect()
+    try:
+        _begin_write(conn)
+        cur = conn.cursor()
+        cur.execute("DELETE FROM pending_scans WHERE barcode = ? RETURNING scans;", (barcode,))
+        row = cur.fetchone()
+        conn.commit()
+        return int(row["scans"]) if row else 0
+    finally:
+        _release(conn)
+
+
+# ============================================================
+# SECTION: Name Lookup (offline product names)
+# ============================================================
+
+def _barcode_variants(barcode: str):
+    """
+    The same product can be stored as UPC-A (12 digits) or as EAN-13
+    with a leading 0, depending on the dump and on the scanner.
+    """
+    if len(barcode) == 12 and barcode.isdigit():
+        return (barcode, "0" + barcode)
+    if len(barcode) == 13 and barcode.startswith("0") and barcode.isdigit():
+        return (barcode, barcode[1:])
+    return (barcode, barcode)
+
+
 def lookup_name_by_barcode(barcode: str):
-    return None
+    """
+    Suggested name for an unknown barcode from barcode_cache, or None.
+    One primary-key probe (two for UPC/EAN variants, the exact barcode
+    wins if both are cached); no network.
+    """
+    barcode = (barcode or "").strip()
+    if not barcode:
+        return None
+
+    conn = _connect()
+    try:
+        cur = conn.cursor()
+        try:
+            exact, variant = _barcode_variants(barcode)
+            cur.execute(
+                """
+                SELECT name FROM barcode_cache
+                WHERE barcode IN (:exact, :variant)
+                ORDER BY barcode = :exact DESC
+                LIMIT 1;
+                """,
+                {"exact": exact, "variant": variant},
+            )
+        except sqlite3.OperationalError:
+            return None
+        row = cur.fetchone()
+        return row["name"] if row else None
+    finally:
+        _release(conn)
+
+
+def count_product_names() -> int:
+    conn = _connect()
+    try:
+        try:
+            return conn.execute("SELECT COUNT(*) FROM barcode_cache;").fetchone()[0]
+        except sqlite3.OperationalError:
+            return 0
+    finally:
+        _release(conn)
+
+
+def import_product_names(rows, source="import", batch_size=PRODUCT_BATCH_ROWS,
+                         progress_rows=PRODUCT_PROGRESS_ROWS, replace=False, progress=None):
+    """
+    Bulk-loads (barcode, name) pairs into barcode_cache.
+
+    rows is any iterator (product_names.py streams it from a dump file),
+    so memory stays flat. Each batch_size rows are read from it first and
+    then written as one short transaction, so the write lock is never
+    held while the dump is parsed: scans get the lock between batches,
+    and an interrupted import keeps what it loaded.
+    Existing barcodes are overwritten. replace=True first deletes the
+    rows previously loaded from the same source.
+
+    Uses its own connection, not the thread's pooled one.
+    progress(n) is called about every progress_rows rows, and at the end,
+    with the rows loaded so far.
+    Returns the number of rows loaded.
+    """
+    sql = (
+        "INSERT INTO barcode_cache (barcode, name, source) VALUES (?, ?, ?) "
+        "ON CONFLICT(barcode) DO UPDATE SET name = excluded.name, source = excluded.source;"
+    )
+    conn = _open_connection()
+
+    def write(batch):
+        try:
+            _begin_write(conn)
+            conn.executemany(sql, batch)
+            conn.commit()
+        finally:
+            _release(conn)
+
+    try:
+        if replace:
+            try:
+                _begin_write(conn)
+                conn.execute("DELETE FROM barcode_cache WHERE source = ?;", (source,))
+                conn.commit()
+            finally:
+                _release(conn)
+
+        loaded = 0
+        reported = 0
+        batch = []
+        for barcode, name in rows:
+            batch.append((barcode, name, source))
+            if len(batch) >= batch_size:
+                write(batch)
+                loaded += len(batch)
+                batch = []
+                if progress and loaded - reported >= progress_rows:
+                    progress(loaded)
+                    reported = loaded
+        if batch:
+            write(batch)
+            loaded += len(batch)
+        if progress:
+            progress(loaded)
+        return loaded
+    finally:
+        conn.close()
+
+
+# ============================================================
+# SECTION: Bulk Import (inventory CSV)
+# ============================================================
+
+def _in_chunks(values, n=500):
+    """
+    Splits a list for IN (...) queries (SQLite caps bound parameters).
+    """
+    for i in range(0, len(values), n):
+        yield values[i:i + n]
+
+
+def _import_int(value, label):
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        n = int(float(value))
+    except (ValueError, OverflowError):
+        # OverflowError: "inf", "1e400"
+        raise ValueError(f"{label} is not a number: {value!r}")
+    if n < 0:
+        raise ValueError(f"{label} can't be negative")
+    if n > IMPORT_MAX_INT:
+        raise ValueError(f"{label} is too large: {value!r}")
+    return n
+
+
+def _import_fields(record: dict) -> dict:
+    """
+    Cleans one import record (values are CSV strings or None).
+    Blank name/location/quantity/threshold mean "keep what the item has".
+    Raises ValueError for a bad row.
+    """
+    barcode = (record.get("barcode") or "").strip()
+    if not barcode:
+        raise ValueError("barcode is required")
+    aliases = re.split(r"[\s,;|]+", (record.get("aliases") or "").strip())
+    return {
+        "barcode": barcode,
+        "name": (record.get("name") or "").strip() or None,
+        "location": (record.get("location") or "").strip() or None,
+        "quantity": _import_int(record.get("quantity"), "quantity"),
+        "low_threshold": _import_int(record.get("low_threshold"), "threshold"),
+        "aliases": [a for a in aliases if a and a != barcode],
+    }
+
+
+def _import_batch(cur, batch, totals, on_error):
+    """
+    Upserts one batch of (line_no, record) in the caller's transaction.
+    Rows are merged in Python first (later rows win), so each item is
+    written once per batch, and unchanged items aren't written at all.
+    """
+    rejected = []
+    parsed = []
+    for line_no, record in batch:
+        try:
+            parsed.append((line_no, record, _import_fields(record)))
+        except ValueError as e:
+            rejected.append((line_no, record, str(e)))
+
+    # Current state of every barcode the batch mentions
+    wanted = list({b for _l, _r, f in parsed for b in [f["barcode"]] + f["aliases"]})
+    existing = {}   # barcode -> [id, name, location, quantity, low_threshold]
+    alias_of = {}   # alias   -> canonical barcode
+    for chunk in _in_chunks(wanted):
+        marks = ",".join("?" * len(chunk))
+        cur.execute(
+            f"SELECT id, barcode, name, location, quantity, low_threshold FROM items WHERE barcode IN ({marks});",
+            chunk,
+        )
+        for r in cur.fetchall():
+            existing[r["barcode"]] = [r["id"], r["name"], r["location"], r["quantity"], r["low_threshold"]]
+        cur.execute(
+            f"""
+            SELECT a.barcode AS alias, i.barcode AS barcode, i.id, i.name, i.location, i.quantity, i.low_threshold
+            FROM barcode_aliases a JOIN items i ON i.id = a.item_id
+            WHERE a.barcode IN ({marks});
+            """,
+            chunk,
+        )
+        for r in cur.fetchall():
+            alias_of[r["alias"]] = r["barcode"]
+            existing.setdefault(r["barcode"], [r["id"], r["name"], r["location"], r["quantity"], r["low_threshold"]])
+
+    final = {}      # canonical barcode -> [id or None, name, location, quantity, low_threshold]
+    new_aliases = {}
+    for line_no, record, f in parsed:
+        barcode = alias_of.get(f["barcode"]) or new_aliases.get(f["barcode"]) or f["barcode"]
+        vals = final.get(barcode) or existing.get(barcode)
+        if vals is None:
+            if not f["name"] or not f["location"]:
+                rejected.append((line_no, record, "new item needs a name and a location"))
+                continue
+            vals = [None, f["name"], f["location"], 1, 0]
+        vals = list(vals)
+        for i, key in ((1, "name"), (2, "location"), (3, "quantity"), (4, "low_threshold")):
+            if f[key] is not None:
+                vals[i] = f[key]
+
+        aliases = [a for a in f["aliases"] if a != barcode]
+        clash = [a for a in aliases if a in final or (a in existing and a not in alias_of)]
+        if clash:
+            rejected.append((line_no, record, f"alias {clash[0]} is already an item barcode"))
+            continue
+
+        final[barcode] = vals
+        for a in aliases:
+            new_aliases[a] = barcode
+        totals["ok"] += 1
+
+    for line_no, record, message in sorted(rejected, key=lambda r: r[0]):
+        on_error(line_no, record, message)
+
+    changed = []
+    for barcode, vals in final.items():
+        old = existing.get(barcode)
+        if old is None:
+            totals["added"] += 1
+        elif old[1:] == vals[1:]:
+            totals["unchanged"] += 1
+            continue
+        else:
+            totals["updated"] += 1
+        changed.append((barcode, vals[1], vals[2], vals[3], vals[4]))
+
+    cur.executemany(
+        """
+        INSERT INTO items (barcode, name, location, quantity, low_threshold)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(barcode) DO UPDATE SET
+          name = excluded.name,
+          location = excluded.location,
+          quantity = excluded.quantity,
+          low_threshold = excluded.low_threshold;
+        """,
+        changed,
+    )
+
+    # Ids (new items) and fresh rows for the index
+    rows = []
+    ids = {}
+    for chunk in _in_chunks(list({c[0] for c in changed} | set(new_aliases.values()))):
+        marks = ",".join("?" * len(chunk))
+        cur.execute(
+            f"SELECT id, barcode, name, location, quantity, low_threshold FROM items WHERE barcode IN ({marks});",
+            chunk,
+        )
+        for r in cur.fetchall():
+            ids[r["barcode"]] = r["id"]
+            rows.append(r)
+
+    alias_rows = [(a, ids[b]) for a, b in new_aliases.items() if b in ids and alias_of.get(a) != b]
+    cur.executemany(
+        """
+        INSERT INTO barcode_aliases (barcode, item_id)
+        VALUES (?, ?)
+        ON CONFLICT(barcode) DO UPDATE SET item_id = excluded.item_id;
+        """,
+        alias_rows,
+    )
+    totals["aliases"] += len(alias_rows)
+
+    now = _now_utc_iso()
+    _log_events(cur, [(now, c[0], "import", 0, "import") for c in changed])
+
+    resolved = [(b,) for b in list(final) + list(new_aliases)]
+    cur.executemany("DELETE FROM pending_scans WHERE barcode = ?;", resolved)
+    return rows, new_aliases
+
+
+def import_items(rows, batch_size=IMPORT_BATCH_ROWS, on_error=None, progress=None):
+    """
+    Bulk upsert of inventory rows, e.g. a spreadsheet or a new Pi.
+
+    rows: iterator of (line_no, record); record has "barcode" and any of
+    "name", "location", "quantity", "low_threshold", "aliases" (barcodes
+    separated by spaces/commas/;/|) as strings. An existing barcode (or
+    alias) updates that item, with blank fields left as they are; a new
+    barcode creates an item (name + location required, quantity
+    defaults to 1). Quantities are absolute, not deltas, and are logged
+    as "import" events with delta 0, so they don't count as usage.
+
+    Each batch_size rows are one transaction, so memory stays flat and
+    scans can get in between batches. on_error(line_no, record, message)
+    is called for every rejected row; progress(totals) after each batch.
+    Returns totals: {"rows", "ok", "added", "updated", "unchanged", "aliases", "errors"}
+    """
+    totals = {"rows": 0, "ok": 0, "added": 0, "updated": 0, "unchanged": 0, "aliases": 0, "errors": 0}
+
+    def reject(line_no, record, message):
+        totals["errors"] += 1
+        if on_error:
+            on_error(line_no, record, message)
+
+    # Usually runs on a one-off worker thread: its own connection, closed
+    # when the import ends, rather than one pooled for a thread that exits
+    conn = _open_connection()
+
+    def flush(batch):
+        try:
+            _begin_write(conn)
+            cur = conn.cursor()
+            item_rows, aliases = _import_batch(cur, batch, totals, reject)
+            for row in item_rows:
+                _index_put(row)
+            _index_put_aliases(aliases)
+            conn.commit()
+        finally:
+            _release(conn)
+        if progress:
+            progress(totals)
+
+    try:
+        batch = []
+        for line_no, record in rows:
+            totals["rows"] += 1
+            batch.append((line_no, record))
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    finally:
+        conn.close()
+    return totals
 
 
 # ============================================================
@@ -590,43 +1636,114 @@ def set_low_threshold(barcode: str, threshold: int):
 
     conn = _connect()
     try:
+        _begin_write(conn)
         cur = conn.cursor()
         cur.execute(
             """
             UPDATE items
             SET low_threshold = ?
-            WHERE barcode = ?;
+            WHERE barcode = ?
+            RETURNING id, barcode, name, location, quantity, low_threshold;
             """,
             (threshold, barcode),
         )
-        if cur.rowcount == 0:
+        row = cur.fetchone()
+        if not row:
             raise ValueError("Item not found")
         _log_event(cur, barcode, "set_low_threshold", delta=0, source="ui")
+        _index_put(row)
         conn.commit()
     finally:
-        conn.close()
+        _release(conn)
+
+
+# low_stock_items (db.py) reads only idx_items_low_stock, which holds just
+# the items at/below threshold, already in name order
+LOW_STOCK_SQL = """
+    SELECT barcode, name, location, quantity, low_threshold
+    FROM low_stock_items
+    ORDER BY name COLLATE NOCASE;
+"""
 
 
 def get_low_stock():
     conn = _connect()
     try:
         cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT barcode, name, location, quantity, low_threshold
-            FROM items
-            WHERE low_threshold > 0
-              AND quantity > 0
-              AND quantity <= low_threshold
-            ORDER BY name COLLATE NOCASE;
-            """
-        )
+        cur.execute(LOW_STOCK_SQL)
         rows = cur.fetchall()
         return [(r["barcode"], r["name"], r["location"], r["quantity"], r["low_threshold"]) for r in rows]
+    finally:
+        _release(conn)
+
+
+# ============================================================
+# SECTION: Streaming Reads (exports)
+# ============================================================
+
+def _iter_query(sql: str, params=(), batch=500):
+    """
+    Yields rows `batch` at a time from a dedicated read connection, so
+    memory stays flat however big the table. The connection is closed when
+    the generator finishes or is closed early (client disconnect).
+    """
+    conn = _open_connection()
+    try:
+        cur = conn.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                break
+            yield from rows
     finally:
         conn.close()
 
 
+def iter_inventory():
+    """
+    Same rows/order as get_inventory(), streamed:
+      (barcode, name, location, quantity, low_threshold)
+    """
+    for r in _iter_query(
+        """
+        SELECT barcode, name, location, quantity, low_threshold
+        FROM items
+        ORDER BY name COLLATE NOCASE ASC;
+        """
+    ):
+        yield (r["barcode"], r["name"], r["location"], r["quantity"], r["low_threshold"])
+
+
+def iter_grocery_list():
+    """
+    Same rows/order as get_grocery_list(), streamed:
+      (barcode, name)
+    """
+    for r in _iter_query(
+        """
+        SELECT i.barcode AS barcode, i.name AS name
+        FROM grocery_list g
+        JOIN items i ON i.id = g.item_id
+        ORDER BY g.added_date DESC;
+        """
+    ):
+        yield (r["barcode"], r["name"])
+
+
+def iter_event_log(limit=None):
+    """
+    Event log, most recent first, streamed. limit=None streams all of it.
+      (created_at, barcode, event_type, delta, source)
+    """
+    sql = "SELECT created_at, barcode, event_type, delta, source FROM event_log ORDER BY id DESC"
+    params = ()
+    if limit is not None:
+        sql += " LIMIT ?"
+        params = (int(limit),)
+    for r in _iter_query(sql + ";", params):
+        yield (r["created_at"], r["barcode"], r["event_type"], r["delta"], r["source"])
+
+
 # ============================================================
 # SECTION: Stats + Debug
 # ============================================================
@@ -658,7 +1775,24 @@ def get_event_log(limit=200):
         except sqlite3.OperationalError:
             return []
     finally:
-        conn.close()
+        _release(conn)
+
+
+# Reads at most `days` rows per item from the rollup (primary key range scan);
+# bench_inventory.py checks the plan.
+STATS_USAGE_SQL = """
+    SELECT COALESCE(SUM(adds), 0) AS adds, COALESCE(SUM(removes), 0) AS removes
+    FROM daily_item_usage
+    WHERE item_id = ?
+      AND day >= ?;
+"""
+
+
+def _window_start_day(days: int) -> str:
+    """
+    First UTC day of a window of `days` calendar days ending today.
+    """
+    return (datetime.utcnow() - timedelta(days=max(1, days) - 1)).strftime("%Y-%m-%d")
 
 
 def get_item_stats(barcode: str, days=28):
@@ -666,15 +1800,11 @@ def get_item_stats(barcode: str, days=28):
     if not barcode:
         return {"found": False}
 
-    canonical = resolve_barcode(barcode)
-    if canonical:
-        barcode = canonical
-
-    item = get_item_by_barcode(barcode)
-    if not item:
+    entry = _index_lookup(barcode)
+    if not entry:
         return {"found": False}
 
-    _barcode, name, location, qty, low = item
+    item_id, barcode, name, location, qty, low = entry
     qty = int(qty)
     low = int(low) if low else 0
 
@@ -683,34 +1813,21 @@ def get_item_stats(barcode: str, days=28):
     except Exception:
         days = 28
 
-    cutoff = (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
-
     conn = _connect()
     try:
         cur = conn.cursor()
         try:
-            cur.execute(
-                """
-                SELECT event_type, delta
-                FROM event_log
-                WHERE barcode = ?
-                  AND created_at >= ?;
-                """,
-                (barcode, cutoff),
-            )
-            rows = cur.fetchall()
+            cur.execute(STATS_USAGE_SQL, (item_id, _window_start_day(days)))
+            row = cur.fetchone()
+            adds, removes = int(row["adds"]), int(row["removes"])
         except sqlite3.OperationalError:
-            rows = []
+            adds, removes = 0, 0
     finally:
-        conn.close()
-
-    adds = sum(1 for r in rows if int(r["delta"]) > 0)
-    removes = sum(1 for r in rows if int(r["delta"]) < 0)
-    removes_total = sum(abs(int(r["delta"])) for r in rows if int(r["delta"]) < 0)
+        _release(conn)
 
-    per_week = round((removes_total / max(1, days)) * 7, 2)
+    per_week = round((removes / max(1, days)) * 7, 2)
 
-    removes_per_day = removes_total / max(1, days)
+    removes_per_day = removes / max(1, days)
     est_days_left = None
     if removes_per_day > 0:
         est_days_left = int(round(qty / removes_per_day))
@@ -729,6 +1846,326 @@ def get_item_stats(barcode: str, days=28):
     }
 
 
+# Whole-inventory removals for the window in ONE grouped query.
+FORECAST_SQL = """
+    SELECT i.barcode AS barcode, i.name AS name, i.location AS location,
+           i.quantity AS quantity, i.low_threshold AS low_threshold,
+           COALESCE(SUM(u.removes), 0) AS removes
+    FROM items i
+    LEFT JOIN daily_item_usage u
+      ON u.item_id = i.id AND u.day >= ?
+    GROUP BY i.id;
+"""
+
+
+def forecast_all(days=28):
+    """
+    Run-out forecast for every item from the last `days` of removals.
+
+    Returns list of dicts sorted by urgency (soonest run-out first; items
+    with no removals in the window last, by name):
+      barcode, name, location, quantity, low_threshold,
+      removes, per_week, days_left (None = no usage), runout_date (YYYY-MM-DD or None)
+    """
+    try:
+        days = int(days)
+    except Exception:
+        days = 28
+    days = max(1, days)
+
+    conn = _connect()
+    try:
+        cur = conn.cursor()
+        try:
+            cur.execute(FORECAST_SQL, (_window_start_day(days),))
+            rows = cur.fetchall()
+        except sqlite3.OperationalError:
+            rows = []
+    finally:
+        _release(conn)
+
+    today = datetime.utcnow().date()
+    out = []
+    for r in rows:
+        qty = int(r["quantity"])
+        removes = int(r["removes"])
+        per_day = removes / days
+        days_left = None
+        runout_date = None
+        if per_day > 0:
+            days_left = round(max(qty, 0) / per_day, 1)
+            runout_date = (today + timedelta(days=int(days_left))).strftime("%Y-%m-%d")
+        out.append({
+            "barcode": r["barcode"],
+            "name": r["name"],
+            "location": r["location"],
+            "quantity": qty,
+            "low_threshold": int(r["low_threshold"]) if r["low_threshold"] else 0,
+            "removes": removes,
+            "per_week": round(per_day * 7, 2),
+            "days_left": days_left,
+            "runout_date": runout_date,
+        })
+
+    out.sort(key=lambda f: (f["days_left"] is None, f["days_left"] or 0, f["name"].lower()))
+    return out
+
+
+# ============================================================
+# SECTION: Event Log Retention + Maintenance
+# ============================================================
+
+def _archive_events(cur, cutoff: str):
+    """
+    Appends event_log rows older than cutoff to one gzip JSONL file per
+    month next to the DB (event_archive/events-YYYY-MM.jsonl.gz).
+    Gzip members concatenate, so appending keeps each file readable with
+    gzip.open(). Each line carries the row id; if a run dies after
+    archiving but before the prune commits, the replay may repeat lines,
+    and the id identifies them.
+    Returns number of rows written.
+    """
+    archive_dir = os.path.join(os.path.dirname(DB_PATH), EVENT_ARCHIVE_DIRNAME)
+    os.makedirs(archive_dir, exist_ok=True)
+
+    files = {}
+    written = 0
+    try:
+        cur.execute(
+            """
+            SELECT id, created_at, barcode, event_type, delta, source
+            FROM event_log
+            WHERE created_at < ?
+            ORDER BY id;
+            """,
+            (cutoff,),
+        )
+        for r in cur:
+            month = (r["created_at"] or "")[:7] or "unknown"
+            f = files.get(month)
+            if f is None:
+                f = gzip.open(os.path.join(archive_dir, f"events-{month}.jsonl.gz"), "at", encoding="utf-8")
+                files[month] = f
+            f.write(json.dumps(dict(r), separators=(",", ":")) + "\n")
+            written += 1
+    finally:
+        for f in files.values():
+            f.close()
+    return written
+
+
+def prune_event_log(retention_days=180, archive=True):
+    """
+    Folds event_log rows older than retention_days into monthly_item_usage
+    and deletes them, in one transaction. With archive=True the raw rows
+    are first appended to the monthly gzip archive.
+    daily_item_usage is left alone, so stats/forecast windows are unaffected.
+
+    Returns dict: {"cutoff", "archived", "pruned"}
+    """
+    try:
+        retention_days = int(retention_days)
+    except Exception:
+        retention_days = 180
+    retention_days = max(30, retention_days)
+
+    cutoff = (datetime.utcnow() - timedelta(days=retention_days)).strftime("%Y-%m-%d %H:%M:%S")
+
+    conn = _connect()
+    try:
+        _begin_write(conn)
+        cur = conn.cursor()
+        archived = _archive_events(cur, cutoff) if archive else 0
+
+        cur.execute(
+            """
+            INSERT INTO monthly_item_usage (barcode, month, adds, removes, events)
+            SELECT COALESCE(barcode, ''), substr(created_at, 1, 7),
+                   SUM(CASE WHEN delta > 0 THEN delta ELSE 0 END),
+                   SUM(CASE WHEN delta < 0 THEN -delta ELSE 0 END),
+                   COUNT(*)
+            FROM event_log
+            WHERE created_at < ?
+            GROUP BY COALESCE(barcode, ''), substr(created_at, 1, 7)
+            ON CONFLICT(barcode, month) DO UPDATE SET
+              adds = adds + excluded.adds,
+              removes = removes + excluded.removes,
+              events = events + excluded.events;
+            """,
+            (cutoff,),
+        )
+        cur.execute("DELETE FROM event_log WHERE created_at < ?;", (cutoff,))
+        pruned = cur.rowcount
+        conn.commit()
+        return {"cutoff": cutoff, "archived": archived, "pruned": pruned}
+    finally:
+        _release(conn)
+
+
+def run_maintenance(retention_days=180, archive=True, min_interval_seconds=0, vacuum_pages=2000):
+    """
+    Periodic housekeeping: event retention, then an incremental vacuum of
+    at most vacuum_pages free pages (never a blocking full VACUUM).
+
+    min_interval_seconds lets several workers share one schedule: a run is
+    skipped if any process finished one more recently than that. A last
+    run stamped in the future (the clock was stepped back, e.g. a Pi with
+    no RTC before NTP sync) counts as due, so 0 always runs.
+    Returns the prune stats dict, or None if skipped.
+    """
+    now = datetime.utcnow()
+    now_s = now.strftime("%Y-%m-%d %H:%M:%S")
+    due_before = (now - timedelta(seconds=int(min_interval_seconds))).strftime("%Y-%m-%d %H:%M:%S")
+
+    conn = _connect()
+    try:
+        _begin_write(conn)
+        cur = conn.cursor()
+        # Claim the run atomically: only one worker's UPDATE matches
+        cur.execute(
+            "INSERT OR IGNORE INTO app_meta (key, value) VALUES ('maintenance_last_run', '1970-01-01 00:00:00');"
+        )
+        cur.execute(
+            "UPDATE app_meta SET value = ? WHERE key = 'maintenance_last_run' AND (value <= ? OR value > ?);",
+            (now_s, due_before, now_s),
+        )
+        claimed = cur.rowcount == 1
+        conn.commit()
+    finally:
+        _release(conn)
+
+    if not claimed:
+        return None
+
+    stats = prune_event_log(retention_days, archive=archive)
+
+    conn = _connect()
+    try:
+        # executescript steps the pragma to completion; execute() would only
+        # free one page per call.
+        conn.executescript(f"PRAGMA incremental_vacuum({int(vacuum_pages)});")
+        stats["freelist_pages"] = conn.execute("PRAGMA freelist_count;").fetchone()[0]
+    finally:
+        _release(conn)
+    return stats
+
+
+# ============================================================
+# SECTION: Shared State (app_meta, visible to every worker)
+# ============================================================
+
+def meta_get(key: str, default=None):
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT value FROM app_meta WHERE key = ?;", (key,)).fetchone()
+        return row["value"] if row else default
+    finally:
+        _release(conn)
+
+
+def meta_update(key: str, fn):
+    """
+    Read-modify-write of one app_meta value under the write lock, so it
+    is atomic across threads and gunicorn workers (state that lives in a
+    module global is only seen by one worker).
+    fn(old value or None) returns the new value, or None to leave it.
+    Returns what fn returned.
+    """
+    conn = _connect()
+    try:
+        _begin_write(conn)
+        cur = conn.cursor()
+        row = cur.execute("SELECT value FROM app_meta WHERE key = ?;", (key,)).fetchone()
+        value = fn(row["value"] if row else None)
+        if value is not None:
+            cur.execute(
+                "INSERT INTO app_meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value;",
+                (key, str(value)),
+            )
+        conn.commit()
+        return value
+    finally:
+        _release(conn)
+
+
+# ============================================================
+# SECTION: Backup + Restore (online, consistent)
+# ============================================================
+
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def backup_database(dest_path: str, step_pages=BACKUP_STEP_PAGES):
+    """
+    Writes a consistent copy of the live DB to dest_path with the sqlite3
+    online backup API. Unlike copying inventory.db, this includes commits
+    still sitting in the -wal file and can't be torn by a concurrent write.
+
+    Runs step_pages at a time with a short sleep between steps, so scans
+    are never blocked for long. A write from another connection mid-copy
+    makes SQLite restart the copy, which costs little for a kitchen-sized
+    DB. The copy is switched to a rollback journal, so it is a single
+    self-contained file, and then checked with PRAGMA integrity_check.
+
+    Returns dict: {"bytes", "pages", "sha256", "integrity"}
+    """
+    src = _open_connection()
+    dst = sqlite3.connect(dest_path)
+    try:
+        src.backup(dst, pages=max(1, int(step_pages)), sleep=BACKUP_STEP_SLEEP)
+        dst.execute("PRAGMA journal_mode=DELETE;")
+        pages = dst.execute("PRAGMA page_count;").fetchone()[0]
+        integrity = "; ".join(r[0] for r in dst.execute("PRAGMA integrity_check;"))
+    finally:
+        dst.close()
+        src.close()
+
+    return {
+        "bytes": os.path.getsize(dest_path),
+        "pages": pages,
+        "sha256": _file_sha256(dest_path),
+        "integrity": integrity,
+    }
+
+
+def restore_database(staged_path: str):
+    """
+    Replaces the live DB's contents with a staged file that has already
+    passed db.prepare_restore().
+
+    Goes through the backup API in a single step rather than renaming
+    files: SQLite holds the write lock for the whole copy, so every
+    connection (other threads, other workers) sees either the old DB or
+    the new one, never a mix, and the live -wal/-shm stay consistent.
+    Scans arriving meanwhile wait on busy_timeout. Afterwards
+    pooled connections are retired and the item index is rebuilt. The
+    staged file has a new generation epoch (db.prepare_restore), so other
+    processes rebuild their index and db_generation() tokens change.
+    """
+    src = sqlite3.connect(staged_path)
+    dst = _open_connection()
+    try:
+        # A WAL-mode destination needs the same page size
+        live_size = dst.execute("PRAGMA page_size;").fetchone()[0]
+        if src.execute("PRAGMA page_size;").fetchone()[0] != live_size:
+            src.execute(f"PRAGMA page_size = {int(live_size)};")
+            src.execute("VACUUM;")
+        src.backup(dst)
+        dst.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+    finally:
+        dst.close()
+        src.close()
+
+    retire_connections()
+    load_item_index()
+
+
 # ============================================================
 # SECTION: Locations
 # ============================================================
@@ -741,7 +2178,7 @@ def get_locations():
         rows = cur.fetchall()
         return [{"name": r["name"], "has_shelves": bool(r["has_shelves"])} for r in rows]
     finally:
-        conn.close()
+        _release(conn)
 
 
 def add_location(name: str, has_shelves: bool):
@@ -751,6 +2188,7 @@ def add_location(name: str, has_shelves: bool):
 
     conn = _connect()
     try:
+        _begin_write(conn)
         cur = conn.cursor()
         cur.execute(
             "INSERT INTO locations (name, has_shelves) VALUES (?, ?);",
@@ -760,7 +2198,7 @@ def add_location(name: str, has_shelves: bool):
     except sqlite3.IntegrityError:
         raise ValueError("Location already exists")
     finally:
-        conn.close()
+        _release(conn)
 
 
 def delete_location(name: str):
@@ -770,10 +2208,11 @@ def delete_location(name: str):
 
     conn = _connect()
     try:
+        _begin_write(conn)
         cur = conn.cursor()
         cur.execute("DELETE FROM locations WHERE name = ?;", (name,))
         if cur.rowcount == 0:
             raise ValueError("Location not found")
         conn.commit()
     finally:
-        conn.close()
+        _release(conn)
@@ -0,0 +1,170 @@
+# ============================================================
+# FILE: inventory_import.py
+# StockPi — Bulk inventory import from CSV
+#
+# Streams a CSV (or a spreadsheet saved as CSV) into the items table
+# through inventory.import_items(): large transactional batches, aliases
+# included, existing barcodes updated in place. The file is read row by
+# row, so tens of thousands of rows need no more memory than a few.
+#
+# Columns (header names are matched loosely, any order, extras ignored):
+#   barcode   (required)  barcode / upc / ean / code
+#   name                  name / item / product
+#   location              location / zone
+#   quantity              quantity / qty / count
+#   low_threshold         low_threshold / threshold / low
+#   aliases               aliases / alias  (other barcodes, space/;/| separated)
+# The inventory CSV export (/export/inventory.csv) imports as-is.
+#
+# Rejected rows are written to an error CSV: the original columns plus
+# "line" and "error", so it can be fixed and imported again.
+#
+# Usage (from kitchen_inventory/):
+#   python inventory_import.py items.csv
+#   python inventory_import.py items.csv --errors rejected.csv
+# Tools -> Import runs the same thing in a background thread.
+# ============================================================
+
+# ============================================================
+# SECTION: Imports
+# ============================================================
+import argparse
+import csv
+import os
+import time
+
+import db as _db
+import inventory
+
+# ============================================================
+# SECTION: Constants
+# ============================================================
+COLUMN_NAMES = {
+    "barcode": ("barcode", "upc", "ean", "code"),
+    "name": ("name", "item", "item_name", "product", "product_name"),
+    "location": ("location", "zone", "loc"),
+    "quantity": ("quantity", "qty", "count"),
+    "low_threshold": ("low_threshold", "threshold", "low", "low_stock"),
+    "aliases": ("aliases", "alias", "alt_barcodes"),
+}
+
+DELIMITERS = ",;\t"
+
+# ============================================================
+# SECTION: Reading
+# ============================================================
+
+def _column_map(header) -> dict:
+    """
+    field -> column index, from the header row.
+    Raises ValueError if there is no barcode column.
+    """
+    cleaned = [(h or "").strip().lower().replace(" ", "_") for h in header]
+    columns = {}
+    for field, names in COLUMN_NAMES.items():
+        for i, h in enumerate(cleaned):
+            if h in names:
+                columns[field] = i
+                break
+    if "barcode" not in columns:
+        raise ValueError("no barcode column in the header")
+    return columns
+
+
+def read_records(f):
+    """
+    Reads the header of an open text file and returns (header, records):
+    records streams (line_no, record), where record maps the import
+    fields to the row's strings and "_raw" keeps the original row for
+    the error file. Raises ValueError if there is no barcode column.
+    """
+    first = f.readline()
+    delimiter = max(DELIMITERS, key=first.count)
+    header = next(csv.reader([first], delimiter=delimiter), [])
+    columns = _column_map(header)
+
+    def records():
+        for line_no, row in enumerate(csv.reader(f, delimiter=delimiter), start=2):
+            if not any(cell.strip() for cell in row):
+                continue
+            record = {field: (row[i] if i < len(row) else "") for field, i in columns.items()}
+            record["_raw"] = row
+            yield line_no, record
+
+    return header, records()
+
+# ============================================================
+# SECTION: Import
+# ============================================================
+
+def run_import(f, error_path: str, progress=None) -> dict:
+    """
+    Imports an open text file. Rejected rows go to error_path (removed
+    again if nothing was rejected). Returns import_items()' totals plus
+    "seconds" and "error_file" (None if no errors).
+    Raises ValueError if the header has no barcode column.
+    """
+    header, records = read_records(f)
+    start = time.perf_counter()
+
+    tmp = error_path + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8", newline="") as err_f:
+            writer = None
+
+            def on_error(line_no, record, message):
+                nonlocal writer
+                if writer is None:
+                    writer = csv.writer(err_f)
+                    writer.writerow(["line", "error"] + header)
+                writer.writerow([line_no, message] + list(record.get("_raw", [])))
+
+            totals = inventory.import_items(records, on_error=on_error, progress=progress)
+    except Exception:
+        os.remove(tmp)
+        raise
+
+    if totals["errors"]:
+        os.replace(tmp, error_path)
+    else:
+        os.remove(tmp)
+    totals["seconds"] = round(time.perf_counter() - start, 2)
+    totals["error_file"] = error_path if totals["errors"] else None
+    return totals
+
+# ============================================================
+# SECTION: CLI
+# ============================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Import inventory rows from a CSV into StockPi")
+    parser.add_argument("path", help="CSV file (barcode, name, location, quantity, low_threshold, aliases)")
+    parser.add_argument("--errors", help="where to write rejected rows (default: <path>.errors.csv)")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.path):
+        parser.error(f"no such file: {args.path}")
+    error_path = args.errors or os.path.splitext(args.path)[0] + ".errors.csv"
+
+    _db.init_db()
+
+    def progress(t):
+        print(f"[Import] {t['rows']:,} rows: {t['added']:,} added, {t['updated']:,} updated, {t['errors']:,} errors")
+
+    with open(args.path, "r", encoding="utf-8-sig", errors="replace", newline="") as f:
+        try:
+            totals = run_import(f, error_path, progress=progress)
+        except ValueError as e:
+            parser.error(str(e))
+
+    print(f"[Import] Done in {totals['seconds']}s: {totals['added']:,} added, {totals['updated']:,} updated, "
+          f"{totals['unchanged']:,} unchanged, {totals['aliases']:,} aliases, {totals['errors']:,} errors")
+    if totals["error_file"]:
+        print(f"[Import] Rejected rows: {totals['error_file']}")
+
+
+# ============================================================
+# SECTION: Main
+# ============================================================
+if __name__ == "__main__":
+    main()
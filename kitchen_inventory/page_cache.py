@@ -0,0 +1,95 @@
+# ============================================================
+# FILE: page_cache.py
+# StockPi — In-memory cache of rendered read pages
+#
+# LRU, bounded by entry count and total bytes. Every entry belongs to
+# one validity token (the DB generation + day from app.py); the first
+# lookup under a new token empties the cache, so any committed write
+# invalidates every cached page at once.
+# ============================================================
+
+# ============================================================
+# SECTION: Imports
+# ============================================================
+import threading
+from collections import OrderedDict
+
+# ============================================================
+# SECTION: Cache
+# ============================================================
+
+class PageCache:
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (body bytes, mimetype)
+        self._bytes = 0
+        self._token = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _reset(self, token):
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+        self._bytes = 0
+        self._token = token
+
+    def get(self, token, key):
+        """
+        Returns (body, mimetype) or None. A new token drops everything.
+        """
+        with self._lock:
+            if token != self._token:
+                self._reset(token)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, token, key, body: bytes, mimetype: str):
+        """
+        Stores a page rendered under `token`. Ignored if the token has
+        moved on since (a write landed while rendering) or the page alone
+        is over a quarter of the byte budget.
+        """
+        size = len(body)
+        if size > self.max_bytes // 4:
+            return
+        with self._lock:
+            if token != self._token:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._entries[key] = (body, mimetype)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _key, (old_body, _mt) = self._entries.popitem(last=False)
+                self._bytes -= len(old_body)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._reset(None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,158 @@
+# ============================================================
+# FILE: product_names.py
+# StockPi — Offline product-name database loader
+#
+# Streams a product dump from disk into barcode_cache, which the resolve
+# page uses to pre-fill the name of an unknown barcode (no network).
+#
+# Understands the Open Food Facts exports:
+#   - CSV  (en.openfoodfacts.org.products.csv[.gz] — tab separated)
+#   - JSONL (openfoodfacts-products.jsonl[.gz])
+# and any other CSV/TSV/JSONL with a barcode column ("code", "barcode",
+# "upc" or "ean") and a name column ("product_name", "name").
+# .gz files are read compressed. The file is never loaded whole.
+#
+# Usage (from kitchen_inventory/, with the kitchen service running or not):
+#   python product_names.py en.openfoodfacts.org.products.csv.gz
+#   python product_names.py products.jsonl --source off --replace
+# ============================================================
+
+# ============================================================
+# SECTION: Imports
+# ============================================================
+import argparse
+import csv
+import gzip
+import json
+import os
+import time
+
+import db as _db
+import inventory
+
+# ============================================================
+# SECTION: Constants
+# ============================================================
+BARCODE_FIELDS = ("code", "barcode", "upc", "ean")
+NAME_FIELDS = ("product_name", "product_name_en", "name")
+BRAND_FIELDS = ("brands", "brand")
+
+NAME_MAX = 120
+
+# Open Food Facts rows carry very long ingredient/nutrient fields
+CSV_FIELD_LIMIT = 16 * 1024 * 1024
+
+# ============================================================
+# SECTION: Row Parsing
+# ============================================================
+
+def _first(record: dict, fields) -> str:
+    for f in fields:
+        v = record.get(f)
+        if isinstance(v, str) and v.strip():
+            return v.strip()
+    return ""
+
+
+def _product(record: dict):
+    """
+    (barcode, name) from one dump record, or None if it has no usable
+    numeric barcode or no name. The first brand is prefixed unless the
+    name already contains it ("Heinz Tomato Ketchup").
+    """
+    barcode = _first(record, BARCODE_FIELDS)
+    if not barcode.isdigit() or not 6 <= len(barcode) <= 14:
+        return None
+
+    name = " ".join(_first(record, NAME_FIELDS).split())
+    if not name:
+        return None
+    brand = _first(record, BRAND_FIELDS).split(",")[0].strip()
+    if brand and brand.lower() not in name.lower():
+        name = f"{brand} {name}"
+    return barcode, name[:NAME_MAX]
+
+
+def _open_text(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace", newline="")
+    return open(path, "r", encoding="utf-8", errors="replace", newline="")
+
+
+def _csv_records(f):
+    first = f.readline()
+    delimiter = "\t" if first.count("\t") > first.count(",") else ","
+    header = next(csv.reader([first], delimiter=delimiter))
+    # OFF's TSV isn't quoted; a stray quote must not swallow the next rows
+    quoting = csv.QUOTE_NONE if delimiter == "\t" else csv.QUOTE_MINIMAL
+    return csv.DictReader(f, fieldnames=header, delimiter=delimiter, quoting=quoting)
+
+
+def _jsonl_records(f):
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(record, dict):
+            yield record
+
+
+def iter_products(path: str, stats: dict):
+    """
+    Streams (barcode, name) pairs from a dump file.
+    stats["read"] / stats["skipped"] are updated as it goes.
+    """
+    base = path[:-3] if path.endswith(".gz") else path
+    is_jsonl = base.endswith((".jsonl", ".ndjson", ".json"))
+
+    csv.field_size_limit(CSV_FIELD_LIMIT)
+    with _open_text(path) as f:
+        records = _jsonl_records(f) if is_jsonl else _csv_records(f)
+        for record in records:
+            stats["read"] += 1
+            product = _product(record)
+            if product is None:
+                stats["skipped"] += 1
+                continue
+            yield product
+
+# ============================================================
+# SECTION: CLI
+# ============================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Load an offline product-name dump into StockPi")
+    parser.add_argument("path", help="CSV/TSV/JSONL dump, optionally .gz")
+    parser.add_argument("--source", default="off", help="label stored with each row (default: off)")
+    parser.add_argument("--replace", action="store_true", help="delete rows from the same source first")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.path):
+        parser.error(f"no such file: {args.path}")
+
+    _db.init_db()
+    stats = {"read": 0, "skipped": 0}
+    start = time.perf_counter()
+
+    def progress(n):
+        print(f"[Products] {n:,} loaded ({stats['read']:,} read, {time.perf_counter() - start:.0f}s)")
+
+    loaded = inventory.import_product_names(
+        iter_products(args.path, stats),
+        source=args.source,
+        replace=args.replace,
+        progress=progress,
+    )
+    print(f"[Products] Done: {loaded:,} names loaded, {stats['skipped']:,} rows skipped, "
+          f"{inventory.count_product_names():,} in barcode_cache")
+
+
+# ============================================================
+# SECTION: Main
+# ============================================================
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+// StockPi kitchen UI — loaded by every page via templates/base.html
+// Banner delays come from data-banner-ms / data-banner-ms-error on the
+// <script> tag (STOCKPI_BANNER_MS / STOCKPI_BANNER_MS_ERROR).
+(function() {
+  var script = document.currentScript;
+  var MS = parseInt((script && script.getAttribute("data-banner-ms")) || "6000", 10);
+  var ERR = parseInt((script && script.getAttribute("data-banner-ms-error")) || "9000", 10);
+
+  // ------------------------------------------------------------
+  // Banner auto-hide: status banners marked data-autohide fade out
+  // after a delay (longer for errors) or on tap.
+  // ------------------------------------------------------------
+  function hide(el) {
+    if (!el) return;
+    el.style.opacity = "0";
+    el.style.transform = "translateY(-6px)";
+    setTimeout(function() {
+      if (el && el.parentNode) el.parentNode.removeChild(el);
+    }, 350);
+  }
+
+  window.addEventListener("load", function() {
+    var el = document.querySelector(".status[data-autohide]");
+    if (!el) return;
+
+    var isError = el.classList.contains("danger") || el.classList.contains("error");
+    var delay = isError ? ERR : MS;
+
+    el.style.cursor = "pointer";
+    el.title = "Tap to dismiss";
+    el.addEventListener("click", function() { hide(el); });
+
+    setTimeout(function() { hide(el); }, delay);
+  });
+
+  // ------------------------------------------------------------
+  // Initial focus: <... data-focus="input id"> focuses + selects it
+  // ------------------------------------------------------------
+  window.addEventListener("load", function() {
+    var holder = document.querySelector("[data-focus]");
+    var el = holder ? document.getElementById(holder.getAttribute("data-focus")) : null;
+    if (el) { el.focus(); el.select(); }
+  });
+
+  // ------------------------------------------------------------
+  // Live scan (home page): the Scan/Remove forms post to /api/scan and
+  // /api/remove with fetch(). The input keeps focus and scans typed while
+  // one is in flight are queued, so a fast scanner gun can't drop
+  // keystrokes. Without JS the forms still post normally.
+  // ------------------------------------------------------------
+  var queue = [];
+  var busy = false;
+  var hideTimer = null;
+
+  function show(msg, cls) {
+    var el = document.getElementById("liveStatus");
+    var old = document.getElementById("statusBanner");
+    if (old && old.parentNode) old.parentNode.removeChild(old);
+    if (queue.length) msg += " • " + queue.length + " queued";
+    el.className = "status " + cls;
+    el.textContent = msg;
+    el.hidden = false;
+    clearTimeout(hideTimer);
+    hideTimer = setTimeout(function() { el.hidden = true; }, cls === "danger" ? ERR : MS);
+  }
+
+  function post(url, body) {
+    return fetch(url, {
+      method: "POST",
+      headers: {"Content-Type": "application/json"},
+      body: JSON.stringify(body)
+    }).then(function(r) { return r.json(); });
+  }
+
+  function pump() {
+    if (busy || !queue.length) return;
+    busy = true;
+    var job = queue.shift();
+    post(job.base + job.api + job.query, {barcode: job.barcode}).then(function(res) {
+      if (res.status === "unknown" && job.api === "/api/scan") {
+        // Hand off to the resolver. Anything still queued goes through
+        // the batch endpoint first so it isn't lost.
+        var rest = queue.splice(0).map(function(j) {
+          return {barcode: j.barcode, delta: j.api === "/api/scan" ? 1 : -1};
+        });
+        var go = function() { window.location = job.base + res.resolve_url; };
+        if (rest.length) post(job.base + "/scan-batch", {scans: rest}).then(go, go);
+        else go();
+        return;
+      }
+      show(res.msg, res.msgtype);
+      busy = false;
+      pump();
+    }, function() {
+      show("Network error: " + job.barcode + " not saved", "danger");
+      busy = false;
+      pump();
+    });
+  }
+
+  function hook(formId, inputId, api) {
+    var form = document.getElementById(formId);
+    var input = document.getElementById(inputId);
+    if (!form || !input || !window.fetch) return;
+
+    // nginx sub_filter rewrites action="/..." when served under /kitchen/,
+    // so take the prefix and querystring from the form, not a hardcoded path.
+    var action = form.getAttribute("action") || "";
+    var base = action.split(form.getAttribute("data-route"))[0];
+    var query = action.indexOf("?") >= 0 ? action.slice(action.indexOf("?")) : "";
+
+    form.addEventListener("submit", function(ev) {
+      ev.preventDefault();
+      var barcode = input.value.trim();
+      input.value = "";
+      input.focus();
+      if (!barcode) return;
+      queue.push({barcode: barcode, base: base, api: api, query: query});
+      pump();
+    });
+  }
+
+  hook("scanForm", "scan_barcode", "/api/scan");
+  hook("removeForm", "remove_barcode", "/api/remove");
+})();
@@ -168,6 +168,13 @@ mkdir -p /var/www/launcher
 cp "$REPO_DIR/launcher/index.html" /var/www/launcher/index.html
 success "Launcher HTML copied to /var/www/launcher."
 
+info "Building static assets (hashed CSS/JS + .gz)..."
+sudo -u "$REAL_USER" python3 "$REPO_DIR/build_assets.py" > /dev/null
+mkdir -p /var/www/stockpi-static/kitchen /var/www/stockpi-static/panel
+cp -r "$REPO_DIR/kitchen_inventory/static/dist/." /var/www/stockpi-static/kitchen/
+cp -r "$REPO_DIR/homepanel/static/dist/." /var/www/stockpi-static/panel/
+success "Static assets copied to /var/www/stockpi-static."
+
 cp "$REPO_DIR/nginx/launcher.conf" /etc/nginx/sites-available/stockpi.conf
 ln -sf /etc/nginx/sites-available/stockpi.conf /etc/nginx/sites-enabled/stockpi.conf
 rm -f /etc/nginx/sites-enabled/default
@@ -247,6 +254,22 @@ systemctl enable kitchen.service
 systemctl restart kitchen.service
 success "kitchen.service installed and started."
 
+# =============================================================================
+# BACKUPS — daily timer (backup_job.py)
+# =============================================================================
+echo -e "${BOLD}--- Installing backup timer ---${NC}"
+
+for UNIT in stockpi-backup.service stockpi-backup.timer; do
+  sed \
+    -e "s|User=kinv|User=$REAL_USER|g" \
+    -e "s|/home/kinv/StockPi-InfoPanel|$REPO_DIR|g" \
+    "$REPO_DIR/systemd/$UNIT" > "/etc/systemd/system/$UNIT"
+done
+
+systemctl daemon-reload
+systemctl enable --now stockpi-backup.timer
+success "Daily backups enabled (saved to $REPO_DIR/backups)."
+
 # =============================================================================
 # DONE
 # =============================================================================